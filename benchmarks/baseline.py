@@ -0,0 +1,85 @@
+"""
+Saving benchmark results as a baseline and comparing later runs against it.
+
+Results are nested dicts of numbers. A metric counts as a regression when it
+moves the wrong way by more than the tolerance: latencies, durations and
+memory (keys ending in ``_us``, ``_ms``, ``seconds`` or ``_bytes``) should not
+grow, throughputs (``rps``, ``_per_second``) should not shrink. Other numbers are reported
+but never fail a comparison.
+"""
+
+import json
+
+LOWER_IS_BETTER = ("_us", "_ms", "seconds", "_bytes", "bytes_per_enrollment")
+HIGHER_IS_BETTER = ("rps", "_per_second")
+
+
+def flatten(results, prefix=""):
+    """Return ``{"a.b.c": number}`` for every number in nested results."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def direction(path):
+    """Return -1 if a metric should go down, 1 if up, 0 if it does not matter."""
+    name = path.rsplit(".", 1)[-1]
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    return 0
+
+
+def compare(current, baseline, tolerance=0.1):
+    """Compare two result sets.
+
+    Returns ``(report, regressions)``: ``report`` maps each shared metric to
+    its baseline, current value and relative change, ``regressions`` lists
+    the metrics that got worse by more than ``tolerance``.
+    """
+    current, baseline = flatten(current), flatten(baseline)
+    report, regressions = {}, []
+    for path in sorted(current.keys() & baseline.keys()):
+        before, after = baseline[path], current[path]
+        change = (after - before) / before if before else 0.0
+        report[path] = {"baseline": before, "current": after, "change": round(change, 3)}
+        if direction(path) * change < -tolerance:
+            regressions.append(path)
+    return report, regressions
+
+
+def load(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save(results, path):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+        file.write("\n")
+
+
+def add_arguments(parser):
+    """Add the ``--save-baseline``/``--baseline``/``--tolerance`` options."""
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against results saved in PATH")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative change allowed before a metric counts as a regression")
+
+
+def report(results, args):
+    """Print results, or a comparison, as JSON; return the exit status."""
+    if args.save_baseline:
+        save(results, args.save_baseline)
+    if not args.baseline:
+        print(json.dumps(results, indent=2))
+        return 0
+    changes, regressions = compare(results, load(args.baseline), args.tolerance)
+    print(json.dumps({"results": results, "comparison": changes, "regressions": regressions}, indent=2))
+    return 1 if regressions else 0
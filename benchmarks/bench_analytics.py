@@ -0,0 +1,101 @@
+"""
+Benchmark analytics queries and their cost on the write path.
+
+For each size in ``--sizes`` (total enrollments, spread over 100 activities
+drawn from a pool of students) reports:
+
+- ``summary_us`` and ``timeseries_us``: median time of
+  ``EnrollmentAnalytics.summary()`` and ``series("minute")``, answered from
+  the rollups
+- ``scan_us``: median time to work out the same totals and rankings by
+  scanning every roster, what the summary would cost without the rollups
+- ``signup_remove_us`` and ``signup_remove_plain_us``: median time of a
+  sign-up followed by a removal with and without the analytics listener
+
+Usage: python benchmarks/bench_analytics.py [--sizes 10000,100000,1000000]
+                                            [--rounds N]
+                                            [--save-baseline PATH] [--baseline PATH]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import baseline  # noqa: E402
+from analytics import EnrollmentAnalytics  # noqa: E402
+from store import ActivityStore  # noqa: E402
+
+ACTIVITIES = 100
+
+
+def build_store(enrollments):
+    per_activity = enrollments // ACTIVITIES
+    students = max(per_activity * 4, 1)
+    return ActivityStore({
+        f"Activity {a}": {
+            "description": f"Generated activity number {a}",
+            "schedule": "",
+            "max_participants": per_activity + a + 1,
+            "participants": [f"student{(a * 7919 + p) % students}@mergington.edu"
+                             for p in range(per_activity)],
+        }
+        for a in range(ACTIVITIES)
+    })
+
+
+def scan_summary(store, top=10):
+    taken = Counter()
+    demand = {}
+    for name, activity in list(store.items()):
+        taken.update(activity.roster)
+        demand[name] = len(activity.roster) + len(activity.waitlist)
+    return (sum(taken.values()), len(taken), Counter(taken.values()),
+            sorted(demand, key=demand.get, reverse=True)[:top])
+
+
+def median_us(call, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1e6, 1)
+
+
+def signup_remove(store):
+    def call():
+        store.add_participant("Activity 0", "bench@mergington.edu")
+        store.remove_participant("Activity 0", "bench@mergington.edu")
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--rounds", type=int, default=50)
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    results = {}
+    for size in (int(size) for size in args.sizes.split(",")):
+        store = build_store(size)
+        plain = median_us(signup_remove(store), args.rounds * 20)
+        analytics = EnrollmentAnalytics(store)
+        results[f"enrollments_{size}"] = {
+            "summary_us": median_us(analytics.summary, args.rounds),
+            "timeseries_us": median_us(lambda: analytics.series("minute"), args.rounds),
+            "scan_us": median_us(lambda: scan_summary(store), max(args.rounds // 10, 3)),
+            "signup_remove_us": median_us(signup_remove(store), args.rounds * 20),
+            "signup_remove_plain_us": plain,
+        }
+    sys.exit(baseline.report(results, args))
+
+
+if __name__ == "__main__":
+    main()
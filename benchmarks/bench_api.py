@@ -0,0 +1,104 @@
+"""
+Micro-benchmark the hot API handlers against large rosters.
+
+For each roster size, fills one activity with that many participants and
+awaits the route functions ``signup_for_activity``, ``remove_participant`` and
+``get_activities`` in-process on one event loop, without HTTP. Rate limits
+are switched off so every call reaches the store. ``get_activities`` is timed both
+right after a change (the list is re-serialized) and when nothing has changed
+(the cached body is reused). Reports p50/p99 per operation in microseconds.
+
+Usage: python benchmarks/bench_api.py [--sizes 10,1000,100000] [--rounds N]
+                                      [--save-baseline PATH] [--baseline PATH]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+os.environ["MERGINGTON_RATE_LIMIT"] = "off"
+os.environ["MERGINGTON_EMAIL_RATE_LIMIT"] = "off"
+
+from starlette.requests import Request  # noqa: E402
+
+import baseline  # noqa: E402
+from app import activities, get_activities, remove_participant, signup_for_activity  # noqa: E402
+
+ACTIVITY = "Benchmark Club"
+SIZES = (10, 100, 1000, 10_000, 100_000)
+REQUEST_SCOPE = {"type": "http", "method": "GET", "path": "/activities", "headers": [],
+                 "client": ("127.0.0.1", 0)}
+loop = asyncio.new_event_loop()
+
+
+def fill(size):
+    activities[ACTIVITY] = {
+        "description": "Benchmark activity",
+        "schedule": "Mondays, 3:30 PM - 5:00 PM",
+        "max_participants": size + 1,
+        "participants": [f"student{i}@mergington.edu" for i in range(size)],
+    }
+
+
+def list_activities():
+    # Called directly, so every parameter default has to be spelled out
+    return loop.run_until_complete(get_activities(
+        Request(REQUEST_SCOPE), limit=None, cursor=None, day=None,
+                          starts_after=None, ends_before=None, has_spots=None, q=None, fields=None))
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return {
+        "p50_us": round(statistics.median(timings), 1),
+        "p99_us": round(timings[max(0, int(len(timings) * 0.99) - 1)], 1),
+    }
+
+
+def measure(size, rounds):
+    fill(size)
+    timings = {"signup": [], "remove": [], "get_after_change": [], "get_unchanged": []}
+    for i in range(rounds):
+        email = f"bench{i}@mergington.edu"
+        for name, call in (
+            ("signup", lambda: loop.run_until_complete(
+                signup_for_activity(ACTIVITY, email, Request(REQUEST_SCOPE)))),
+            ("get_after_change", list_activities),
+            ("get_unchanged", list_activities),
+            ("remove", lambda: loop.run_until_complete(
+                remove_participant(ACTIVITY, email, Request(REQUEST_SCOPE)))),
+        ):
+            start = time.perf_counter()
+            call()
+            timings[name].append((time.perf_counter() - start) * 1e6)
+    body_bytes = len(list_activities().body)
+    del activities[ACTIVITY]
+    results = {name: percentiles(values) for name, values in timings.items()}
+    results["body_bytes"] = body_bytes
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated participants per activity")
+    parser.add_argument("--rounds", type=int, default=None,
+                        help="iterations per size (default: fewer for larger rosters)")
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    results = {}
+    for size in (int(size) for size in args.sizes.split(",")):
+        # Re-serializing 100k participants takes milliseconds; keep runs short
+        rounds = args.rounds or max(20, min(500, 2_000_000 // size))
+        results[str(size)] = measure(size, rounds)
+    sys.exit(baseline.report(results, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark bulk signups against the single-item endpoint.
+
+Signs the same number of students up through ``POST
+/activities/{activity_name}/signup``, ``POST /activities/batch`` and ``POST
+/activities/batch/ndjson`` in-process and reports operations per second.
+
+Usage: python benchmarks/bench_batch.py [--students N] [--batch-size N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import activities, app  # noqa: E402
+
+ACTIVITY = "Benchmark Club"
+
+
+def reset(capacity):
+    activities[ACTIVITY] = {
+        "description": "Benchmark activity",
+        "schedule": "Mondays, 3:30 PM - 5:00 PM",
+        "max_participants": capacity,
+        "participants": [],
+    }
+
+
+def single(client, emails, batch_size):
+    for email in emails:
+        client.post(f"/activities/{ACTIVITY}/signup", params={"email": email})
+
+
+def batch(client, emails, batch_size):
+    for start in range(0, len(emails), batch_size):
+        client.post("/activities/batch", json={"operations": [
+            {"op": "signup", "activity": ACTIVITY, "email": email}
+            for email in emails[start:start + batch_size]
+        ]})
+
+
+def ndjson(client, emails, batch_size):
+    body = "".join(
+        json.dumps({"op": "signup", "activity": ACTIVITY, "email": email}) + "\n"
+        for email in emails
+    )
+    client.post("/activities/batch/ndjson", content=body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    emails = [f"student{i}@mergington.edu" for i in range(args.students)]
+    results = {}
+    for name, run in (("single", single), ("batch", batch), ("ndjson", ndjson)):
+        reset(args.students)
+        start = time.perf_counter()
+        run(client, emails, args.batch_size)
+        elapsed = time.perf_counter() - start
+        assert len(activities[ACTIVITY].roster) == args.students
+        results[name] = {"seconds": round(elapsed, 4), "ops_per_second": round(args.students / elapsed)}
+    del activities[ACTIVITY]
+
+    for name in ("batch", "ndjson"):
+        results[name]["speedup"] = round(results["single"]["seconds"] / results[name]["seconds"], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark streaming bulk import and export.
+
+Imports ``--rows`` enrollments spread over ``--activities`` activities from
+a generated CSV or NDJSON stream that is never held in memory whole, then
+exports everything again. Reports records per second for both directions,
+and the import's peak memory beyond what the store itself ends up holding,
+which stays bounded by the batch size rather than growing with the file.
+
+Usage: python benchmarks/bench_bulk.py [--rows N] [--activities N] [--format csv|ndjson]
+                                       [--save-baseline PATH] [--baseline PATH]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import baseline  # noqa: E402
+from bulk import decode_lines, export_records, import_records, read_records, write_records  # noqa: E402
+from store import ActivityStore  # noqa: E402
+
+
+def generate(rows, activities, fmt, chunk_rows=1000):
+    """Yield the file as byte chunks, each activity before its enrollments."""
+    per_activity = -(-rows // activities)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if fmt == "csv":
+        writer.writerow(["activity", "email", "description", "schedule", "max_participants"])
+    for row in range(rows):
+        number, position = divmod(row, per_activity)
+        name = f"Activity {number}"
+        records = []
+        if position == 0:
+            records.append({"activity": name, "description": f"Generated activity {number}",
+                            "schedule": "Mondays, 3:30 PM - 5:00 PM",
+                            "max_participants": per_activity})
+        records.append({"activity": name, "email": f"student{row}@mergington.edu"})
+        for record in records:
+            if fmt == "csv":
+                writer.writerow([record["activity"], record.get("email", ""), record.get("description", ""),
+                                 record.get("schedule", ""), record.get("max_participants", "")])
+            else:
+                buffer.write(json.dumps(record) + "\n")
+        if row % chunk_rows == chunk_rows - 1:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--activities", type=int, default=1000)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    def run_import():
+        store = ActivityStore()
+        records = read_records(decode_lines(generate(args.rows, args.activities, args.format)),
+                               args.format)
+        return store, import_records(store, records)
+
+    store, report = run_import()
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in write_records(export_records(store), args.format))
+    export_seconds = time.perf_counter() - started
+    del store
+
+    # Again under tracemalloc, which would skew the timings above
+    tracemalloc.start()
+    store, _ = run_import()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results = {
+        "rows": args.rows,
+        "import": {
+            "seconds": report["seconds"],
+            "records_per_second": report["records_per_second"],
+            "failed": report["failed"],
+            "store_bytes": held,
+            "peak_overhead_bytes": peak - held,
+        },
+        "export": {
+            "seconds": round(export_seconds, 3),
+            "records_per_second": round(report["records"] / export_seconds),
+            "output_bytes": size,
+        },
+    }
+    sys.exit(baseline.report(results, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure memory per enrollment for a district-sized set of rosters.
+
+Generates ``--activities`` activities with ``--per-activity`` participants
+each, drawn from ``--students`` distinct students, so a typical student is
+on several activities. Each email is generated as its own string, as
+decoding JSON would produce it. Reports the bytes allocated per enrollment
+(tracemalloc, after dropping the generated input) for:
+
+- ``plain``: the JSON-style dict of lists the API started out with
+- ``store``: an ``ActivityStore`` including its reverse index
+
+Usage: python benchmarks/bench_memory.py [--activities N] [--per-activity N]
+                                         [--students N]
+                                         [--save-baseline PATH] [--baseline PATH]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import baseline  # noqa: E402
+from store import ActivityStore  # noqa: E402
+
+
+def district(activities, per_activity, students, domain, seed=1):
+    rng = random.Random(seed)
+    data = {}
+    for a in range(activities):
+        members = rng.sample(range(students), per_activity)
+        data[f"Activity {a}"] = {
+            "description": f"Generated activity number {a}",
+            "schedule": "Mondays, 3:30 PM - 5:00 PM",
+            "max_participants": per_activity,
+            "participants": [f"student{m}@{domain}" for m in members],
+        }
+    return data
+
+
+def measure(build, args, domain):
+    """Bytes still allocated after building from freshly generated input."""
+    gc.collect()
+    tracemalloc.start()
+    data = district(args.activities, args.per_activity, args.students, domain)
+    result = build(data)
+    del data
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--activities", type=int, default=2000)
+    parser.add_argument("--per-activity", type=int, default=100)
+    parser.add_argument("--students", type=int, default=50_000)
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    enrollments = args.activities * args.per_activity
+    # Each run uses its own email domain, so the two runs share no strings
+    results = {"enrollments": enrollments}
+    for name, build in (("store", ActivityStore), ("plain", lambda data: data)):
+        size = measure(build, args, f"{name}.mergington.edu")
+        results[name] = {"total_bytes": size, "bytes_per_enrollment": round(size / enrollments, 1)}
+    sys.exit(baseline.report(results, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark typeahead search over a large synthetic catalogue.
+
+Builds a store with N generated activities, then times ``SearchIndex.search``
+for a mix of single-word, multi-word and short-prefix queries and reports the
+median and 99th percentile latency per query.
+
+Descriptions draw from a vocabulary of common activity words plus generated
+filler words with Zipf-like frequencies, so the common words match a large
+share of the catalogue as they would in practice. ``--vocabulary 0`` uses the
+common words only, a worst case where every query matches thousands of
+activities.
+
+Usage: python benchmarks/bench_search.py [--activities N] [--rounds N] [--vocabulary N]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from search import SearchIndex  # noqa: E402
+from store import ActivityStore  # noqa: E402
+
+WORDS = (
+    "art band chess coding dance debate drama film garden history jazz math "
+    "music painting physics poetry robotics science soccer speech swim tennis "
+    "theatre track writing yoga advanced beginner club competitive creative "
+    "team workshop league society studio lab practice training"
+).split()
+
+QUERIES = ("r", "ro", "robo", "chess club", "science lab adv", "dance", "competitive te", "zzz")
+
+
+SYLLABLES = "ka lo mi ne ru sa ti vo ze pa".split()
+
+
+def build_vocabulary(size, rng):
+    """Return the common words followed by ``size`` generated filler words."""
+    filler = set()
+    while len(filler) < size:
+        filler.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return list(WORDS) + sorted(filler)
+
+
+def build_store(count, vocabulary, rng):
+    store = ActivityStore()
+    # Zipf-like: the i-th word is drawn with weight 1 / (i + 1)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    for i in range(count):
+        name = " ".join(rng.sample(WORDS, 2)).title() + f" {i}"
+        store[name] = {
+            "description": " ".join(rng.choices(vocabulary, weights, k=12)),
+            "schedule": "Mondays, 3:30 PM - 5:00 PM",
+            "max_participants": 20,
+            "participants": [],
+        }
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--activities", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    start = time.perf_counter()
+    store = build_store(args.activities, build_vocabulary(args.vocabulary, rng), rng)
+    index = SearchIndex(store)
+    build_seconds = time.perf_counter() - start
+
+    results = {"activities": args.activities, "vocabulary": args.vocabulary + len(WORDS),
+               "build_seconds": round(build_seconds, 3), "queries": {}}
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.rounds):
+            begin = time.perf_counter()
+            index.search(query, limit=10)
+            timings.append((time.perf_counter() - begin) * 1e6)
+        timings.sort()
+        results["queries"][query] = {
+            "p50_us": round(statistics.median(timings), 1),
+            "p99_us": round(timings[int(len(timings) * 0.99) - 1], 1),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
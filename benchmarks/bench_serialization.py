@@ -0,0 +1,98 @@
+"""
+Benchmark response encoding against FastAPI's default path.
+
+Encodes the same payloads three ways and reports the median time per
+encoding and throughput:
+
+- ``fastapi``: ``jsonable_encoder`` then ``JSONResponse.render``, what an
+  endpoint returning a dict or model goes through
+- ``stdlib``: ``serialization.encode_json_stdlib``, the fallback without
+  orjson
+- ``fast``: ``serialization.encode_json`` (orjson when installed)
+
+Payloads are the full ``GET /activities`` body for ``--activities``
+activities of ``--participants`` participants, and a 1000-participant
+roster page as a ``models.ParticipantsPage``.
+
+Usage: python benchmarks/bench_serialization.py [--activities N] [--participants N]
+                                                [--rounds N]
+                                                [--save-baseline PATH] [--baseline PATH]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import baseline  # noqa: E402
+import serialization  # noqa: E402
+from models import ParticipantsPage  # noqa: E402
+from store import ActivityStore  # noqa: E402
+
+
+def fastapi_path(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+ENCODERS = {
+    "fastapi": fastapi_path,
+    "stdlib": serialization.encode_json_stdlib,
+    "fast": serialization.encode_json,
+}
+
+
+def payloads(activities, participants):
+    store = ActivityStore({
+        f"Activity {a}": {
+            "description": f"Generated activity number {a}",
+            "schedule": "Mondays, 3:30 PM - 5:00 PM",
+            "max_participants": participants,
+            "participants": [f"student{p}.{a}@mergington.edu" for p in range(participants)],
+        }
+        for a in range(activities)
+    })
+    page = ParticipantsPage("Activity 0", [f"student{p}@mergington.edu" for p in range(1000)], 5000,
+                            "eyJhZnRlciI6IDEwMDB9")
+    return {"activities": store.to_dict(), "participants_page": page}
+
+
+def measure(encode, content, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        body = encode(content)
+        timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    return {"p50_us": round(median * 1e6, 1), "mb_per_second": round(len(body) / median / 1e6, 1)}, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--activities", type=int, default=50)
+    parser.add_argument("--participants", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=30)
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    results = {"orjson": serialization.orjson is not None}
+    for name, content in payloads(args.activities, args.participants).items():
+        results[name] = {}
+        bodies = set()
+        for encoder, encode in ENCODERS.items():
+            results[name][encoder], body = measure(encode, content, args.rounds)
+            bodies.add(body)
+        # Every path must produce the same bytes
+        results[name]["identical"] = len(bodies) == 1
+        results[name]["body_bytes"] = len(body)
+    sys.exit(baseline.report(results, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Load-test the API over HTTP.
+
+Starts the app under uvicorn (or targets ``--url``), then runs ``--concurrency``
+clients for ``--duration`` seconds. Each client loops over a weighted mix of
+requests: reading ``GET /activities`` and signing a fresh student up for
+``--activity`` and removing them again. Reports throughput and p50/p95/p99
+latency overall and per request kind as JSON.
+
+A 4xx response such as "Activity is full" is counted under its status code;
+only 5xx responses and connection failures count as errors. Every client
+comes from the same address, so the server started here has its per-client
+rate limit switched off unless ``MERGINGTON_RATE_LIMIT`` is set.
+
+Usage: python benchmarks/loadgen.py [--concurrency N] [--duration SECONDS]
+                                    [--mix read=8,write=2] [--url URL]
+                                    [--save-baseline PATH] [--baseline PATH]
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import baseline  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def parse_mix(text):
+    """Turn ``read=8,write=2`` into ``{"read": 8, "write": 2}``."""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ("read", "write"):
+            raise argparse.ArgumentTypeError(f"unknown request kind: {kind}")
+        mix[kind] = int(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, workers):
+    """Start uvicorn on ``port`` and wait until it answers."""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.app:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env={"MERGINGTON_RATE_LIMIT": "off", **os.environ},
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            httpx.get(url + "/activities", timeout=1).raise_for_status()
+            return server, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start within 30 seconds")
+
+
+class Recorder:
+    """Latencies and status codes per request kind."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = Counter()
+
+    def record(self, kind, seconds, status):
+        self.latencies.setdefault(kind, []).append(seconds * 1000)
+        self.statuses.setdefault(kind, Counter())[status] += 1
+        if status >= 500:
+            self.errors[kind] += 1
+
+    def fail(self, kind):
+        self.errors[kind] += 1
+
+    def summary(self, elapsed):
+        kinds = {kind: self._stats(self.latencies[kind], elapsed, kind) for kind in self.latencies}
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        overall = self._stats(everything, elapsed, None)
+        overall["errors"] = sum(self.errors.values())
+        return overall, kinds
+
+    def _stats(self, latencies, elapsed, kind):
+        latencies = sorted(latencies)
+        stats = {"requests": len(latencies), "rps": round(len(latencies) / elapsed, 1)}
+        for percentile in (50, 95, 99):
+            index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+            stats[f"p{percentile}_ms"] = round(latencies[index], 3) if latencies else None
+        if kind is not None:
+            stats["errors"] = self.errors[kind]
+            stats["statuses"] = {str(code): count for code, count in sorted(self.statuses[kind].items())}
+        return stats
+
+
+async def timed(client, recorder, kind, method, path, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+    except httpx.HTTPError:
+        recorder.fail(kind)
+        return
+    recorder.record(kind, time.perf_counter() - start, response.status_code)
+
+
+async def client_loop(client, recorder, deadline, mix, activity, emails, rng):
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    while time.monotonic() < deadline:
+        if rng.choices(kinds, weights)[0] == "read":
+            await timed(client, recorder, "get_activities", "GET", "/activities")
+        else:
+            email = next(emails)
+            await timed(client, recorder, "signup", "POST",
+                        f"/activities/{activity}/signup", params={"email": email})
+            await timed(client, recorder, "remove", "DELETE",
+                        f"/activities/{activity}/participants/{email}")
+
+
+async def run(url, args):
+    recorder = Recorder()
+    emails = (f"load{i}@mergington.edu" for i in itertools.count())
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        deadline = time.monotonic() + args.duration
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, recorder, deadline, args.mix, args.activity, emails,
+                        random.Random(seed))
+            for seed in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+    overall, kinds = recorder.summary(elapsed)
+    return {
+        "config": {"concurrency": args.concurrency, "duration": args.duration,
+                   "mix": args.mix, "workers": args.workers, "url": url},
+        "overall": overall,
+        "requests": kinds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("read=8,write=2"),
+                        help="weights of read and write requests, e.g. read=8,write=2")
+    parser.add_argument("--activity", default="Gym Class", help="activity the writes go to")
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_server(free_port(), args.workers)
+    try:
+        results = asyncio.run(run(url, args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    sys.exit(baseline.report(results, args))
+
+
+if __name__ == "__main__":
+    main()
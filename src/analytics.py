@@ -0,0 +1,321 @@
+"""
+Enrollment analytics kept up to date as the store changes.
+
+Dashboards ask for totals, fill rates, the most popular and most
+oversubscribed activities, how many activities students take and how
+sign-ups trend over time. Scanning every roster to answer would cost
+O(total enrollments) per request. ``EnrollmentAnalytics`` instead listens to
+the store and adjusts a handful of rollups by one on every sign-up, removal
+and waitlist change:
+
+- running totals of enrollments, places and waiting students
+- a histogram of how many students take 1, 2, 3... activities
+- ``RankedCounts`` of demand (enrolled plus waiting) and of waitlist length,
+  which move an activity up or down one step at a time and list the top K
+  without sorting
+- ``RingSeries`` of sign-ups and removals per minute over the last day and
+  per hour over the last 30 days, in fixed-size arrays whose old buckets are
+  overwritten
+
+Each change costs O(1) and queries cost O(K), O(buckets) or, for the
+per-activity fill rates, O(activities), whatever the number of enrollments.
+Replacing or deleting a whole activity is the exception: it costs the size
+of its roster, as it does in the store.
+"""
+
+import threading
+import time
+from array import array
+
+from models import ActivityFill, EnrollmentSeries, EnrollmentSummary, RankedActivity
+
+# Resolution name -> (seconds per bucket, number of buckets)
+RESOLUTIONS = {
+    "minute": (60, 24 * 60),
+    "hour": (3600, 30 * 24),
+}
+
+
+class _Bucket:
+    __slots__ = ("count", "names", "higher", "lower")
+
+    def __init__(self, count):
+        self.count = count
+        # Used as an ordered set: ties rank in the order they reached the count
+        self.names = {}
+        self.higher = None
+        self.lower = None
+
+
+class RankedCounts:
+    """Counts per name, kept ranked for top-K queries.
+
+    Names with the same count share a bucket, and buckets form a linked list
+    in count order, so moving a name up or down by one only touches its
+    bucket and a neighbour. Names at zero are not stored.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._buckets = {}
+        self._highest = None
+        self._lowest = None
+
+    def __len__(self):
+        return len(self._counts)
+
+    def get(self, name):
+        return self._counts.get(name, 0)
+
+    def add(self, name, amount=1):
+        self.set(name, self._counts.get(name, 0) + amount)
+
+    def set(self, name, count):
+        """Set a name's count; the cost grows with how many counts it passes."""
+        old = self._counts.get(name, 0)
+        if count == old:
+            return
+        start = self._buckets.get(old)
+        if count > 0:
+            self._counts[name] = count
+            bucket = self._buckets.get(count)
+            if bucket is None:
+                bucket = self._insert(count, start)
+            bucket.names[name] = None
+        else:
+            del self._counts[name]
+        if start is not None:
+            del start.names[name]
+            if not start.names:
+                self._unlink(start)
+
+    def top(self, k):
+        """Return up to ``k`` ``(name, count)`` pairs, highest count first."""
+        result = []
+        bucket = self._highest
+        while bucket is not None and len(result) < k:
+            for name in bucket.names:
+                result.append((name, bucket.count))
+                if len(result) == k:
+                    break
+            bucket = bucket.lower
+        return result
+
+    def _insert(self, count, near):
+        # Find the highest bucket below ``count``, walking from ``near``
+        lower = near if near is not None else self._lowest
+        if lower is not None and lower.count < count:
+            while lower.higher is not None and lower.higher.count < count:
+                lower = lower.higher
+        else:
+            while lower is not None and lower.count > count:
+                lower = lower.lower
+        bucket = self._buckets[count] = _Bucket(count)
+        higher = lower.higher if lower is not None else self._lowest
+        bucket.lower, bucket.higher = lower, higher
+        if lower is None:
+            self._lowest = bucket
+        else:
+            lower.higher = bucket
+        if higher is None:
+            self._highest = bucket
+        else:
+            higher.lower = bucket
+        return bucket
+
+    def _unlink(self, bucket):
+        del self._buckets[bucket.count]
+        if bucket.lower is None:
+            self._lowest = bucket.higher
+        else:
+            bucket.lower.higher = bucket.higher
+        if bucket.higher is None:
+            self._highest = bucket.lower
+        else:
+            bucket.higher.lower = bucket.lower
+
+
+class RingSeries:
+    """Event counts over the last ``buckets`` intervals of ``width`` seconds.
+
+    Each slot remembers which interval it counts, so a slot left over from
+    an earlier lap of the ring reads as zero and is reset on its next use.
+    """
+
+    def __init__(self, width, buckets):
+        self.width = width
+        self._counts = array("q", bytes(8 * buckets))
+        self._epochs = array("q", [-1]) * buckets
+
+    def add(self, now, amount=1):
+        epoch = int(now // self.width)
+        slot = epoch % len(self._counts)
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+        self._counts[slot] += amount
+
+    def values(self, now):
+        """Return the start time of the oldest bucket and every count, oldest first."""
+        size = len(self._counts)
+        first = int(now // self.width) - size + 1
+        counts = [
+            self._counts[epoch % size] if self._epochs[epoch % size] == epoch else 0
+            for epoch in range(first, first + size)
+        ]
+        return first * self.width, counts
+
+
+class EnrollmentAnalytics:
+    """Rollups of one store's enrollments, updated by a store listener.
+
+    Sign-ups include waitlist promotions, and removals include students
+    unenrolled from every activity at once, whichever endpoint made them.
+    """
+
+    def __init__(self, store, clock=time.time):
+        self._store = store
+        self._clock = clock
+        self._lock = threading.Lock()
+        # name -> Activity, read for per-activity figures
+        self._activities = {}
+        self.enrollments = 0
+        self.capacity = 0
+        self.waitlisted = 0
+        # email -> activities taken, and activities taken -> students
+        self._per_student = {}
+        self._students_taking = {}
+        self._demand = RankedCounts()
+        self._waiting = RankedCounts()
+        # resolution -> {"signups": RingSeries, "removals": RingSeries}
+        self._series = {
+            resolution: {"signups": RingSeries(width, buckets), "removals": RingSeries(width, buckets)}
+            for resolution, (width, buckets) in RESOLUTIONS.items()
+        }
+        for name in list(store):
+            self._add(name, store[name])
+        store.add_listener(self._on_change)
+
+    def summary(self, top=10):
+        """Totals, enrollments per student and the ``top`` ranked activities."""
+        with self._lock:
+            return EnrollmentSummary(
+                activities=len(self._activities),
+                students=len(self._per_student),
+                enrollments=self.enrollments,
+                capacity=self.capacity,
+                fill_rate=round(self.enrollments / self.capacity, 4) if self.capacity else 0.0,
+                waitlisted=self.waitlisted,
+                enrollments_per_student={str(taken): students for taken, students
+                                         in sorted(self._students_taking.items())},
+                most_popular=[self._ranked(name) for name, _ in self._demand.top(top)],
+                most_oversubscribed=[self._ranked(name) for name, _ in self._waiting.top(top)],
+            )
+
+    def activity_fill(self):
+        """Fill rate and waitlist of every activity, in name order."""
+        with self._lock:
+            activities = sorted(self._activities.items())
+        fills = []
+        for name, activity in activities:
+            enrolled = len(activity.roster)
+            capacity = activity.max_participants
+            fills.append(ActivityFill(name, enrolled, capacity, len(activity.waitlist),
+                                      round(enrolled / capacity, 4) if capacity else 0.0))
+        return fills
+
+    def series(self, resolution="minute"):
+        """Sign-ups and removals per bucket at ``resolution``, oldest first."""
+        series = self._series[resolution]
+        now = self._clock()
+        with self._lock:
+            start, signups = series["signups"].values(now)
+            _, removals = series["removals"].values(now)
+        return EnrollmentSeries(resolution, RESOLUTIONS[resolution][0], start, signups, removals)
+
+    def _ranked(self, name):
+        # Caller holds the lock
+        activity = self._activities[name]
+        return RankedActivity(name, len(activity.roster), len(activity.waitlist),
+                              activity.max_participants)
+
+    def _on_change(self, operation, version):
+        kind = operation["op"]
+        if kind == "reset":
+            return
+        name = operation["activity"]
+        with self._lock:
+            if kind == "put":
+                self._add(name, self._store.get(name))
+            elif kind == "delete":
+                self._discard(name)
+            elif name not in self._activities:
+                return
+            elif kind in ("signup", "promote"):
+                if kind == "promote":
+                    self._waitlist_changed(name, -1)
+                self._enrollment_changed(name, operation["email"], 1)
+                self._record("signups")
+            elif kind == "remove":
+                self._enrollment_changed(name, operation["email"], -1)
+                self._record("removals")
+            elif kind == "waitlist":
+                self._waitlist_changed(name, 1)
+            elif kind == "unwaitlist":
+                self._waitlist_changed(name, -1)
+
+    def _record(self, event):
+        now = self._clock()
+        for series in self._series.values():
+            series[event].add(now)
+
+    def _add(self, name, activity):
+        # Caller holds the lock; a whole activity costs the size of its roster
+        if activity is None:
+            return
+        self._discard(name)
+        self._activities[name] = activity
+        self.capacity += activity.max_participants
+        for email in activity.roster:
+            self._student_changed(email, 1)
+        enrolled, waiting = len(activity.roster), len(activity.waitlist)
+        self.enrollments += enrolled
+        self.waitlisted += waiting
+        self._demand.set(name, enrolled + waiting)
+        self._waiting.set(name, waiting)
+
+    def _discard(self, name):
+        activity = self._activities.pop(name, None)
+        if activity is None:
+            return
+        self.capacity -= activity.max_participants
+        for email in activity.roster:
+            self._student_changed(email, -1)
+        self.enrollments -= len(activity.roster)
+        self.waitlisted -= self._waiting.get(name)
+        self._demand.set(name, 0)
+        self._waiting.set(name, 0)
+
+    def _enrollment_changed(self, name, email, amount):
+        self.enrollments += amount
+        self._demand.add(name, amount)
+        self._student_changed(email, amount)
+
+    def _waitlist_changed(self, name, amount):
+        self.waitlisted += amount
+        self._demand.add(name, amount)
+        self._waiting.add(name, amount)
+
+    def _student_changed(self, email, amount):
+        before = self._per_student.get(email, 0)
+        after = before + amount
+        if before:
+            if self._students_taking[before] == 1:
+                del self._students_taking[before]
+            else:
+                self._students_taking[before] -= 1
+        if after:
+            self._per_student[email] = after
+            self._students_taking[after] = self._students_taking.get(after, 0) + 1
+        else:
+            del self._per_student[email]
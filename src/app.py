@@ -5,122 +5,737 @@ A super simple FastAPI application that allows students to view and sign up
 for extracurricular activities at Mergington High School.
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from contextlib import asynccontextmanager
+from typing import Literal
+
+from anyio import from_thread
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
+from fastapi import Path as PathParam
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from pydantic import BaseModel
+import json
+import math
 import os
+import sys
 from pathlib import Path
 
+# Sibling modules are imported by name whether the app is started as
+# ``src.app`` from the repository root or as ``app`` from inside src/.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from store import (ActivityFullError, ActivityNotFoundError, ActivityStore, AlreadySignedUpError,
+                   AlreadyWaitlistedError, NotSignedUpError, NotWaitlistedError,
+                   ScheduleConflictError, SpotsAvailableError)
+from assets import StaticAssets
+from bulk import MEDIA_TYPES, decode_lines, export_records, import_records, read_records, write_records
+from cache import etag_matches
+from events import stream_changes
+from idempotency import IdempotencyCache, IdempotencyKeyReusedError, StoredResponse
+from listing import ListingError
+from models import (ActivityDetails, ActivityFill, ActivityPage, BatchItem, EnrollmentSeries,
+                    EnrollmentSummary, ParticipantsPage, SearchResult,
+                    SearchResults, StudentActivities, StudentActivity, batch_item_adapter)
+from metrics import CONTENT_TYPE, ActivityMetrics, HTTPMetrics, MetricsMiddleware, Registry
+from notifications import NotificationQueue, notify_waitlist_changes
+from profiling import SlowRequestProfiler
+from ratelimit import RateLimitedError, RateLimiter, parse_rate
+from replication import ReplicaStore
+from seed import SEED_ACTIVITIES
+from serialization import JSONBytesResponse, encode_json
+from storage import open_backend
+from tenancy import SCHOOL_ID_PATTERN, School, SchoolRegistry, valid_school_id
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Flush outstanding writes before the process exits
+    schools.close()
+    if notifications is not None:
+        notifications.close()
+
+
 app = FastAPI(title="Mergington High School API",
-              description="API for viewing and signing up for extracurricular activities")
+              description="API for viewing and signing up for extracurricular activities",
+              lifespan=lifespan)
 
-# Mount the static files directory
+# Static files, precompressed in memory and published under hashed names
 current_dir = Path(__file__).parent
-app.mount("/static", StaticFiles(directory=os.path.join(Path(__file__).parent,
-          "static")), name="static")
-
-# In-memory activity database
-activities = {
-    "Chess Club": {
-        "description": "Learn strategies and compete in chess tournaments",
-        "schedule": "Fridays, 3:30 PM - 5:00 PM",
-        "max_participants": 12,
-        "participants": ["michael@mergington.edu", "daniel@mergington.edu"]
-    },
-    "Programming Class": {
-        "description": "Learn programming fundamentals and build software projects",
-        "schedule": "Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
-        "max_participants": 20,
-        "participants": ["emma@mergington.edu", "sophia@mergington.edu"]
-    },
-    "Gym Class": {
-        "description": "Physical education and sports activities",
-        "schedule": "Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
-        "max_participants": 30,
-        "participants": ["john@mergington.edu", "olivia@mergington.edu"]
-    },
-    "Basketball Team": {
-        "description": "Competitive basketball training and interschool games",
-        "schedule": "Mondays and Wednesdays, 4:00 PM - 6:00 PM",
-        "max_participants": 15,
-        "participants": ["alex@mergington.edu", "sarah@mergington.edu"]
-    },
-    "Track and Field": {
-        "description": "Running, jumping, and throwing events training",
-        "schedule": "Tuesdays and Thursdays, 4:00 PM - 5:30 PM",
-        "max_participants": 25,
-        "participants": ["lucas@mergington.edu"]
-    },
-    "Art Club": {
-        "description": "Explore various art mediums including painting and drawing",
-        "schedule": "Thursdays, 3:30 PM - 5:00 PM",
-        "max_participants": 18,
-        "participants": ["maya@mergington.edu", "ethan@mergington.edu"]
-    },
-    "Drama Club": {
-        "description": "Acting, stage performance, and theatrical productions",
-        "schedule": "Tuesdays and Fridays, 3:30 PM - 5:00 PM",
-        "max_participants": 20,
-        "participants": ["isabella@mergington.edu", "jacob@mergington.edu"]
-    },
-    "Science Olympiad": {
-        "description": "Competitive science events and STEM problem solving",
-        "schedule": "Wednesdays, 3:30 PM - 5:00 PM",
-        "max_participants": 16,
-        "participants": ["ava@mergington.edu", "william@mergington.edu"]
-    },
-    "Debate Team": {
-        "description": "Develop critical thinking and public speaking skills",
-        "schedule": "Mondays, 3:30 PM - 5:00 PM",
-        "max_participants": 14,
-        "participants": ["grace@mergington.edu"]
-    }
-}
+static_assets = StaticAssets(current_dir / "static")
+app.mount("/static", static_assets, name="static")
+
+# Several workers (uvicorn --workers N) share state through the writer
+# process started with ``python src/writer.py``; each worker keeps a replica
+writer_socket = os.environ.get("MERGINGTON_WRITER_SOCKET")
+
+# Storage backend: "memory" (the default, nothing survives a restart), "wal"
+# or "sqlite"; durable backends keep their files in MERGINGTON_DATA_DIR
+storage_kind = os.environ.get("MERGINGTON_STORAGE", "memory")
+data_dir = Path(os.environ.get("MERGINGTON_DATA_DIR", current_dir.parent / "data"))
+
+# The school served by the routes without a /schools/{school_id} prefix
+DEFAULT_SCHOOL_ID = "mergington"
+
+# Waitlist promotions are announced off the request path; with several
+# workers the writer process does this instead
+notifications = None if writer_socket else NotificationQueue()
+
+
+def school_data_dir(school_id):
+    # The default school keeps the data directory it has always used
+    return data_dir if school_id == DEFAULT_SCHOOL_ID else data_dir / "schools" / school_id
+
+
+def open_school(school_id):
+    """Build a school from its storage; the default school is seeded on first start."""
+    if writer_socket:
+        # The writer owns storage; replicas persist nothing themselves
+        return School(school_id, ReplicaStore(writer_socket), open_backend("memory", None))
+    backend = open_backend(storage_kind, school_data_dir(school_id))
+    store = ActivityStore(backend=backend)
+    if not store.recover() and school_id == DEFAULT_SCHOOL_ID:
+        store.update(SEED_ACTIVITIES)
+    notify_waitlist_changes(store, notifications,
+                            None if school_id == DEFAULT_SCHOOL_ID else school_id)
+    return School(school_id, store, backend)
+
+
+def known_schools():
+    """The default school and every school with a data directory."""
+    known = {DEFAULT_SCHOOL_ID}
+    schools_dir = data_dir / "schools"
+    if storage_kind != "memory" and not writer_socket and schools_dir.is_dir():
+        known.update(path.name for path in schools_dir.iterdir()
+                     if path.is_dir() and valid_school_id(path.name))
+    return known
+
+
+# Every school of the district, each loaded on its first request. The writer
+# process serves a single store, so with several workers only the default
+# school is available. Past MERGINGTON_MAX_LOADED_SCHOOLS ("off" for no
+# cap), idle schools are closed; schools kept only in memory would lose
+# their data, so they are never closed.
+max_loaded = os.environ.get("MERGINGTON_MAX_LOADED_SCHOOLS", "100").strip().lower()
+schools = SchoolRegistry(
+    open_school, known_schools(),
+    max_loaded=None if max_loaded in ("", "off", "0") or storage_kind == "memory" else int(max_loaded),
+    pinned={DEFAULT_SCHOOL_ID},
+)
+
+# The default school is loaded up front; these names are its store, indexes
+# and caches
+default_school = schools.get(DEFAULT_SCHOOL_ID)
+activities = default_school.activities
+async_activities = default_school.async_activities
+activities_cache = default_school.activities_cache
+change_feed = default_school.change_feed
+schedule_index = default_school.schedule_index
+activity_listing = default_school.activity_listing
+search_index = default_school.search_index
+enrollment_analytics = default_school.analytics
+
+# Prometheus metrics served on GET /metrics
+metrics_registry = Registry()
+http_metrics = HTTPMetrics(metrics_registry)
+activity_metrics = ActivityMetrics(metrics_registry, activities)
+
+# Set MERGINGTON_PROFILE_SLOW_MS to dump folded stacks of slower requests
+# into MERGINGTON_PROFILE_DIR
+slow_request_ms = os.environ.get("MERGINGTON_PROFILE_SLOW_MS")
+slow_request_profiler = SlowRequestProfiler(
+    os.environ.get("MERGINGTON_PROFILE_DIR", current_dir.parent / "data" / "profiles"),
+    float(slow_request_ms) / 1000,
+) if slow_request_ms else None
+app.add_middleware(MetricsMiddleware, metrics=http_metrics, profiler=slow_request_profiler)
+
+# Token buckets that shed signup storms, per client address and per student.
+# MERGINGTON_RATE_LIMIT and MERGINGTON_EMAIL_RATE_LIMIT take "rate/burst"
+# (tokens per second and bucket size) or "off". The per-client limit is
+# generous because a whole school may share one address.
+client_rate = parse_rate(os.environ.get("MERGINGTON_RATE_LIMIT", "100/500"))
+client_rate_limiter = RateLimiter(*client_rate) if client_rate else None
+email_rate = parse_rate(os.environ.get("MERGINGTON_EMAIL_RATE_LIMIT", "2/10"))
+email_rate_limiter = RateLimiter(*email_rate) if email_rate else None
+
+
+def rate_limit_wait(request, email):
+    """Spend a token for the client and the student; return the seconds to wait or 0."""
+    client = request.client.host if request.client else None
+    for limiter, key in ((client_rate_limiter, client), (email_rate_limiter, email)):
+        if limiter is not None:
+            wait = limiter.acquire(key)
+            if wait:
+                return wait
+    return 0
+
+
+def check_rate_limits(request, email):
+    """Refuse the request with a 429 if the client or student is over their rate."""
+    wait = rate_limit_wait(request, email)
+    if wait:
+        raise HTTPException(status_code=429, detail="Too many requests",
+                            headers={"Retry-After": str(math.ceil(wait))})
+
+
+def charge_signups(request, operations):
+    """Check the rate limits once per signup in a batch.
+
+    Returns a ``RateLimitedError`` for each signup that is over a limit and
+    ``None`` for every other operation; removals are never limited.
+    """
+    errors = []
+    for op, _, email in operations:
+        wait = rate_limit_wait(request, email) if op == "signup" else 0
+        errors.append(RateLimitedError(wait) if wait else None)
+    return errors
+
+
+# Responses to mutations sent with an Idempotency-Key header, replayed to
+# retries for MERGINGTON_IDEMPOTENCY_TTL seconds ("off" to ignore the header)
+idempotency_ttl = os.environ.get("MERGINGTON_IDEMPOTENCY_TTL", "86400").strip().lower()
+idempotency_cache = (None if idempotency_ttl in ("", "off", "0")
+                     else IdempotencyCache(ttl=float(idempotency_ttl)))
+
+# Longest Idempotency-Key accepted; clients typically send a UUID
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+async def idempotent(request, mutate):
+    """Answer ``await mutate()`` once per client and ``Idempotency-Key`` header.
+
+    ``mutate`` returns the response content or raises ``HTTPException``.
+    Retries with the same key get the first response back, errors included,
+    marked with ``Idempotent-Replayed: true``. A 429 never reached the store,
+    so it is not kept and a retry is tried afresh.
+    """
+    key = request.headers.get("idempotency-key")
+    if key is None or idempotency_cache is None:
+        return await mutate()
+    if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(status_code=400,
+                            detail=f"Idempotency-Key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters")
+
+    async def run():
+        try:
+            status_code, content = 200, await mutate()
+        except HTTPException as error:
+            if error.status_code == 429:
+                raise
+            status_code, content = error.status_code, {"detail": error.detail}
+        return StoredResponse(status_code, encode_json(content))
+
+    fingerprint = (request.method, request.url.path, request.url.query)
+    client = request.client.host if request.client else None
+    try:
+        stored, replayed = await idempotency_cache.run((client, key), fingerprint, run)
+    except IdempotencyKeyReusedError:
+        raise HTTPException(status_code=422,
+                            detail="Idempotency-Key was already used for a different request")
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
+    return Response(stored.body, status_code=stored.status_code, media_type="application/json",
+                    headers=headers)
+
+
+# Activity and student routes, served for the default school at the root and
+# for any school under /schools/{school_id}
+router = APIRouter()
+
+
+async def school_for(request):
+    """Return the school a request is for, loading it on first use."""
+    school_id = request.path_params.get("school_id", DEFAULT_SCHOOL_ID)
+    school = schools.loaded(school_id)
+    if school is None:
+        try:
+            # Loading recovers the store from storage
+            school = await run_in_threadpool(schools.get, school_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="School not found")
+    return school
+
+
+def school_path_param(school_id: str = PathParam(pattern=SCHOOL_ID_PATTERN)):
+    # Validates and documents the prefix of the per-school routes
+    return school_id
 
 
 @app.get("/")
-def root():
+async def root():
     return RedirectResponse(url="/static/index.html")
 
 
-@app.get("/activities")
-def get_activities():
-    return activities
+@app.get("/metrics")
+async def get_metrics():
+    """Request and activity metrics in the Prometheus text format"""
+    # Async so the threadpool collector runs on the event loop
+    return Response(metrics_registry.render(), media_type=CONTENT_TYPE)
 
 
-@app.post("/activities/{activity_name}/signup")
-def signup_for_activity(activity_name: str, email: str):
-    """Sign up a student for an activity"""
-    # Validate activity exists
-    if activity_name not in activities:
-        raise HTTPException(status_code=404, detail="Activity not found")
+@app.get("/schools")
+async def list_schools():
+    """List the district's schools and which of them are loaded"""
+    return {"schools": schools.ids(), "loaded": schools.loaded()}
+
+
+@app.post("/schools/{school_id}", status_code=201)
+async def create_school(school_id: str = PathParam(pattern=SCHOOL_ID_PATTERN)):
+    """Create an empty school, served under ``/schools/{school_id}``"""
+    if writer_socket:
+        raise HTTPException(status_code=501, detail="Schools cannot be created with several workers")
+    if school_id in schools:
+        raise HTTPException(status_code=409, detail="School already exists")
+    if storage_kind != "memory":
+        # Its data directory is how the school is found again after a restart
+        await run_in_threadpool(school_data_dir(school_id).mkdir, parents=True, exist_ok=True)
+    if not schools.add(school_id):
+        raise HTTPException(status_code=409, detail="School already exists")
+    return {"message": f"Created school {school_id}"}
+
+
+@router.get("/activities", response_model=dict[str, ActivityDetails] | ActivityPage)
+async def get_activities(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    day: str | None = None,
+    starts_after: str | None = None,
+    ends_before: str | None = None,
+    has_spots: bool | None = None,
+    q: str | None = None,
+    fields: str | None = None,
+):
+    """List activities
+
+    Without query parameters every activity is returned with its full
+    roster, keyed by name. Any listing parameter switches to a page of
+    ``{"items": [...], "next_cursor": ...}`` in name order, where items
+    leave out the roster unless ``fields`` asks for ``participants``.
+    ``starts_after`` and ``ends_before`` (e.g. "4 PM") narrow ``day``.
+    """
+    school = await school_for(request)
+    params = (limit, cursor, day, starts_after, ends_before, has_spots, q, fields)
+    if any(param is not None for param in params):
+        try:
+            # Filtering reads every activity under its lock
+            page = await run_in_threadpool(
+                school.activity_listing.page, limit=limit or 50, cursor=cursor, day=day,
+                starts_after=starts_after, ends_before=ends_before, has_spots=has_spots, q=q,
+                fields=fields)
+        except ListingError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+        return JSONBytesResponse(page)
+
+    # Concurrent requests after a change share one rebuild
+    cached = await school.activities_cache.get_async()
+    # Clients must revalidate, but an unchanged list costs a 304 and no body.
+    # X-Activities-Version is where a client should resume the change feed.
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache",
+               "X-Activities-Version": str(cached.version)}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
 
-    # Get the specific activity
-    activity = activities[activity_name]
 
-    # Validate student is not already signed up
-    if email in activity["participants"]:
-        raise HTTPException(status_code=400, detail="Student already signed up for this activity")
-    
-    # Add student
-    activity["participants"].append(email)
-    return {"message": f"Signed up {email} for {activity_name}"}
+@router.get("/activities/search", response_model=SearchResults)
+async def search_activities(request: Request, q: str, limit: int = Query(10, ge=1, le=100)):
+    """Search activity names and descriptions, best matches first"""
+    school = await school_for(request)
+    results = []
+    for name, score in school.search_index.search(q, limit=limit):
+        activity = school.activities.get(name)
+        if activity is not None:
+            results.append(SearchResult(name, activity.description, activity.spots_left, score))
+    return JSONBytesResponse(SearchResults(q, results))
 
 
-@app.delete("/activities/{activity_name}/participants/{email}")
-def remove_participant(activity_name: str, email: str):
-    """Remove a participant from an activity"""
-    # Validate activity exists
-    if activity_name not in activities:
+@router.get("/activities/stream")
+async def stream_activities(request: Request, since: int | None = None):
+    """Stream activity changes as Server-Sent Events"""
+    school = await school_for(request)
+    # Browsers send the id of the last event they saw when reconnecting
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id is not None and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        stream_changes(school.change_feed, since, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/activities/{activity_name}/participants", response_model=ParticipantsPage)
+async def get_participants(request: Request, activity_name: str,
+                           limit: int = Query(100, ge=1, le=1000), cursor: str | None = None):
+    """List an activity's participants in sign-up order, a page at a time"""
+    school = await school_for(request)
+    try:
+        page = await school.async_activities.read(
+            activity_name, school.activity_listing.participants_page, activity_name, limit, cursor)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Activity not found")
+    except ListingError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return JSONBytesResponse(page)
+
+
+# Status code and detail reported for each store error and refused signup
+ERROR_RESPONSES = {
+    ActivityNotFoundError: (404, "Activity not found"),
+    AlreadySignedUpError: (400, "Student already signed up for this activity"),
+    ActivityFullError: (400, "Activity is full"),
+    NotSignedUpError: (404, "Participant not found in this activity"),
+    ScheduleConflictError: (409, "Schedule conflicts with {conflicts}"),
+    AlreadyWaitlistedError: (400, "Student already on the waitlist"),
+    NotWaitlistedError: (404, "Student not on the waitlist"),
+    SpotsAvailableError: (400, "Activity has open spots; sign up instead"),
+    RateLimitedError: (429, "Too many requests"),
+}
+
+
+def error_response(error):
+    """Return the status code and detail for a store error."""
+    status_code, detail = ERROR_RESPONSES[type(error)]
+    if isinstance(error, ScheduleConflictError):
+        detail = detail.format(conflicts=", ".join(error.conflicts))
+    return status_code, detail
+
+
+def http_error(error):
+    """Translate a store error into the matching HTTPException."""
+    status_code, detail = error_response(error)
+    return HTTPException(status_code=status_code, detail=detail)
+
+
+@router.post("/activities/{activity_name}/signup")
+async def signup_for_activity(activity_name: str, email: str, request: Request):
+    """Sign up a student for an activity
+
+    Send an ``Idempotency-Key`` header to make retries safe.
+    """
+    school = await school_for(request)
+
+    async def sign_up():
+        check_rate_limits(request, email)
+        # The duplicate and capacity checks happen atomically with the insert
+        try:
+            await school.async_activities.add_participant(activity_name, email)
+        except (ActivityNotFoundError, AlreadySignedUpError, ActivityFullError,
+                ScheduleConflictError) as error:
+            raise http_error(error)
+        return {"message": f"Signed up {email} for {activity_name}"}
+
+    return await idempotent(request, sign_up)
+
+
+@router.delete("/activities/{activity_name}/participants/{email}")
+async def remove_participant(activity_name: str, email: str, request: Request):
+    """Remove a participant from an activity
+
+    Send an ``Idempotency-Key`` header to make retries safe.
+    """
+    school = await school_for(request)
+
+    async def remove():
+        try:
+            await school.async_activities.remove_participant(activity_name, email)
+        except (ActivityNotFoundError, NotSignedUpError) as error:
+            raise http_error(error)
+        return {"message": f"Removed {email} from {activity_name}"}
+
+    return await idempotent(request, remove)
+
+
+@router.post("/activities/{activity_name}/waitlist")
+async def join_waitlist(activity_name: str, email: str, request: Request):
+    """Join the waitlist of a full activity
+
+    The student is signed up automatically, in the order they joined, as
+    places are freed. Send an ``Idempotency-Key`` header to make retries
+    safe.
+    """
+    school = await school_for(request)
+
+    async def join():
+        check_rate_limits(request, email)
+        try:
+            position = await school.async_activities.join_waitlist(activity_name, email)
+        except (ActivityNotFoundError, AlreadySignedUpError, AlreadyWaitlistedError,
+                SpotsAvailableError, ScheduleConflictError) as error:
+            raise http_error(error)
+        return {"message": f"Added {email} to the waitlist for {activity_name}", "position": position}
+
+    return await idempotent(request, join)
+
+
+@router.get("/activities/{activity_name}/waitlist/{email}")
+async def get_waitlist_position(activity_name: str, email: str, request: Request):
+    """Get a student's position on an activity's waitlist"""
+    school = await school_for(request)
+    try:
+        position, waiting = await school.async_activities.waitlist_position(activity_name, email)
+    except (ActivityNotFoundError, NotWaitlistedError) as error:
+        raise http_error(error)
+    return {"activity": activity_name, "email": email, "position": position, "waiting": waiting}
+
+
+@router.delete("/activities/{activity_name}/waitlist/{email}")
+async def leave_waitlist(activity_name: str, email: str, request: Request):
+    """Leave an activity's waitlist
+
+    Send an ``Idempotency-Key`` header to make retries safe.
+    """
+    school = await school_for(request)
+
+    async def leave():
+        try:
+            await school.async_activities.leave_waitlist(activity_name, email)
+        except (ActivityNotFoundError, NotWaitlistedError) as error:
+            raise http_error(error)
+        return {"message": f"Removed {email} from the waitlist for {activity_name}"}
+
+    return await idempotent(request, leave)
+
+
+@router.get("/students/{email}/activities", response_model=StudentActivities)
+async def get_student_activities(email: str, request: Request):
+    """List the activities a student is signed up for
+
+    Answered from the reverse index, so the cost depends only on how many
+    activities the student is on. A student on none gets an empty list.
+    """
+    school = await school_for(request)
+    results = []
+    for name in sorted(school.activities.activities_for(email)):
+        activity = school.activities.get(name)
+        if activity is not None:
+            results.append(StudentActivity(name, activity.description, activity.schedule,
+                                           activity.spots_left))
+    return JSONBytesResponse(StudentActivities(email, results))
+
+
+@router.delete("/students/{email}/activities")
+async def unenroll_student(email: str, request: Request):
+    """Remove a student from every activity they are signed up for"""
+    school = await school_for(request)
+    removed = await school.async_activities.unenroll(email)
+    return {"message": f"Removed {email} from {len(removed)} activities", "activities": removed}
+
+
+@router.get("/analytics", response_model=EnrollmentSummary)
+async def get_analytics(request: Request, top: int = Query(10, ge=1, le=100)):
+    """Enrollment totals, enrollments per student and the top activities
+
+    ``most_popular`` ranks activities by students enrolled plus waiting,
+    ``most_oversubscribed`` by waitlist length. Answered from rollups kept
+    up to date on every change, so the cost does not grow with enrollment.
+    """
+    school = await school_for(request)
+    return JSONBytesResponse(school.analytics.summary(top))
+
+
+@router.get("/analytics/activities", response_model=list[ActivityFill])
+async def get_activity_fill(request: Request):
+    """Fill rate and waitlist length of every activity, in name order"""
+    school = await school_for(request)
+    return JSONBytesResponse(school.analytics.activity_fill())
+
+
+@router.get("/analytics/timeseries", response_model=EnrollmentSeries)
+async def get_enrollment_series(request: Request,
+                                resolution: Literal["minute", "hour"] = "minute"):
+    """Sign-ups and removals per minute over the last day, or per hour over 30 days"""
+    school = await school_for(request)
+    return JSONBytesResponse(school.analytics.series(resolution))
+
+
+class BatchRequest(BaseModel):
+    # Items are validated as plain dicts, not a model instance each
+    operations: list[BatchItem]
+    atomic: bool = False
+
+
+# Operations applied per lock acquisition when streaming NDJSON
+NDJSON_CHUNK_SIZE = 1000
+
+
+def batch_results(operations, applied, errors):
+    """Build the per-item results of a batch in request order."""
+    results = []
+    for (op, name, email), error in zip(operations, errors):
+        result = {"op": op, "activity": name, "email": email}
+        if error is not None:
+            result["status"], result["detail"] = error_response(error)
+        elif not applied:
+            # Valid on its own, but rolled back with the rest of the batch
+            result["status"], result["detail"] = 409, "Not applied"
+        else:
+            result["status"] = 200
+            result["message"] = (f"Signed up {email} for {name}" if op == "signup"
+                                 else f"Removed {email} from {name}")
+        results.append(result)
+    return results
+
+
+async def apply_limited_batch(school, request, operations, atomic):
+    """Apply a batch, leaving out signups over the rate limits.
+
+    Refused signups get a ``RateLimitedError``; in an atomic batch they
+    fail the whole batch, as any other error would.
+    """
+    refused = charge_signups(request, operations)
+    if not any(refused):
+        return await school.async_activities.apply_batch(operations, atomic)
+    if atomic:
+        return False, refused
+    allowed = [operation for operation, error in zip(operations, refused) if error is None]
+    applied, errors = await school.async_activities.apply_batch(allowed, atomic)
+    errors = iter(errors)
+    return applied, [error if error is not None else next(errors) for error in refused]
+
+
+@router.post("/activities/batch")
+async def apply_batch(batch: BatchRequest, request: Request, response: Response):
+    """Apply many signups and removals in one request
+
+    Each signup is charged to the rate limits; those over a limit get a
+    429 result. With ``atomic`` set, either every operation is applied or
+    none is and the response status is 409, or 429 with ``Retry-After`` if
+    a signup was over a limit.
+    """
+    school = await school_for(request)
+    operations = [(item["op"], item["activity"], item["email"]) for item in batch.operations]
+    applied, errors = await apply_limited_batch(school, request, operations, batch.atomic)
+    if not applied:
+        waits = [error.retry_after for error in errors if isinstance(error, RateLimitedError)]
+        response.status_code = 429 if waits else 409
+        if waits:
+            response.headers["Retry-After"] = str(math.ceil(max(waits)))
+    return {"applied": applied, "results": batch_results(operations, applied, errors)}
+
+
+@router.get("/activities/export")
+async def export_activities(request: Request, format: Literal["csv", "ndjson"] = "csv"):
+    """Stream every activity and its roster as CSV or NDJSON
+
+    Rosters are copied a page at a time, so memory stays bounded however
+    large they are. The output can be loaded again with
+    ``POST /activities/import``.
+    """
+    school = await school_for(request)
+    return StreamingResponse(
+        write_records(export_records(school.activities), format), media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="activities.{format}"'},
+    )
+
+
+@router.post("/activities/import")
+async def import_activities(request: Request, format: Literal["csv", "ndjson"] = "ndjson"):
+    """Create activities and sign students up from a CSV or NDJSON stream
+
+    Records are parsed as the body arrives and enrollments are applied in
+    batches, each under a single lock acquisition. Missing activities are
+    created; existing ones are left alone. Each enrollment is charged to the
+    rate limits like a signup. Returns counts, the first failed records and
+    the throughput.
+    """
+    school = await school_for(request)
+    chunks = request.stream()
+
+    async def next_chunk():
+        return await anext(chunks, None)
+
+    def body():
+        # The import runs in a worker thread; the body is read on the loop
+        while (chunk := from_thread.run(next_chunk)) is not None:
+            yield chunk
+
+    def run():
+        records = read_records(decode_lines(body()), format)
+        return import_records(school.activities, records,
+                              describe_error=lambda error: error_response(error)[1],
+                              admit=lambda operations: charge_signups(request, operations))
+
+    return await run_in_threadpool(run)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streaming response whose body is produced while the request is read.
+
+    ``StreamingResponse`` may listen for client disconnects on ``receive``,
+    which would swallow request body messages the generator still needs.
+    This variant leaves ``receive`` to the generator alone.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def read_ndjson_operations(request):
+    """Yield operation tuples from an NDJSON body as it arrives.
+
+    Malformed lines are yielded as 422 result dicts instead.
+    """
+    buffer, line_number = b"", 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_ndjson_line(line, line_number)
+    if buffer.strip():
+        yield _parse_ndjson_line(buffer, line_number + 1)
+
+
+def _parse_ndjson_line(line, line_number):
+    try:
+        item = batch_item_adapter.validate_json(line)
+    except ValueError as error:
+        return {"line": line_number, "status": 422, "detail": str(error).splitlines()[0]}
+    return item["op"], item["activity"], item["email"]
+
+
+async def apply_ndjson_chunk(school, request, items, atomic):
+    """Apply parsed NDJSON items and return their results as NDJSON."""
+    operations = [item for item in items if isinstance(item, tuple)]
+    if atomic and len(operations) < len(items):
+        # A malformed line fails the whole transaction
+        applied, errors = False, [None] * len(operations)
+    else:
+        applied, errors = await apply_limited_batch(school, request, operations, atomic)
+    results = iter(batch_results(operations, applied, errors))
+    return "".join(
+        json.dumps(next(results) if isinstance(item, tuple) else item, ensure_ascii=False) + "\n"
+        for item in items
+    )
+
+
+@router.post("/activities/batch/ndjson")
+async def apply_batch_ndjson(request: Request, atomic: bool = False):
+    """Apply a newline-delimited JSON stream of signups and removals
+
+    Operations are parsed as the body arrives and applied in chunks, each
+    under a single lock acquisition; per-item results stream back as NDJSON
+    in the same order. With ``atomic`` set the whole stream is applied as a
+    single all-or-nothing batch once it has been read.
+    """
+    school = await school_for(request)
+
+    async def results():
+        pending = []
+        async for item in read_ndjson_operations(request):
+            pending.append(item)
+            if not atomic and len(pending) >= NDJSON_CHUNK_SIZE:
+                yield await apply_ndjson_chunk(school, request, pending, atomic=False)
+                pending = []
+        if pending:
+            yield await apply_ndjson_chunk(school, request, pending, atomic)
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
 
-    # Get the specific activity
-    activity = activities[activity_name]
-    
-    # Validate participant is signed up
-    if email not in activity["participants"]:
-        raise HTTPException(status_code=404, detail="Participant not found in this activity")
-    
-    # Remove participant
-    activity["participants"].remove(email)
-    return {"message": f"Removed {email} from {activity_name}"}
+app.include_router(router)
+app.include_router(router, prefix="/schools/{school_id}", dependencies=[Depends(school_path_param)])
@@ -0,0 +1,163 @@
+"""
+Static asset pipeline for the frontend served under ``/static``.
+
+``StaticAssets`` reads the static directory once at startup. Each file is
+published under a content-hashed name as well as its own name, e.g.
+``styles.3f2a9c81d0.css``. HTML pages (``index.html``, ``bench.html``) keep
+their names and are rewritten to point at the hashed names. Gzip and, when
+the optional ``brotli`` package is installed, Brotli variants are built once
+and kept in memory next to the original bytes.
+
+A hashed name can never change content, so it is served with
+``Cache-Control: immutable`` and a one-year lifetime: a repeat page load
+fetches it from the browser cache without touching the network. Plain names,
+the HTML pages included, must be revalidated (``no-cache``) so a deploy
+takes effect at once; that costs a 304 with no body. Every response names
+``Accept-Encoding`` in ``Vary`` so shared caches keep the encodings apart.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+
+from starlette.responses import PlainTextResponse, Response
+
+from cache import etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional; gzip alone is still served
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Types worth compressing; images and fonts are compressed already
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# Attribute values in HTML pages that may name an asset
+_REFERENCE = re.compile(r'(?P<attr>\b(?:href|src))="(?P<name>[^"#?:]+)"')
+
+
+def content_type(name):
+    if name.endswith(".js"):
+        return "text/javascript; charset=utf-8"
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return media_type + "; charset=utf-8" if media_type.startswith("text/") else media_type
+
+
+def hashed_name(name, body):
+    """Return ``name`` with a hash of ``body`` before its extension."""
+    digest = hashlib.blake2b(body, digest_size=5).hexdigest()
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+
+
+def parse_accept_encoding(header):
+    """Return the codings a client accepts, from an ``Accept-Encoding`` value."""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class Asset:
+    """One file's bytes in every encoding worth sending, and its validators."""
+
+    __slots__ = ("content_type", "variants", "etag")
+
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        # Best encoding first; identity always last
+        self.variants = []
+        if content_type.startswith(COMPRESSIBLE):
+            if brotli is not None:
+                self._add_variant("br", brotli.compress(body, quality=11), body)
+            self._add_variant("gzip", gzip.compress(body, compresslevel=9, mtime=0), body)
+        self.variants.append((None, body))
+
+    def _add_variant(self, coding, encoded, body):
+        # Tiny files can grow when compressed
+        if len(encoded) < len(body):
+            self.variants.append((coding, encoded))
+
+    def negotiate(self, accept_encoding):
+        """Return ``(coding, body)`` for the best encoding the client accepts."""
+        accepted = parse_accept_encoding(accept_encoding)
+        for coding, body in self.variants:
+            if coding is None or coding in accepted:
+                return coding, body
+
+
+class StaticAssets:
+    """ASGI app serving a directory's files from memory."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        # Public name -> (asset, Cache-Control)
+        self.files = {}
+        # Plain name -> hashed name, as rewritten into the pages
+        self.manifest = {}
+        paths = [path for path in sorted(self.directory.iterdir()) if path.is_file()]
+        pages = [path for path in paths if path.suffix == ".html"]
+        for path in paths:
+            if path.suffix == ".html":
+                continue
+            body = path.read_bytes()
+            asset = Asset(body, content_type(path.name))
+            self.manifest[path.name] = hashed_name(path.name, body)
+            self.files[path.name] = (asset, REVALIDATE)
+            self.files[self.manifest[path.name]] = (asset, IMMUTABLE)
+        for path in pages:
+            html = self.rewrite(path.read_text(encoding="utf-8"))
+            self.files[path.name] = (Asset(html.encode("utf-8"), content_type(path.name)), REVALIDATE)
+
+    def rewrite(self, html):
+        """Point references to known assets at their hashed names."""
+        def replace(match):
+            name = self.manifest.get(match["name"])
+            return f'{match["attr"]}="{name}"' if name else match[0]
+        return _REFERENCE.sub(replace, html)
+
+    async def __call__(self, scope, receive, send):
+        response = self.respond(scope)
+        await response(scope, receive, send)
+
+    def respond(self, scope):
+        if scope["method"] not in ("GET", "HEAD"):
+            return PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        entry = self.files.get(_relative_path(scope))
+        if entry is None:
+            return PlainTextResponse("Not Found", status_code=404)
+        asset, cache_control = entry
+        headers = dict(scope["headers"])
+        coding, body = asset.negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        etag = asset.etag if coding is None else asset.etag[:-1] + "-" + coding + '"'
+        response_headers = {"Cache-Control": cache_control, "ETag": etag, "Vary": "Accept-Encoding"}
+        if coding is not None:
+            response_headers["Content-Encoding"] = coding
+        if etag_matches(headers.get(b"if-none-match", b"").decode("latin-1"), etag):
+            return Response(status_code=304, headers=response_headers)
+        response_headers["Content-Length"] = str(len(body))
+        if scope["method"] == "HEAD":
+            return Response(status_code=200, headers=response_headers, media_type=asset.content_type)
+        return Response(body, headers=response_headers, media_type=asset.content_type)
+
+
+def _relative_path(scope):
+    """The request path below the mount point, e.g. ``app.js``."""
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    return path.lstrip("/")
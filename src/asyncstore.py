@@ -0,0 +1,63 @@
+"""
+Asyncio front end for the roster store.
+
+The endpoints are ``async def``, so they run on the event loop instead of
+each taking one of the threadpool's few threads. The store itself stays
+thread-safe and synchronous: a signup is a handful of dict and set operations
+under an activity lock, far cheaper than a hop to a worker thread and back.
+``AsyncStore`` runs such calls inline, but never lets the loop wait on a
+lock another thread holds or on I/O:
+
+- The activity's lock and the reverse index lock are taken with
+  ``ActivityStore.try_hold``. If another thread holds either, for example an
+  atomic batch of thousands of signups, the call moves to the threadpool and
+  waits there.
+- When writes block once the change is made (a durable backend waiting for
+  its fsync, or a replica waiting on the writer process), writes always run
+  in the threadpool. Group commit still batches concurrent writes, because
+  each one waits in its own thread.
+"""
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class AsyncStore:
+    """Awaitable versions of the ``ActivityStore`` methods the endpoints use."""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def add_participant(self, activity_name, email):
+        await self._write(activity_name, self.store.add_participant, activity_name, email)
+
+    async def remove_participant(self, activity_name, email):
+        await self._write(activity_name, self.store.remove_participant, activity_name, email)
+
+    async def join_waitlist(self, activity_name, email):
+        return await self._write(activity_name, self.store.join_waitlist, activity_name, email)
+
+    async def leave_waitlist(self, activity_name, email):
+        await self._write(activity_name, self.store.leave_waitlist, activity_name, email)
+
+    async def waitlist_position(self, activity_name, email):
+        return await self.read(activity_name, self.store.waitlist_position, activity_name, email)
+
+    async def apply_batch(self, operations, atomic=False):
+        # Batches hold many locks for a long time; never on the loop
+        return await run_in_threadpool(self.store.apply_batch, operations, atomic)
+
+    async def unenroll(self, email):
+        # Locks every activity the student is on, so also not on the loop
+        return await run_in_threadpool(self.store.unenroll, email)
+
+    async def read(self, activity_name, function, *args):
+        """Call ``function(*args)``, which reads ``activity_name`` under its lock."""
+        with self.store.try_hold(activity_name) as held:
+            if held:
+                return function(*args)
+        return await run_in_threadpool(function, *args)
+
+    async def _write(self, activity_name, function, *args):
+        if self.store.writes_block:
+            return await run_in_threadpool(function, *args)
+        return await self.read(activity_name, function, *args)
@@ -0,0 +1,305 @@
+"""
+Streaming bulk import and export of activities and rosters.
+
+Both formats carry the same two kinds of record, one per line or row:
+
+- an activity: ``activity``, ``description``, ``schedule`` and
+  ``max_participants``
+- an enrollment: ``activity`` and ``email``
+
+CSV files have the header ``activity,email,description,schedule,
+max_participants`` and leave the columns a record does not use empty.
+NDJSON lines are objects with just the keys they need. An export writes each
+activity followed by its roster in sign-up order, so the same file imports
+into an empty store unchanged.
+
+Nothing is ever materialized whole. Export copies a roster a page at a time
+under the activity's lock. Import parses records as lines arrive and applies
+enrollments with ``ActivityStore.apply_batch`` in batches of
+``IMPORT_BATCH_SIZE``, each one lock acquisition and one sync, so memory
+stays bounded by the batch size whatever the size of the file.
+
+Run as a script to export from or import into a running server::
+
+    python src/bulk.py export --format csv -o rosters.csv
+    python src/bulk.py --url http://localhost:8000 import rosters.csv
+"""
+
+import argparse
+import codecs
+import csv
+import http.client
+import io
+import json
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+from store import AlreadySignedUpError
+
+FORMATS = ("csv", "ndjson")
+CSV_COLUMNS = ("activity", "email", "description", "schedule", "max_participants")
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# Enrollments applied per batch, each one lock acquisition and one sync
+IMPORT_BATCH_SIZE = 1000
+
+# Participants copied per lock acquisition while exporting
+EXPORT_PAGE_SIZE = 1000
+
+# Failed records described in an import report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+class RecordError(ValueError):
+    """A record could not be parsed or is missing fields."""
+
+
+# Export
+
+def export_records(store):
+    """Yield every activity as a record, each followed by its enrollments."""
+    for name in sorted(store.keys()):
+        activity = store.get(name)
+        if activity is None:
+            continue
+        with activity.lock:
+            record = {"activity": name, "description": activity.description,
+                      "schedule": activity.schedule,
+                      "max_participants": activity.max_participants}
+        yield record
+        after = 0
+        while after is not None:
+            with activity.lock:
+                emails, after = activity.roster.page(after, EXPORT_PAGE_SIZE)
+            for email in emails:
+                yield {"activity": name, "email": email}
+
+
+def write_records(records, fmt, chunk_size=EXPORT_PAGE_SIZE):
+    """Encode records in ``fmt``, yielding text a chunk of records at a time."""
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, CSV_COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write("\n")
+    for count, record in enumerate(records, 1):
+        write(record)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# Import
+
+def decode_lines(chunks):
+    """Split UTF-8 byte chunks into lines, keeping each line's newline."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def read_records(lines, fmt):
+    """Yield ``(line_number, record)`` for each record in ``lines``.
+
+    ``record`` is a dict of the fields present, or a ``RecordError`` for a
+    line that could not be parsed, so one bad line does not end the import.
+    """
+    if fmt == "csv":
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [column.strip().lower() for column in header]
+        if "activity" not in header:
+            yield reader.line_num, RecordError("CSV header must include an activity column")
+            return
+        for row in reader:
+            if not any(row):
+                continue
+            if len(row) > len(header):
+                yield reader.line_num, RecordError("More fields than columns")
+                continue
+            yield reader.line_num, {column: value for column, value in zip(header, row) if value}
+    else:
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield line_number, RecordError(f"Invalid JSON: {error}")
+                continue
+            if not isinstance(record, dict):
+                record = RecordError("Each line must be a JSON object")
+            yield line_number, record
+
+
+def parse_record(record):
+    """Return ``("activity", name, details)`` or ``("signup", name, email)``."""
+    name = record.get("activity")
+    if not isinstance(name, str) or not name.strip():
+        raise RecordError("Missing activity name")
+    email = record.get("email")
+    if email is not None:
+        if not isinstance(email, str) or not email.strip():
+            raise RecordError("Invalid email")
+        return "signup", name, email.strip()
+    details = {}
+    for field in ("description", "schedule"):
+        value = record.get(field)
+        if not isinstance(value, str):
+            raise RecordError(f"Missing {field}")
+        details[field] = value
+    max_participants = record.get("max_participants")
+    if isinstance(max_participants, str) and max_participants.strip().isdigit():
+        # CSV fields are always text
+        max_participants = int(max_participants)
+    if not isinstance(max_participants, int) or isinstance(max_participants, bool) \
+            or max_participants < 0:
+        raise RecordError("max_participants must be a whole number")
+    details["max_participants"] = max_participants
+    return "activity", name, details
+
+
+def import_records(store, records, batch_size=IMPORT_BATCH_SIZE, describe_error=None,
+                   clock=time.perf_counter, admit=None):
+    """Apply ``(line_number, record)`` pairs to ``store``; return a report.
+
+    Activities that do not exist yet are created with an empty roster;
+    existing ones are left as they are. Enrollments are signups, so
+    capacity and schedule checks apply. A student already on the roster
+    counts as ``already_enrolled`` rather than failed, so importing the
+    same file twice is harmless. ``describe_error(error)`` turns a store
+    error into the report's text. ``admit(operations)``, if given, returns
+    an error or ``None`` for each enrollment of a batch; those with an
+    error fail without reaching the store.
+    """
+    describe_error = describe_error or (lambda error: type(error).__name__)
+    report = {"records": 0, "activities_created": 0, "activities_existing": 0,
+              "enrolled": 0, "already_enrolled": 0, "failed": 0, "errors": []}
+    pending = []
+    started = clock()
+
+    def fail(line_number, detail):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line_number, "detail": detail})
+
+    def flush():
+        if not pending:
+            return
+        operations = [operation for _, operation in pending]
+        errors = admit(operations) if admit else [None] * len(operations)
+        _, applied = store.apply_batch([operation for operation, error in zip(operations, errors)
+                                        if error is None])
+        applied = iter(applied)
+        errors = [error if error is not None else next(applied) for error in errors]
+        for (line_number, _), error in zip(pending, errors):
+            if error is None:
+                report["enrolled"] += 1
+            elif isinstance(error, AlreadySignedUpError):
+                report["already_enrolled"] += 1
+            else:
+                fail(line_number, describe_error(error))
+        pending.clear()
+
+    for line_number, record in records:
+        report["records"] += 1
+        try:
+            if isinstance(record, RecordError):
+                raise record
+            kind, name, value = parse_record(record)
+        except RecordError as error:
+            fail(line_number, str(error))
+            continue
+        if kind == "signup":
+            pending.append((line_number, ("signup", name, value)))
+            if len(pending) >= batch_size:
+                flush()
+            continue
+        # Enrollments before this record may be for the activity it defines
+        flush()
+        if name in store:
+            report["activities_existing"] += 1
+        else:
+            store[name] = dict(value, participants=[])
+            report["activities_created"] += 1
+    flush()
+
+    # Enrollment errors are found a batch late
+    report["errors"].sort(key=lambda error: error["line"])
+    report["seconds"] = round(clock() - started, 3)
+    report["records_per_second"] = round(report["records"] / report["seconds"]) if report["seconds"] else None
+    return report
+
+
+# Command line
+
+def _connection(url):
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    return connection_class(parts.netloc), parts.path.rstrip("/")
+
+
+def _read_file(path, size=1 << 16):
+    with open(path, "rb") as file:
+        while chunk := file.read(size):
+            yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of the API")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write every activity and roster")
+    export.add_argument("--format", choices=FORMATS, default="csv")
+    export.add_argument("-o", "--output", help="file to write (default: standard output)")
+    load = commands.add_parser("import", help="create activities and sign students up")
+    load.add_argument("path")
+    load.add_argument("--format", choices=FORMATS,
+                      help="file format (default: from the file extension)")
+    args = parser.parse_args()
+
+    connection, base = _connection(args.url)
+    if args.command == "export":
+        connection.request("GET", f"{base}/activities/export?format={args.format}")
+        response = connection.getresponse()
+        if response.status != 200:
+            sys.exit(f"Export failed: {response.status} {response.read().decode(errors='replace')}")
+        output = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            while chunk := response.read(1 << 16):
+                output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+        return
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    connection.request("POST", f"{base}/activities/import?format={quote(fmt)}",
+                       body=_read_file(args.path), encode_chunked=True,
+                       headers={"Content-Type": MEDIA_TYPES[fmt]})
+    response = connection.getresponse()
+    body = response.read().decode(errors="replace")
+    if response.status != 200:
+        sys.exit(f"Import failed: {response.status} {body}")
+    print(json.dumps(json.loads(body), indent=2))
+
+
+if __name__ == "__main__":
+    main()
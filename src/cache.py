@@ -0,0 +1,113 @@
+"""
+Pre-serialised response cache for ``GET /activities``.
+
+Serialising every activity and participant is by far the most expensive part
+of answering a poll, and the answer only changes when the store does. The
+cache keeps the encoded JSON body together with the store version it was built
+from and rebuilds it only after a mutation has bumped the version. Each body
+carries a strong ETag derived from its bytes, so clients can revalidate with
+``If-None-Match`` and get a 304 without any body at all.
+
+On the event loop, ``get_async`` answers from the cache without leaving the
+loop and rebuilds in the threadpool. Requests that arrive during a rebuild
+await the same one (``SingleFlight``) instead of each taking a thread just to
+wait for the lock.
+"""
+
+import asyncio
+import hashlib
+import threading
+
+from fastapi.concurrency import run_in_threadpool
+
+from serialization import encode_json
+
+
+class CachedBody:
+    """An encoded response body and its validators."""
+
+    __slots__ = ("version", "body", "etag")
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class SerializedCache:
+    """Caches ``render()`` encoded as JSON until ``store.version`` changes."""
+
+    def __init__(self, store, render):
+        self._store = store
+        self._render = render
+        self._current = None
+        # Concurrent misses wait for one rebuild instead of all rebuilding
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get(self):
+        """Return an up-to-date ``CachedBody``."""
+        current = self._current
+        if current is not None and current.version == self._store.version:
+            return current
+        with self._lock:
+            current = self._current
+            version = self._store.version
+            if current is None or current.version != version:
+                # Reading the version first means a mutation racing with the
+                # rebuild leaves the entry stale, never wrongly fresh.
+                current = CachedBody(version, encode_json(self._render()))
+                self._current = current
+            return current
+
+    async def get_async(self):
+        """Return an up-to-date ``CachedBody`` without blocking the event loop."""
+        current = self._current
+        if current is not None and current.version == self._store.version:
+            return current
+        return await self._flight.run(self._store.version, self.get)
+
+
+class SingleFlight:
+    """Runs a blocking call once for all concurrent callers with the same key.
+
+    The first caller for a key starts ``function`` in the threadpool; callers
+    arriving before it finishes await the same result. Calls are only shared
+    within one event loop.
+    """
+
+    def __init__(self):
+        # (loop, key) -> future of the call in progress
+        self._calls = {}
+        self.shared = 0
+
+    async def run(self, key, function, *args):
+        """Await ``function(*args)``, joining a call already running for ``key``."""
+        call_key = (asyncio.get_running_loop(), key)
+        future = self._calls.get(call_key)
+        if future is None:
+            future = asyncio.ensure_future(run_in_threadpool(function, *args))
+            self._calls[call_key] = future
+            future.add_done_callback(lambda _: self._calls.pop(call_key, None))
+        else:
+            self.shared += 1
+        # A cancelled caller must not cancel the call the others are awaiting
+        return await asyncio.shield(future)
+
+
+def etag_matches(if_none_match, etag):
+    """Return whether an ``If-None-Match`` header matches ``etag``.
+
+    Uses the weak comparison RFC 9110 prescribes for ``If-None-Match``.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
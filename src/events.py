@@ -0,0 +1,169 @@
+"""
+Change feed for the activities API.
+
+``ChangeFeed`` listens to the store and turns every mutation into a small
+delta (participant added or removed, waitlist joined or left, activity
+updated or removed) numbered with the store version it produced. Recent
+deltas are kept in a ring buffer so a client that reconnects can resume from
+the last sequence number it saw; live deltas are fanned out to every
+subscriber's asyncio queue.
+
+``GET /activities/stream`` serves the feed as Server-Sent Events.
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+
+
+class Subscription:
+    """A subscriber's queue of deltas, fed from the store's threads."""
+
+    def __init__(self, loop, max_pending):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        # Set when the subscriber fell too far behind and missed deltas
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ChangeFeed:
+    """In-process pub/sub of store deltas with a bounded replay history."""
+
+    def __init__(self, store, history=4096, max_pending=1024):
+        self._store = store
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        store.add_listener(self._on_change)
+
+    @property
+    def version(self):
+        return self._store.version
+
+    def subscribe(self, since=None):
+        """Register a subscriber on the running event loop.
+
+        Returns ``(subscription, backlog)``. ``backlog`` holds the deltas
+        after sequence number ``since``, or is ``None`` if they are no
+        longer in the history and the client has to reload everything.
+        """
+        subscription = Subscription(asyncio.get_running_loop(), self._max_pending)
+        with self._lock:
+            backlog = [] if since is None else self._since(since)
+            self._subscribers.add(subscription)
+        return subscription, backlog
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _since(self, seq):
+        version = self._store.version
+        if seq > version:
+            # A sequence number from before a restart
+            return None
+        if seq == version:
+            return []
+        if not self._history or self._history[0]["seq"] > seq + 1:
+            return None
+        return [event for event in self._history if event["seq"] > seq]
+
+    def _on_change(self, operation, version):
+        if operation.get("reload"):
+            # A replica reloading its snapshot; the reset that follows covers it
+            return
+        event = self._delta(operation, version)
+        with self._lock:
+            if event["type"] == "reset":
+                # Deltas from before a reset cannot be resumed from
+                self._history.clear()
+            else:
+                self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down
+                self.unsubscribe(subscription)
+
+    def _delta(self, operation, version):
+        kind = operation["op"]
+        if kind == "reset":
+            return {"type": "reset", "version": version}
+        name = operation["activity"]
+        if kind == "delete":
+            return {"seq": version, "type": "activity_removed", "activity": name}
+        if kind == "put":
+            return {"seq": version, "type": "activity_updated", "activity": name,
+                    "data": operation["data"]}
+        activity = self._store[name]
+        if kind in ("waitlist", "unwaitlist"):
+            return {
+                "seq": version,
+                "type": "waitlist_joined" if kind == "waitlist" else "waitlist_left",
+                "activity": name,
+                "email": operation["email"],
+                "waitlisted": len(activity.waitlist),
+            }
+        event = {
+            "seq": version,
+            "type": "participant_removed" if kind == "remove" else "participant_added",
+            "activity": name,
+            "email": operation["email"],
+            "participants": len(activity.roster),
+            "spots_left": activity.spots_left,
+        }
+        if kind == "promote":
+            event["from_waitlist"] = True
+            event["waitlisted"] = len(activity.waitlist)
+        return event
+
+
+def format_sse(event, event_type=None):
+    """Encode a delta as a Server-Sent Events message."""
+    lines = []
+    if "seq" in event:
+        lines.append(f"id: {event['seq']}")
+    if event_type:
+        lines.append(f"event: {event_type}")
+    lines.append("data: " + json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_changes(feed, since, is_disconnected, keepalive=15.0):
+    """Yield SSE messages for ``feed`` until the client goes away.
+
+    A ``reset`` message, carrying the current version, tells the client it
+    missed deltas and must reload the full list before continuing.
+    """
+    subscription, backlog = feed.subscribe(since)
+    try:
+        if backlog is None:
+            yield format_sse({"version": feed.version}, "reset")
+            backlog = []
+        for event in backlog:
+            yield format_sse(event)
+        while not await is_disconnected():
+            if subscription.overflowed:
+                yield format_sse({"version": feed.version}, "reset")
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event["type"] == "reset":
+                yield format_sse({"version": event["version"]}, "reset")
+                continue
+            yield format_sse(event)
+    finally:
+        feed.unsubscribe(subscription)
@@ -0,0 +1,125 @@
+"""
+Idempotency keys for retried mutations.
+
+A client that times out cannot tell whether its signup went through, so it
+retries, and the retry used to fail with "already signed up" or
+"participant not found". A client that sends an ``Idempotency-Key`` header
+instead gets the first attempt's response back for every retry with the
+same key, without the mutation running again.
+
+- Finished results sit in a dict in the order they finished, for ``ttl``
+  seconds. Expired results are dropped from the front as new ones arrive,
+  and the oldest are dropped early once there are ``max_keys``, so the
+  cache is bounded whatever clients send.
+- A retry that arrives while the first attempt is still running awaits it
+  instead of racing it into the store.
+- A key reused for a different request (another method, path or query) is
+  refused rather than answered with an unrelated response.
+- If the call raises, nothing is kept, and a retry (or a duplicate that
+  was waiting) runs it again. The endpoints return their errors as
+  results, except those not caused by the request itself, such as a 429.
+
+Callers scope keys to the client that sent them, so two clients that pick
+the same key do not see each other's responses. Keys are remembered per
+process. With several workers, a retry that lands on another worker runs
+again and gets the store's usual duplicate error.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+
+
+class IdempotencyKeyReusedError(Exception):
+    """The key was first used for a different request."""
+
+
+class StoredResponse:
+    """A response kept for replaying."""
+
+    __slots__ = ("status_code", "body")
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+
+class IdempotencyCache:
+    """Results of calls by idempotency key, each computed once."""
+
+    def __init__(self, ttl=86_400, max_keys=100_000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.replayed = 0
+        self._clock = clock
+        # key -> (expiry time, fingerprint, StoredResponse), oldest first
+        self._done = OrderedDict()
+        # key -> (fingerprint, future) for calls still running; the futures
+        # are thread-safe, so duplicates may wait on them from any event loop
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._done)
+
+    async def run(self, key, fingerprint, function):
+        """Return ``(response, replayed)`` for ``await function()`` under ``key``.
+
+        ``fingerprint`` identifies the request; reusing ``key`` with another
+        one raises ``IdempotencyKeyReusedError``. ``function`` returns a
+        ``StoredResponse``. ``key`` may be any hashable value.
+        """
+        with self._lock:
+            self._expire(self._clock())
+            done = self._done.get(key)
+            if done is not None:
+                self._check(done[1], fingerprint)
+                self.replayed += 1
+                return done[2], True
+            running = self._running.get(key)
+            if running is None:
+                future = concurrent.futures.Future()
+                self._running[key] = (fingerprint, future)
+            else:
+                self._check(running[0], fingerprint)
+
+        if running is not None:
+            # A cancelled retry must not cancel the attempt it waits on
+            await asyncio.shield(asyncio.wrap_future(running[1]))
+            # Finished or failed; either way the cache now knows
+            return await self.run(key, fingerprint, function)
+
+        response = None
+        try:
+            response = await function()
+        finally:
+            with self._lock:
+                del self._running[key]
+                if response is not None:
+                    self._done[key] = (self._clock() + self.ttl, fingerprint, response)
+                    if len(self._done) > self.max_keys:
+                        self._done.popitem(last=False)
+            future.set_result(None)
+        return response, False
+
+    def clear(self):
+        """Forget every finished result."""
+        with self._lock:
+            self._done.clear()
+
+    def _expire(self, now):
+        # Caller holds the lock. Every entry gets the same TTL, so entries
+        # expire in the order they were added.
+        done = self._done
+        while done:
+            key, (expires, _, _) = next(iter(done.items()))
+            if expires > now:
+                break
+            del done[key]
+
+    @staticmethod
+    def _check(first_fingerprint, fingerprint):
+        if first_fingerprint != fingerprint:
+            raise IdempotencyKeyReusedError(fingerprint)
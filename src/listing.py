@@ -0,0 +1,171 @@
+"""
+Paginated, filtered and projected views of the activities.
+
+``GET /activities`` with no query parameters returns every activity with its
+full roster. ``ActivityListing`` serves the paged form instead: activities in
+name order, resumable from an opaque cursor, optionally filtered and reduced
+to the requested fields, so list-view payloads stay small whatever the total
+enrollment. Rosters are paged separately through ``participants_page``.
+"""
+
+import base64
+import bisect
+import json
+import threading
+
+from models import ActivityPage, ParticipantsPage
+from schedule import ScheduleError, parse_day, parse_time
+
+# Fields an activity can be projected to; "name" is always included
+FIELDS = (
+    "description", "schedule", "max_participants", "participant_count",
+    "spots_left", "participants",
+)
+# Rosters are left out of list views unless asked for
+DEFAULT_FIELDS = tuple(field for field in FIELDS if field != "participants")
+
+
+class ListingError(ValueError):
+    """A listing request had an invalid cursor, field or filter."""
+
+
+def encode_cursor(position):
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ListingError("Invalid cursor") from None
+
+
+def parse_fields(fields):
+    """Turn a ``fields=a,b`` parameter into a tuple of known field names."""
+    if fields is None:
+        return DEFAULT_FIELDS
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    for field in selected:
+        if field not in FIELDS and field != "name":
+            raise ListingError(f"Unknown field: {field}")
+    return tuple(field for field in selected if field != "name")
+
+
+def project(name, activity, fields):
+    """Return the requested fields of an activity."""
+    item = {"name": name}
+    for field in fields:
+        if field == "participant_count":
+            item[field] = len(activity.roster)
+        elif field == "spots_left":
+            item[field] = activity.spots_left
+        elif field == "participants":
+            item[field] = list(activity.roster)
+        else:
+            item[field] = getattr(activity, field)
+    return item
+
+
+class ActivityListing:
+    """Keeps activity names sorted for keyset pagination over the store.
+
+    Day and time filters are answered by the ``schedule.ScheduleIndex``, so
+    only the matching activities are walked.
+    """
+
+    # Names copied out of the sorted list per lock acquisition
+    CHUNK = 256
+
+    def __init__(self, store, schedule_index):
+        self._store = store
+        self._schedule_index = schedule_index
+        self._lock = threading.Lock()
+        self._names = sorted(store)
+        store.add_listener(self._on_change)
+
+    def page(self, limit=50, cursor=None, day=None, starts_after=None, ends_before=None,
+             has_spots=None, q=None, fields=None):
+        """Return an ``ActivityPage`` of projected activity dicts.
+
+        ``day`` is a weekday name; ``starts_after`` and ``ends_before`` are
+        times such as "4 PM" and require ``day``.
+        """
+        fields = parse_fields(fields)
+        q = q.lower() if q else None
+        after = decode_cursor(cursor) if cursor else None
+        if after is not None and not isinstance(after, str):
+            raise ListingError("Invalid cursor")
+
+        if day is not None:
+            try:
+                matching = self._schedule_index.activities_on(
+                    parse_day(day),
+                    after=parse_time(starts_after) if starts_after else None,
+                    before=parse_time(ends_before) if ends_before else None,
+                )
+            except ScheduleError as error:
+                raise ListingError(str(error)) from None
+            names = sorted(matching)
+            names = names[bisect.bisect_right(names, after):] if after is not None else names
+        elif starts_after or ends_before:
+            raise ListingError("Time filters require a day")
+        else:
+            names = self._names_after(after)
+
+        items = []
+        last = None
+        for name in names:
+            activity = self._store.get(name)
+            if activity is None:
+                continue
+            if has_spots is not None and (activity.spots_left > 0) != has_spots:
+                continue
+            if q is not None and q not in name.lower() and q not in activity.description.lower():
+                continue
+            if len(items) >= limit:
+                return ActivityPage(items, encode_cursor(last))
+            with activity.lock:
+                items.append(project(name, activity, fields))
+            last = name
+        return ActivityPage(items, None)
+
+    def participants_page(self, activity_name, limit=100, cursor=None):
+        """Return one page of an activity's roster in sign-up order.
+
+        Raises ``KeyError`` if the activity does not exist.
+        """
+        after = decode_cursor(cursor) if cursor else 0
+        if not isinstance(after, int) or isinstance(after, bool):
+            raise ListingError("Invalid cursor")
+        activity = self._store[activity_name]
+        with activity.lock:
+            emails, next_after = activity.roster.page(after, limit)
+            total = len(activity.roster)
+        return ParticipantsPage(activity_name, emails, total,
+                                encode_cursor(next_after) if next_after is not None else None)
+
+    def _names_after(self, after):
+        """Yield names sorted after ``after``, a chunk per lock acquisition."""
+        while True:
+            with self._lock:
+                start = 0 if after is None else bisect.bisect_right(self._names, after)
+                chunk = self._names[start:start + self.CHUNK]
+            if not chunk:
+                return
+            yield from chunk
+            after = chunk[-1]
+
+    def _on_change(self, operation, version):
+        kind = operation["op"]
+        if kind not in ("put", "delete"):
+            return
+        name = operation["activity"]
+        with self._lock:
+            index = bisect.bisect_left(self._names, name)
+            present = index < len(self._names) and self._names[index] == name
+            if kind == "put" and not present:
+                self._names.insert(index, name)
+            elif kind == "delete" and present:
+                del self._names[index]
@@ -0,0 +1,276 @@
+"""
+Request and domain metrics in the Prometheus text format.
+
+``MetricsMiddleware`` is a plain ASGI middleware that times every request and
+records latency and payload sizes per route template and status code, plus the
+number of requests in flight. Histograms only bump one bucket counter per
+observation; cumulative counts are worked out when ``/metrics`` is scraped.
+Gauges that describe current state (activity fill ratios, threadpool usage)
+are computed by collectors at scrape time rather than kept up to date.
+"""
+
+import bisect
+import threading
+import time
+
+import anyio.to_thread
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bytes
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for metrics keyed by a tuple of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._lines(labels, value))
+        return lines
+
+    def _lines(self, labels, value):
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def set(self, value, labels=()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # One counter per bucket plus +Inf, then the sum
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def _lines(self, labels, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), state):
+            cumulative += count
+            le = _labels(self.labelnames, labels, [("le", _number(bound))])
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        plain = _labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{plain} {_number(state[-1])}")
+        lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics and scrape-time collectors rendered together by ``render``."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """Register ``collect()``, returning metrics to render on each scrape."""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for metric in collect():
+                lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+def route_template(scope):
+    """Return the matched route's path template, e.g. ``/activities/{activity_name}/signup``.
+
+    Unmatched paths share one label so scanners cannot blow up cardinality.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class HTTPMetrics:
+    """The per-request metrics recorded by ``MetricsMiddleware``."""
+
+    def __init__(self, registry):
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "Time to complete a request, including streaming the body",
+            ("method", "route", "status"))
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "Requests currently being handled", ("method",))
+        self.request_size = registry.histogram(
+            "http_request_size_bytes", "Request body sizes from Content-Length", ("method", "route"),
+            SIZE_BUCKETS)
+        self.response_size = registry.histogram(
+            "http_response_size_bytes", "Response body sizes as sent", ("method", "route"), SIZE_BUCKETS)
+        registry.add_collector(threadpool_metrics)
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding ``HTTPMetrics`` and an optional profiler."""
+
+    def __init__(self, app, metrics, profiler=None):
+        self.app = app
+        self.metrics = metrics
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.in_flight.inc((method,))
+        if self.profiler is not None:
+            self.profiler.begin()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.in_flight.dec((method,))
+            route = route_template(scope)
+            self.metrics.latency.observe(elapsed, (method, route, str(status)))
+            self.metrics.response_size.observe(sent, (method, route))
+            length = _content_length(scope)
+            if length is not None:
+                self.metrics.request_size.observe(length, (method, route))
+            if self.profiler is not None:
+                self.profiler.end(start, elapsed, method, route)
+
+
+def _content_length(scope):
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            return int(value) if value.isdigit() else None
+    return None
+
+
+def threadpool_metrics():
+    """Usage of the threadpool that runs sync endpoints.
+
+    Must be called from the event loop, which is where ``/metrics`` runs.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    total = Gauge("threadpool_tokens", "Threads sync endpoints may use at once")
+    total.set(limiter.total_tokens)
+    busy = Gauge("threadpool_tokens_in_use", "Threads currently running sync endpoints")
+    busy.set(statistics.borrowed_tokens)
+    waiting = Gauge("threadpool_tasks_waiting", "Sync endpoint calls queued for a free thread")
+    waiting.set(statistics.tasks_waiting)
+    return total, busy, waiting
+
+
+class ActivityMetrics:
+    """Domain metrics: signup and removal counters, per-activity fill and waitlists.
+
+    The counters are fed by a store listener; ``rate()`` over them gives
+    sign-ups per second. Rosters are read only at scrape time.
+    """
+
+    def __init__(self, registry, store):
+        self._store = store
+        self.signups = registry.counter("activity_signups_total", "Students signed up")
+        self.removals = registry.counter("activity_removals_total", "Students removed")
+        registry.add_collector(self.collect)
+        store.add_listener(self._on_change)
+
+    def collect(self):
+        participants = Gauge("activity_participants", "Students signed up per activity", ("activity",))
+        fill = Gauge("activity_fill_ratio", "Share of an activity's places taken", ("activity",))
+        waitlisted = Gauge("activity_waitlisted", "Students waiting for a place per activity", ("activity",))
+        version = Gauge("activity_store_version", "Number of changes applied to the store")
+        for name, activity in list(self._store.items()):
+            count = len(activity.roster)
+            participants.set(count, (name,))
+            fill.set(count / activity.max_participants if activity.max_participants else 1.0, (name,))
+            waitlisted.set(len(activity.waitlist), (name,))
+        version.set(self._store.version)
+        return participants, fill, waitlisted, version
+
+    def _on_change(self, operation, version):
+        if operation["op"] in ("signup", "promote"):
+            self.signups.inc()
+        elif operation["op"] == "remove":
+            self.removals.inc()
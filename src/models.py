@@ -0,0 +1,137 @@
+"""
+Typed shapes of the API's request items and responses.
+
+Responses built per request are slots dataclasses: no per-instance dict, a
+fixed set of typed fields, and ``orjson`` encodes them natively without an
+intermediate dict. They double as FastAPI ``response_model`` declarations,
+so the OpenAPI schema documents them. Endpoints return them inside a
+``serialization.JSONBytesResponse``, which FastAPI passes through as is, so
+they are not re-validated or copied on the way out.
+
+Shapes that are dicts anyway (an activity in ``GET /activities`` and items
+of a batch) are ``TypedDict``s. A batch item is validated against the schema
+by a prebuilt pydantic ``TypeAdapter``, which checks the parsed JSON and
+returns it as a plain dict instead of building a model instance per item.
+"""
+
+from dataclasses import dataclass
+from typing import Literal
+
+from pydantic import TypeAdapter
+from typing_extensions import NotRequired, TypedDict
+
+
+class ActivityDetails(TypedDict):
+    """An activity as listed by ``GET /activities``."""
+
+    description: str
+    schedule: str
+    max_participants: int
+    participants: list[str]
+    # Only present while someone is waiting
+    waitlist: NotRequired[list[str]]
+
+
+class BatchItem(TypedDict):
+    """One operation of a batch or NDJSON stream."""
+
+    op: Literal["signup", "remove"]
+    activity: str
+    email: str
+
+
+# Validates a batch item straight from JSON bytes
+batch_item_adapter = TypeAdapter(BatchItem)
+
+
+@dataclass(slots=True)
+class ActivityPage:
+    """A page of ``GET /activities`` with listing parameters."""
+
+    items: list[dict]
+    next_cursor: str | None
+
+
+@dataclass(slots=True)
+class ParticipantsPage:
+    """A page of an activity's roster in sign-up order."""
+
+    activity: str
+    participants: list[str]
+    total: int
+    next_cursor: str | None
+
+
+@dataclass(slots=True)
+class SearchResult:
+    name: str
+    description: str
+    spots_left: int
+    score: float
+
+
+@dataclass(slots=True)
+class SearchResults:
+    query: str
+    results: list[SearchResult]
+
+
+@dataclass(slots=True)
+class StudentActivity:
+    name: str
+    description: str
+    schedule: str
+    spots_left: int
+
+
+@dataclass(slots=True)
+class StudentActivities:
+    email: str
+    activities: list[StudentActivity]
+
+
+@dataclass(slots=True)
+class RankedActivity:
+    name: str
+    enrolled: int
+    waitlisted: int
+    capacity: int
+
+
+@dataclass(slots=True)
+class EnrollmentSummary:
+    """Totals and rankings of ``GET /analytics``."""
+
+    activities: int
+    students: int
+    enrollments: int
+    capacity: int
+    fill_rate: float
+    waitlisted: int
+    # Activities taken -> number of students taking that many
+    enrollments_per_student: dict[str, int]
+    # By enrolled plus waiting
+    most_popular: list[RankedActivity]
+    # By waitlist length
+    most_oversubscribed: list[RankedActivity]
+
+
+@dataclass(slots=True)
+class ActivityFill:
+    name: str
+    enrolled: int
+    capacity: int
+    waitlisted: int
+    fill_rate: float
+
+
+@dataclass(slots=True)
+class EnrollmentSeries:
+    """Sign-ups and removals per time bucket, oldest first."""
+
+    resolution: str
+    bucket_seconds: int
+    # Unix time at which the first bucket starts
+    start: int
+    signups: list[int]
+    removals: list[int]
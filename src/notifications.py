@@ -0,0 +1,122 @@
+"""
+Background delivery of waitlist notifications.
+
+When a student is promoted off a waitlist (or dropped from it because their
+schedule now clashes), they should hear about it, but the request that freed
+the place must not wait for an email or webhook to go out. The store listener
+only hands a small dict to ``NotificationQueue``. The queue runs an asyncio
+event loop on its own thread and delivers notifications there, one at a time,
+retrying failures with exponential backoff.
+"""
+
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger("mergington.notifications")
+
+
+async def log_notification(notification):
+    """Default sender: record the notification in the application log."""
+    logger.info("%(type)s: %(email)s for %(activity)s", notification)
+
+
+class NotificationQueue:
+    """Bounded queue of notifications delivered by ``send`` in the background.
+
+    ``send`` is an async callable taking the notification dict. ``put`` is
+    safe to call from any thread and never blocks; when ``max_pending``
+    notifications are already waiting, new ones are counted in ``dropped``.
+    """
+
+    def __init__(self, send=log_notification, max_pending=10_000, retries=3, retry_delay=0.5):
+        self._send = send
+        self.max_pending = max_pending
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(started,), name="notifications",
+                                        daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def put(self, notification):
+        """Queue a notification for delivery."""
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, notification)
+        except RuntimeError:
+            # The queue has been closed
+            self.dropped += 1
+
+    def join(self, timeout=None):
+        """Block until every queued notification has been handled."""
+        asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop).result(timeout)
+
+    def close(self):
+        """Deliver what is queued, then stop the background thread."""
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+        self._thread.join()
+        self._loop.close()
+
+    def _run(self, started):
+        asyncio.set_event_loop(self._loop)
+        # Created on the loop's own thread so it binds to that loop
+        self._queue = asyncio.Queue()
+        started.set()
+        self._loop.run_until_complete(self._deliver())
+
+    def _enqueue(self, notification):
+        if self._queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        self._queue.put_nowait(notification)
+
+    async def _deliver(self):
+        while True:
+            notification = await self._queue.get()
+            try:
+                if notification is None:
+                    return
+                await self._send_with_retries(notification)
+            finally:
+                self._queue.task_done()
+
+    async def _send_with_retries(self, notification):
+        for attempt in range(self.retries):
+            try:
+                await self._send(notification)
+            except Exception:
+                logger.exception("Delivering %s failed (attempt %d)", notification, attempt + 1)
+                if attempt + 1 < self.retries:
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+            else:
+                self.sent += 1
+                return
+        self.failed += 1
+
+
+def notify_waitlist_changes(store, notifications, school_id=None):
+    """Queue a notification whenever the store promotes or drops a waiting student.
+
+    With ``school_id``, each notification says which school it is from.
+    """
+    extra = {} if school_id is None else {"school": school_id}
+
+    def on_change(operation, version):
+        kind = operation["op"]
+        if kind == "promote":
+            notifications.put({"type": "promoted", "activity": operation["activity"],
+                               "email": operation["email"], "version": version, **extra})
+        elif kind == "unwaitlist" and operation.get("reason"):
+            notifications.put({"type": "dropped", "activity": operation["activity"],
+                               "email": operation["email"], "reason": operation["reason"],
+                               "version": version, **extra})
+
+    store.add_listener(on_change)
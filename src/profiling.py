@@ -0,0 +1,110 @@
+"""
+Sampling profiler for slow requests.
+
+While at least one request is in flight, a background thread samples the
+Python stack of every other thread at a fixed interval and keeps the recent
+samples in a ring buffer. When a request turns out to have taken longer than
+the threshold, the samples taken during it are aggregated into the "folded"
+format (``outer;inner;leaf count`` per line) read by flamegraph.pl, speedscope
+and similar tools, and written to a file named after the route. Files are
+written by a background thread, so a slow disk never stalls the event loop
+that served the request.
+
+Samples cover every thread, not just the one serving the slow request, so a
+profile also shows what was competing with it for the GIL.
+"""
+
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+logger = logging.getLogger("mergington.profiling")
+
+
+def fold(frame):
+    """Return a frame's stack as ``outer;...;inner``."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """Dumps folded stacks for requests slower than ``threshold`` seconds."""
+
+    def __init__(self, directory, threshold, interval=0.005, history=20_000):
+        self.directory = directory
+        self.threshold = threshold
+        self.interval = interval
+        self.profiles_written = 0
+        self._samples = deque(maxlen=history)
+        self._active = 0
+        self._condition = threading.Condition()
+        # (path, Counter of stacks) waiting to be written
+        self._writes = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+        self._writer = threading.Thread(target=self._write, name="slow-request-profile-writer",
+                                        daemon=True)
+        self._writer.start()
+
+    def begin(self):
+        """Note that a request started; sampling runs while any is active."""
+        with self._condition:
+            self._active += 1
+            self._condition.notify()
+
+    def end(self, start, elapsed, method, route):
+        """Note that a request finished; write its profile if it was slow.
+
+        Returns the path the profile will be written to, or ``None``.
+        """
+        with self._condition:
+            self._active -= 1
+        if elapsed < self.threshold:
+            return None
+        finish = start + elapsed
+        stacks = Counter(stack for taken, stack in list(self._samples) if start <= taken <= finish)
+        if not stacks:
+            return None
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        path = os.path.join(self.directory, f"{int(time.time() * 1000)}-{method}-{slug}.folded")
+        self._writes.put((path, stacks))
+        return path
+
+    def flush(self):
+        """Wait until every profile handed over so far has been written."""
+        self._writes.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._condition:
+                while not self._active:
+                    self._condition.wait()
+            taken = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    self._samples.append((taken, fold(frame)))
+            time.sleep(self.interval)
+
+    def _write(self):
+        while True:
+            path, stacks = self._writes.get()
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as file:
+                    for stack, count in stacks.most_common():
+                        file.write(f"{stack} {count}\n")
+                self.profiles_written += 1
+            except OSError:
+                logger.exception("Writing the profile %s failed", path)
+            finally:
+                self._writes.task_done()
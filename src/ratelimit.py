@@ -0,0 +1,79 @@
+"""
+Token-bucket rate limiting for the signup endpoints.
+
+Each key (a client address or a student email) has a bucket that holds up to
+``burst`` tokens and refills at ``rate`` tokens per second. A request spends
+one token or, if the bucket is empty, is refused with the time until the next
+token. A bucket is just two floats, refilled lazily when it is next used, so
+turning away a signup storm costs a dict lookup and some arithmetic.
+
+Buckets live in an LRU dict capped at ``max_keys``, so a flood of made-up
+emails cannot exhaust memory. Evicting a bucket forgets its debt, but the
+least recently used bucket has been idle the longest and is the most likely
+to be full anyway.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def parse_rate(text):
+    """Parse ``"rate/burst"`` (e.g. ``"2/10"``); ``"off"`` gives ``None``."""
+    if text.strip().lower() in ("", "off", "0"):
+        return None
+    rate, _, burst = text.partition("/")
+    rate = float(rate)
+    if rate <= 0:
+        raise ValueError(f"rate must be positive: {text!r}")
+    return rate, float(burst) if burst else max(rate, 1.0)
+
+
+class RateLimitedError(Exception):
+    """A signup was refused because its client or student is over their rate."""
+
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token buckets for any number of keys."""
+
+    def __init__(self, rate, burst, max_keys=100_000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.refused = 0
+        self._clock = clock
+        # key -> [tokens, last refill time], least recently used first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """Spend a token for ``key``.
+
+        Returns 0 if the request may go ahead, otherwise the number of
+        seconds until a token will be available.
+        """
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            self.refused += 1
+            return (1 - bucket[0]) / self.rate
+
+    def reset(self):
+        """Forget every bucket."""
+        with self._lock:
+            self._buckets.clear()
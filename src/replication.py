@@ -0,0 +1,472 @@
+"""
+Shared state for running the API with several worker processes.
+
+One writer process owns the authoritative ``ActivityStore`` (and its storage
+backend) and serves it over a Unix socket with ``WriterServer``. Every worker
+keeps a full in-memory copy in a ``ReplicaStore``:
+
+- Reads are served from the local copy, so read throughput grows with the
+  number of workers.
+- Writes are sent to the writer, which applies them one at a time under its
+  usual locks and checks. That makes every write linearizable no matter which
+  worker received it.
+- The writer streams every change it commits, numbered with its store
+  version, to all replicas, which apply them in order. A worker only answers a
+  write once its replica has caught up to the version the write produced, so
+  a client always reads its own writes.
+
+The wire format is newline-delimited JSON. A connection either subscribes to
+the change stream (``{"subscribe": true}``), receiving a snapshot and then
+``{"version": n, "op": {...}}`` lines, or makes calls, one request line and
+one reply line at a time.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from store import (ActivityFullError, ActivityNotFoundError, ActivityStore, AlreadySignedUpError,
+                   AlreadyWaitlistedError, NotSignedUpError, NotWaitlistedError,
+                   ScheduleConflictError, SpotsAvailableError, StoreError)
+
+# Seconds a worker waits for its replica to catch up with its own write
+CATCH_UP_TIMEOUT = 10.0
+# Seconds between attempts to reconnect to the writer
+RECONNECT_DELAY = 0.5
+# Changes queued for a replica before the writer gives up on it; the
+# replica reconnects and starts again from a snapshot
+MAX_PENDING_CHANGES = 100_000
+
+logger = logging.getLogger("mergington.replication")
+
+
+# Errors the writer sends back by name, rebuilt on the replica
+_ERRORS = {error.__name__: error for error in (
+    ActivityNotFoundError, AlreadySignedUpError, ActivityFullError, NotSignedUpError,
+    AlreadyWaitlistedError, NotWaitlistedError, SpotsAvailableError, ScheduleConflictError, KeyError,
+)}
+
+
+class ReplicationError(Exception):
+    """The writer could not be reached or the replica fell out of sync."""
+
+
+def _encode(message):
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _encode_error(error):
+    if error is None:
+        return None
+    return {"error": type(error).__name__, "args": list(error.args)}
+
+
+def _decode_error(payload):
+    """Rebuild the exception the writer raised."""
+    if payload is None:
+        return None
+    error = _ERRORS.get(payload["error"])
+    if error is not None:
+        return error(*payload["args"])
+    return ReplicationError(f"{payload['error']}: {payload['args']}")
+
+
+class WriterServer(socketserver.ThreadingUnixStreamServer):
+    """Serves ``store`` to replicas over the Unix socket at ``path``."""
+
+    daemon_threads = True
+
+    def __init__(self, store, path):
+        self.store = store
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            # Left behind by a writer that did not shut down cleanly
+            os.unlink(path)
+        super().__init__(path, _WriterHandler)
+        store.add_listener(self._on_change)
+
+    def subscribe(self, on_overflow=None):
+        """Return ``(snapshot, version, queue)`` for a new replica.
+
+        The snapshot is captured and the queue registered with every
+        activity locked, so the queue gets exactly the changes after it.
+        A replica that falls ``MAX_PENDING_CHANGES`` behind is dropped and
+        ``on_overflow`` called.
+        """
+        changes = _ChangeQueue(MAX_PENDING_CHANGES, on_overflow)
+
+        def register():
+            with self._lock:
+                self._subscribers.add(changes)
+            return self.store.version
+
+        snapshot, version = self.store.capture(register)
+        return snapshot, version, changes
+
+    def unsubscribe(self, changes):
+        with self._lock:
+            self._subscribers.discard(changes)
+
+    def call(self, request):
+        """Apply one write request and return the reply."""
+        try:
+            if request["method"] == "unenroll":
+                reply = {"result": self.store.unenroll(request["email"])}
+            elif request["method"] == "batch":
+                operations = [tuple(operation) for operation in request["operations"]]
+                applied, errors = self.store.apply_batch(operations, atomic=request["atomic"])
+                reply = {"applied": applied, "errors": [_encode_error(error) for error in errors]}
+            else:
+                reply = {"result": self.store.apply(request["op"])}
+        except (StoreError, KeyError) as error:
+            reply = _encode_error(error)
+        # Any version at or after this write's own will do for the replica
+        reply["version"] = self.store.version
+        return reply
+
+    def server_close(self):
+        super().server_close()
+        self.store.remove_listener(self._on_change)
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+    def _on_change(self, operation, version):
+        # Runs under the store's locks; hand off and let each connection
+        # thread do the encoding and sending
+        with self._lock:
+            overflowed = [changes for changes in self._subscribers
+                          if not changes.put((version, operation))]
+            self._subscribers.difference_update(overflowed)
+
+
+class _ChangeQueue:
+    """Bounded queue of ``(version, operation)`` drained in batches.
+
+    Once ``max_items`` are waiting the queue is emptied and closed, so a
+    stalled replica cannot make the writer's memory grow without limit.
+    """
+
+    def __init__(self, max_items, on_overflow=None):
+        self._items = []
+        self._max_items = max_items
+        self._on_overflow = on_overflow
+        self.overflowed = False
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        """Queue a change; return ``False`` once the queue has overflowed."""
+        with self._cond:
+            if self.overflowed:
+                return False
+            if len(self._items) >= self._max_items:
+                self.overflowed = True
+                self._items = []
+                self._cond.notify()
+            else:
+                self._items.append(item)
+                self._cond.notify()
+                return True
+        if self._on_overflow is not None:
+            self._on_overflow()
+        return False
+
+    def drain(self):
+        """Return the waiting changes, or ``None`` once the queue has overflowed."""
+        with self._cond:
+            while not self._items and not self.overflowed:
+                self._cond.wait()
+            if self.overflowed:
+                return None
+            items, self._items = self._items, []
+            return items
+
+
+class _WriterHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        first = self.rfile.readline()
+        if not first:
+            return
+        request = json.loads(first)
+        if request.get("subscribe"):
+            self._stream_changes()
+            return
+        while request is not None:
+            self.wfile.write(_encode(self.server.call(request)))
+            self.wfile.flush()
+            line = self.rfile.readline()
+            request = json.loads(line) if line else None
+
+    def _stream_changes(self):
+        # Shutting the socket down also wakes a write stuck on a full buffer
+        snapshot, version, changes = self.server.subscribe(on_overflow=self._disconnect)
+        try:
+            self.wfile.write(_encode({"snapshot": snapshot, "version": version}))
+            self.wfile.flush()
+            while True:
+                batch = changes.drain()
+                if batch is None:
+                    # Too far behind; the replica resubscribes from a snapshot
+                    logger.warning("Dropped a replica more than %d changes behind",
+                                   MAX_PENDING_CHANGES)
+                    return
+                self.wfile.write(b"".join(
+                    _encode({"version": version, "op": operation}) for version, operation in batch
+                ))
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            self.server.unsubscribe(changes)
+
+    def _disconnect(self):
+        try:
+            self.request.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class ReplicaStore(ActivityStore):
+    """An ``ActivityStore`` that forwards writes to a ``WriterServer``.
+
+    Reads, indexes and listeners work exactly as on a local store, fed by
+    the writer's change stream. Its ``version`` tracks the writer's, so
+    ETags and change feed positions agree across workers.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self._path = path
+        # Changes from the writer are applied as a replay: no signup checks,
+        # nothing written to storage
+        self._replaying = True
+        self._local = threading.local()
+        self._caught_up = threading.Condition()
+        self._idle_connections = []
+        self._connections_lock = threading.Lock()
+        self._closed = False
+        self._follow(self._subscribe())
+        threading.Thread(target=self._run, name="replica", daemon=True).start()
+
+    # Writes
+
+    @property
+    def writes_block(self):
+        # Every write is a round trip to the writer
+        return True
+
+    def __setitem__(self, name, activity):
+        if self._applying():
+            return super().__setitem__(name, activity)
+        data = activity if isinstance(activity, dict) else activity.to_dict()
+        self._call({"method": "apply", "op": {"op": "put", "activity": name, "data": data}})
+
+    def __delitem__(self, name):
+        if self._applying():
+            return super().__delitem__(name)
+        self._call({"method": "apply", "op": {"op": "delete", "activity": name}})
+
+    def clear(self):
+        # Without the store lock: it is needed to apply the deletes locally
+        for name in list(self):
+            try:
+                del self[name]
+            except KeyError:
+                pass
+
+    def add_participant(self, activity_name, email):
+        if self._applying():
+            return super().add_participant(activity_name, email)
+        self._call({"method": "apply", "op": {"op": "signup", "activity": activity_name, "email": email}})
+
+    def remove_participant(self, activity_name, email):
+        if self._applying():
+            return super().remove_participant(activity_name, email)
+        self._call({"method": "apply", "op": {"op": "remove", "activity": activity_name, "email": email}})
+
+    def join_waitlist(self, activity_name, email):
+        if self._applying():
+            return super().join_waitlist(activity_name, email)
+        return self._call({"method": "apply",
+                           "op": {"op": "waitlist", "activity": activity_name, "email": email}})
+
+    def leave_waitlist(self, activity_name, email):
+        if self._applying():
+            return super().leave_waitlist(activity_name, email)
+        self._call({"method": "apply", "op": {"op": "unwaitlist", "activity": activity_name, "email": email}})
+
+    def unenroll(self, email):
+        # The writer logs and streams one remove per activity
+        return self._call({"method": "unenroll", "email": email})
+
+    def apply_batch(self, operations, atomic=False):
+        reply = self._request({"method": "batch", "operations": [list(op) for op in operations],
+                               "atomic": atomic})
+        return reply["applied"], [_decode_error(error) for error in reply["errors"]]
+
+    def _call(self, request):
+        reply = self._request(request)
+        if "error" in reply:
+            raise _decode_error(reply)
+        return reply.get("result")
+
+    def _request(self, request):
+        """Send a write to the writer and wait until it is applied locally."""
+        connection = self._connection()
+        try:
+            connection.write(_encode(request))
+            connection.flush()
+            line = connection.readline()
+        except OSError as error:
+            connection.close()
+            raise ReplicationError(f"writer unreachable: {error}") from None
+        if not line:
+            connection.close()
+            raise ReplicationError("writer closed the connection")
+        with self._connections_lock:
+            self._idle_connections.append(connection)
+        reply = json.loads(line)
+        self._wait_for(reply["version"])
+        return reply
+
+    def _connection(self):
+        with self._connections_lock:
+            if self._idle_connections:
+                return self._idle_connections.pop()
+        try:
+            sock = self._connect()
+        except OSError as error:
+            raise ReplicationError(f"writer unreachable: {error}") from None
+        with sock:
+            # The file keeps the connection open once the socket is closed
+            return sock.makefile("rwb")
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _wait_for(self, version):
+        deadline = time.monotonic() + CATCH_UP_TIMEOUT
+        with self._caught_up:
+            while self.version < version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ReplicationError(f"replica did not reach version {version}")
+                self._caught_up.wait(remaining)
+
+    def close(self):
+        """Stop following the writer and close every connection."""
+        self._closed = True
+        try:
+            # Wakes the replica thread, which closes the stream itself
+            self._stream_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        with self._connections_lock:
+            connections, self._idle_connections = self._idle_connections, []
+        for connection in connections:
+            connection.close()
+
+    # Following the writer
+
+    def _applying(self):
+        return getattr(self._local, "applying", False)
+
+    def _subscribe(self):
+        self._stream_socket = self._connect()
+        stream = self._stream_socket.makefile("rwb")
+        stream.write(_encode({"subscribe": True}))
+        stream.flush()
+        return stream
+
+    def _follow(self, stream):
+        """Load the snapshot at the head of a change stream.
+
+        Only activities that differ from the snapshot are replaced. Indexes
+        see those changes as usual, but they do not bump the version or
+        reach the change feed: the version jumps straight to the writer's
+        and listeners then get a single ``{"op": "reset"}``, which tells
+        change feed clients to reload.
+        """
+        first = stream.readline()
+        if not first:
+            raise ReplicationError("writer closed the change stream")
+        message = json.loads(first)
+        snapshot = message["snapshot"]
+        changed = False
+        applying, self._local.applying = self._applying(), True
+        self._local.reloading = True
+        try:
+            for name in set(self) - snapshot.keys():
+                del self[name]
+                changed = True
+            for name, data in snapshot.items():
+                current = self.get(name)
+                if current is None or current.to_dict() != data:
+                    self[name] = data
+                    changed = True
+        finally:
+            self._local.applying = applying
+            self._local.reloading = False
+        with self._caught_up:
+            with self._version_lock:
+                if changed or self.version != message["version"]:
+                    self.version = message["version"]
+                    for listener in self._listeners:
+                        listener({"op": "reset"}, self.version)
+            self._caught_up.notify_all()
+        self._stream = stream
+
+    def _commit(self, operation):
+        if not getattr(self._local, "reloading", False):
+            return super()._commit(operation)
+        # Part of loading a snapshot: keep indexes in step, not the version
+        operation = dict(operation, reload=True)
+        with self._version_lock:
+            for listener in self._listeners:
+                listener(operation, self.version)
+        return None
+
+    def _run(self):
+        self._local.applying = True
+        while True:
+            try:
+                self._apply_changes(self._stream)
+            except (OSError, ValueError, ReplicationError):
+                pass
+            except (StoreError, KeyError):
+                # The replica no longer matches the writer; start over
+                logger.exception("Applying a change from the writer failed; resubscribing")
+            self._stream.close()
+            self._stream_socket.close()
+            if self._closed:
+                return
+            # Reconnect and start over from a fresh snapshot
+            while True:
+                time.sleep(RECONNECT_DELAY)
+                if self._closed:
+                    return
+                try:
+                    self._follow(self._subscribe())
+                    break
+                except (OSError, ValueError, ReplicationError):
+                    continue
+
+    def _apply_changes(self, stream):
+        for line in stream:
+            message = json.loads(line)
+            if message["version"] != self.version + 1:
+                raise ReplicationError(f"expected version {self.version + 1}, got {message['version']}")
+            self.apply(message["op"])
+            with self._caught_up:
+                self._caught_up.notify_all()
+        raise ReplicationError("writer closed the change stream")
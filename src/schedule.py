@@ -0,0 +1,169 @@
+"""
+Structured activity schedules.
+
+Schedules are stored as free text such as "Tuesdays and Thursdays, 3:30 PM -
+4:30 PM". ``parse_schedule`` turns that into ``TimeSlot`` records once, when
+an activity is added, and ``ScheduleIndex`` keeps every slot in per-weekday
+lists sorted by start time. That answers "activities on Monday after 4 PM"
+with a binary search, and lets a signup be checked for clashes against only
+the student's own activities.
+"""
+
+import bisect
+import re
+import threading
+from typing import NamedTuple
+
+from store import ScheduleConflictError
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+_DAY_PATTERN = re.compile(
+    r"\b(" + "|".join(DAYS) + r"|mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)s?\b", re.IGNORECASE
+)
+_TIME = r"(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?"
+_RANGE_PATTERN = re.compile(_TIME + r"\s*(?:-|–|to)\s*" + _TIME, re.IGNORECASE)
+
+
+class ScheduleError(ValueError):
+    """A day or time could not be understood."""
+
+
+class TimeSlot(NamedTuple):
+    """A weekly interval: ``day`` 0 (Monday) to 6, times in minutes after midnight."""
+
+    day: int
+    start: int
+    end: int
+
+    def overlaps(self, other):
+        return self.day == other.day and self.start < other.end and other.start < self.end
+
+
+def parse_day(text):
+    """Return the weekday number for "Monday", "mondays", "mon" and so on."""
+    match = _DAY_PATTERN.fullmatch(text.strip())
+    if match is None:
+        raise ScheduleError(f"Unknown day: {text}")
+    return _day_number(match.group(1))
+
+
+def parse_time(text):
+    """Return minutes after midnight for "4 PM", "4:30 pm" or "16:30"."""
+    match = re.fullmatch(_TIME, text.strip(), re.IGNORECASE)
+    if match is None:
+        raise ScheduleError(f"Unknown time: {text}")
+    return _minutes(*match.groups())
+
+
+def parse_schedule(text):
+    """Parse a free-text schedule into a tuple of ``TimeSlot``.
+
+    Returns an empty tuple when no days or no valid time range can be
+    found; such activities simply never match day filters or conflict with
+    anything.
+    """
+    times = _RANGE_PATTERN.search(text)
+    if times is None:
+        return ()
+    start_hour, start_minute, start_meridiem, end_hour, end_minute, end_meridiem = times.groups()
+    try:
+        # "3:30 - 4:30 PM": the start shares the end's meridiem
+        start = _minutes(start_hour, start_minute, start_meridiem or end_meridiem)
+        end = _minutes(end_hour, end_minute, end_meridiem)
+    except ScheduleError:
+        return ()
+    days = sorted({_day_number(match.group(1)) for match in _DAY_PATTERN.finditer(text[:times.start()])})
+    return tuple(TimeSlot(day, start, end) for day in days)
+
+
+def _day_number(word):
+    word = word.lower()
+    for number, day in enumerate(DAYS):
+        if day.startswith(word):
+            return number
+    raise ScheduleError(f"Unknown day: {word}")
+
+
+def _minutes(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ScheduleError(f"Invalid hour: {hour}")
+        hour = hour % 12 + (12 if meridiem.lower().startswith("p") else 0)
+    if hour > 23 or minute > 59:
+        raise ScheduleError(f"Invalid time: {hour}:{minute:02d}")
+    return hour * 60 + minute
+
+
+class ScheduleIndex:
+    """Per-weekday interval index over every activity's parsed schedule."""
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        # activity name -> tuple of TimeSlot
+        self._slots = {}
+        # per weekday, (start, end, name) sorted by start time
+        self._days = [[] for _ in DAYS]
+        for name in list(store):
+            self._add(name, store[name].schedule)
+        store.add_listener(self._on_change)
+
+    def slots(self, activity_name):
+        """Return the parsed ``TimeSlot`` tuple of an activity."""
+        return self._slots.get(activity_name, ())
+
+    def activities_on(self, day, after=None, before=None):
+        """Return names of activities meeting on ``day``.
+
+        ``after`` keeps those starting at or after that minute of the day,
+        ``before`` those finishing by it.
+        """
+        with self._lock:
+            entries = self._days[day]
+            start = 0 if after is None else bisect.bisect_left(entries, (after,))
+            return {name for _, end, name in entries[start:] if before is None or end <= before}
+
+    def conflicts(self, activity_name, other_names):
+        """Return which of ``other_names`` clash with ``activity_name``."""
+        slots = self._slots.get(activity_name, ())
+        if not slots:
+            return []
+        return sorted(
+            other for other in other_names
+            if other != activity_name and any(
+                slot.overlaps(theirs) for slot in slots for theirs in self._slots.get(other, ())
+            )
+        )
+
+    def check_signup(self, activity_name, email, enrolled):
+        """Signup check for ``ActivityStore.add_signup_check``.
+
+        Looks only at the ``enrolled`` activities of this one student, so
+        the cost does not grow with the number of activities.
+        """
+        clashes = self.conflicts(activity_name, enrolled)
+        if clashes:
+            raise ScheduleConflictError(activity_name, clashes)
+
+    def _add(self, name, schedule):
+        slots = parse_schedule(schedule)
+        self._slots[name] = slots
+        for slot in slots:
+            bisect.insort(self._days[slot.day], (slot.start, slot.end, name))
+
+    def _discard(self, name):
+        for slot in self._slots.pop(name, ()):
+            entries = self._days[slot.day]
+            index = bisect.bisect_left(entries, (slot.start, slot.end, name))
+            if index < len(entries) and entries[index] == (slot.start, slot.end, name):
+                del entries[index]
+
+    def _on_change(self, operation, version):
+        kind = operation["op"]
+        if kind not in ("put", "delete"):
+            return
+        with self._lock:
+            self._discard(operation["activity"])
+            if kind == "put":
+                self._add(operation["activity"], operation["data"]["schedule"])
@@ -0,0 +1,178 @@
+"""
+Full-text search over activity names and descriptions.
+
+``SearchIndex`` is an in-memory inverted index mapping each token to the
+activities that contain it, kept current through a store listener, so a query
+never scans the activities themselves. The last query token is treated as a
+prefix for typeahead: it is expanded against a sorted vocabulary with a binary
+search. Results are ranked by a TF-IDF style score where matches in the name
+count more than matches in the description and exact token matches more than
+prefix matches.
+"""
+
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+# Relative weight of a token occurring in the name vs the description
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+# Score multiplier for a prefix rather than an exact match
+PREFIX_WEIGHT = 0.5
+# Cap on vocabulary terms a single prefix expands to
+MAX_PREFIX_TERMS = 128
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+class SearchIndex:
+    """Inverted index over every activity's name and description."""
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        # token -> {activity name: weighted term frequency}
+        self._postings = {}
+        # sorted tokens, for prefix expansion
+        self._vocabulary = []
+        # activity name -> tokens it is indexed under
+        self._documents = {}
+        # token -> postings sorted by frequency, built lazily for typeahead
+        self._ranked = {}
+        for name in list(store):
+            self._add(name, store[name].description)
+        store.add_listener(self._on_change)
+
+    def __len__(self):
+        return len(self._documents)
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` ``(name, score)`` pairs, best first.
+
+        Every query token has to match; the last one may match as a prefix.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            total = len(self._documents)
+            # term -> weight for every vocabulary term each token matches
+            expansions = [self._expand(token, index == len(tokens) - 1, total)
+                          for index, token in enumerate(tokens)]
+            if not all(expansions):
+                return []
+            if len(tokens) == 1:
+                scored = self._top_single(expansions[0], limit)
+            else:
+                scored = self._score_all(expansions)
+        return [(name, round(score, 4)) for name, score in
+                heapq.nlargest(limit, scored.items(), key=lambda item: (item[1], item[0]))]
+
+    def _expand(self, token, prefix, total):
+        """Return ``{term: weight}`` for the terms a query token matches."""
+        terms = {}
+        if token in self._postings:
+            terms[token] = self._idf(token, total)
+        if prefix:
+            start = bisect.bisect_left(self._vocabulary, token)
+            for term in self._vocabulary[start:start + MAX_PREFIX_TERMS]:
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    terms[term] = self._idf(term, total) * PREFIX_WEIGHT
+        return terms
+
+    def _idf(self, term, total):
+        return math.log(1 + total / len(self._postings[term]))
+
+    def _top_single(self, terms, limit):
+        """Score a one-token query from each term's best postings only.
+
+        An activity's score is its best term's score, so the overall top
+        ``limit`` is always among the top ``limit`` of some single term.
+        """
+        scored = {}
+        for term, weight in terms.items():
+            for frequency, name in self._ranked_postings(term)[:limit]:
+                score = frequency * weight
+                if score > scored.get(name, 0.0):
+                    scored[name] = score
+        return scored
+
+    def _score_all(self, expansions):
+        """Score a multi-token query over the intersection of its matches.
+
+        The candidates are intersected as sets first, rarest token first, so
+        only activities matching every token are scored.
+        """
+        matches = []
+        for terms in expansions:
+            if len(terms) == 1:
+                (term,) = terms
+                matches.append(self._postings[term].keys())
+            else:
+                matches.append(set().union(*(self._postings[term] for term in terms)))
+        matches.sort(key=len)
+        candidates = set(matches[0]).intersection(*matches[1:])
+        scored = dict.fromkeys(candidates, 0.0)
+        for terms in expansions:
+            best = {}
+            for term, weight in terms.items():
+                postings = self._postings[term]
+                for name in candidates.intersection(postings):
+                    score = postings[name] * weight
+                    if score > best.get(name, 0.0):
+                        best[name] = score
+            for name, score in best.items():
+                scored[name] += score
+        return scored
+
+    def _ranked_postings(self, term):
+        """Return a term's ``(frequency, name)`` postings, highest first."""
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            ranked = self._ranked[term] = sorted(
+                ((frequency, name) for name, frequency in self._postings[term].items()), reverse=True
+            )
+        return ranked
+
+    def _add(self, name, description):
+        frequencies = Counter()
+        for token in tokenize(name):
+            frequencies[token] += NAME_WEIGHT
+        for token in tokenize(description):
+            frequencies[token] += DESCRIPTION_WEIGHT
+        for token, frequency in frequencies.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                bisect.insort(self._vocabulary, token)
+            # Dampen repeated words so long descriptions do not dominate
+            postings[name] = 1 + math.log(frequency)
+            self._ranked.pop(token, None)
+        self._documents[name] = tuple(frequencies)
+
+    def _discard(self, name):
+        for token in self._documents.pop(name, ()):
+            postings = self._postings[token]
+            del postings[name]
+            self._ranked.pop(token, None)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+
+    def _on_change(self, operation, version):
+        kind = operation["op"]
+        if kind not in ("put", "delete"):
+            return
+        with self._lock:
+            self._discard(operation["activity"])
+            if kind == "put":
+                self._add(operation["activity"], operation["data"]["description"])
@@ -0,0 +1,37 @@
+"""
+Activities the API starts with when its store is empty.
+
+They are kept in ``seed.ndjson``, in the bulk import format, so they can be
+edited or exported from a running server without touching code. The tests
+reset the store to the same data.
+"""
+
+from pathlib import Path
+
+from bulk import RecordError, parse_record, read_records
+
+SEED_PATH = Path(__file__).with_name("seed.ndjson")
+
+
+def load_activities(path):
+    """Read a small NDJSON or CSV export into ``{name: activity dict}``."""
+    activities = {}
+    with open(path, encoding="utf-8", newline="") as file:
+        fmt = "csv" if str(path).endswith(".csv") else "ndjson"
+        for line_number, record in read_records(file, fmt):
+            try:
+                if isinstance(record, RecordError):
+                    raise record
+                kind, name, value = parse_record(record)
+                if kind == "activity":
+                    activities[name] = dict(value, participants=[])
+                elif name in activities:
+                    activities[name]["participants"].append(value)
+                else:
+                    raise RecordError(f"Enrollment before activity {name!r}")
+            except RecordError as error:
+                raise RecordError(f"{path}:{line_number}: {error}") from None
+    return activities
+
+
+SEED_ACTIVITIES = load_activities(SEED_PATH)
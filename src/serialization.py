@@ -0,0 +1,67 @@
+"""
+Fast JSON encoding of response payloads straight to bytes.
+
+FastAPI's default path walks every returned value with ``jsonable_encoder``,
+building a second copy of the payload, and then encodes that copy with the
+stdlib ``json`` module. On a page of large rosters the copy costs as much as
+the encoding. ``JSONBytesResponse`` skips both: endpoints return it directly
+and ``encode_json`` turns the payload into bytes in one pass.
+
+``encode_json`` uses ``orjson`` when it is installed. It encodes dicts,
+lists and the slots dataclasses in ``models`` natively. Without it the stdlib
+encoder is used, with dataclasses converted field by field. Both produce the
+same compact UTF-8 output FastAPI's ``JSONResponse`` would, so ETags and
+clients see no difference. (They write floats with an exponent differently,
+``1e16`` against ``1e+16``; the API never sends such numbers.)
+"""
+
+import dataclasses
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+
+def _fallback_default(value):
+    if dataclasses.is_dataclass(value):
+        return {field: getattr(value, field) for field in _field_names(type(value))}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_FIELD_NAMES = {}
+
+
+def _field_names(cls):
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        names = _FIELD_NAMES[cls] = tuple(field.name for field in dataclasses.fields(cls))
+    return names
+
+
+def encode_json_stdlib(content):
+    """Encode ``content`` with the stdlib encoder, exactly as ``JSONResponse`` does."""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+        default=_fallback_default,
+    ).encode("utf-8")
+
+
+if orjson is not None:
+    def encode_json(content):
+        """Encode ``content`` as compact UTF-8 JSON bytes."""
+        return orjson.dumps(content)
+else:
+    encode_json = encode_json_stdlib
+
+
+class JSONBytesResponse(Response):
+    """JSON response encoded by ``encode_json`` without ``jsonable_encoder``."""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        return encode_json(content)
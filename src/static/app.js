@@ -4,48 +4,69 @@ document.addEventListener("DOMContentLoaded", () => {
   const signupForm = document.getElementById("signup-form");
   const messageDiv = document.getElementById("message");
 
+  // Latest known state of every activity, kept current by the change feed.
+  // Participant arrays are replaced rather than mutated, which is how the
+  // renderer tells that a list changed.
+  let activities = {};
+  let changeStream = null;
+  const renderer = new window.ActivityRenderer.ActivityListRenderer(activitiesList, activitySelect);
+
+  // Apply one delta from the change feed. Deltas are idempotent, so one
+  // already reflected in the loaded list is harmless.
+  function applyChange(change) {
+    const details = activities[change.activity];
+
+    switch (change.type) {
+      case "participant_added":
+        if (!details) return;
+        if (!details.participants.includes(change.email)) {
+          details.participants = details.participants.concat(change.email);
+        }
+        break;
+      case "participant_removed":
+        if (!details) return;
+        details.participants = details.participants.filter((email) => email !== change.email);
+        break;
+      case "activity_updated":
+        activities[change.activity] = change.data;
+        break;
+      case "activity_removed":
+        delete activities[change.activity];
+        break;
+      default:
+        return;
+    }
+
+    renderer.update(change.activity, activities[change.activity]);
+  }
+
+  // Subscribe to changes made after the given version
+  function connectChangeStream(version) {
+    if (!window.EventSource) return;
+    if (changeStream) changeStream.close();
+
+    changeStream = new EventSource(`/activities/stream?since=${encodeURIComponent(version)}`);
+    changeStream.onmessage = (event) => applyChange(JSON.parse(event.data));
+    // The server no longer has the changes we missed: reload everything
+    changeStream.addEventListener("reset", () => fetchActivities());
+  }
+
+  function isStreaming() {
+    return changeStream !== null && changeStream.readyState === EventSource.OPEN;
+  }
+
   // Function to fetch activities from API
   async function fetchActivities() {
     try {
       const response = await fetch("/activities");
-      const activities = await response.json();
-
-      // Clear loading message
-      activitiesList.innerHTML = "";
-
-      // Populate activities list
-      Object.entries(activities).forEach(([name, details]) => {
-        const activityCard = document.createElement("div");
-        activityCard.className = "activity-card";
-
-        const spotsLeft = details.max_participants - details.participants.length;
-        
-        // Create participants list HTML
-        const participantsHtml = details.participants && details.participants.length > 0
-          ? `<ul class="participants-list">${details.participants.map(email => `<li><span class="participant-email">${email}</span><button class="delete-btn" onclick="removeParticipant('${name}', '${email}')" title="Remove participant">×</button></li>`).join('')}</ul>`
-          : '<div class="no-participants">No participants yet</div>';
-
-        activityCard.innerHTML = `
-          <h4>${name}</h4>
-          <p>${details.description}</p>
-          <p><strong>Schedule:</strong> ${details.schedule}</p>
-          <p><strong>Availability:</strong> ${spotsLeft} spots left</p>
-          <div class="participants-section">
-            <div class="participants-title">Current Participants (${details.participants.length}):</div>
-            ${participantsHtml}
-          </div>
-        `;
-
-        activitiesList.appendChild(activityCard);
-
-        // Add option to select dropdown
-        const option = document.createElement("option");
-        option.value = name;
-        option.textContent = name;
-        activitySelect.appendChild(option);
-      });
+      activities = await response.json();
+
+      // Only cards whose activity changed are touched
+      renderer.render(activities);
+
+      connectChangeStream(response.headers.get("X-Activities-Version") || 0);
     } catch (error) {
-      activitiesList.innerHTML = "<p>Failed to load activities. Please try again later.</p>";
+      renderer.showMessage("Failed to load activities. Please try again later.");
       console.error("Error fetching activities:", error);
     }
   }
@@ -71,8 +92,8 @@ document.addEventListener("DOMContentLoaded", () => {
         messageDiv.textContent = result.message;
         messageDiv.className = "success";
         signupForm.reset();
-        // Refresh the activities list to show updated participants
-        fetchActivities();
+        // The change feed delivers the update; refresh only without it
+        if (!isStreaming()) fetchActivities();
       } else {
         messageDiv.textContent = result.detail || "An error occurred";
         messageDiv.className = "error";
@@ -93,7 +114,7 @@ document.addEventListener("DOMContentLoaded", () => {
   });
 
   // Function to remove a participant from an activity
-  window.removeParticipant = async function(activityName, email) {
+  async function removeParticipant(activityName, email) {
     if (!confirm(`Are you sure you want to remove ${email} from ${activityName}?`)) {
       return;
     }
@@ -111,8 +132,8 @@ document.addEventListener("DOMContentLoaded", () => {
       if (response.ok) {
         messageDiv.textContent = result.message;
         messageDiv.className = "success";
-        // Refresh the activities list to show updated participants
-        fetchActivities();
+        // The change feed delivers the update; refresh only without it
+        if (!isStreaming()) fetchActivities();
       } else {
         messageDiv.textContent = result.detail || "Failed to remove participant";
         messageDiv.className = "error";
@@ -130,7 +151,16 @@ document.addEventListener("DOMContentLoaded", () => {
       messageDiv.classList.remove("hidden");
       console.error("Error removing participant:", error);
     }
-  };
+  }
+
+  // One listener handles every remove button, however many rows exist
+  activitiesList.addEventListener("click", (event) => {
+    const button = event.target.closest(".delete-btn");
+    if (!button) return;
+    const row = button.closest("li");
+    const card = button.closest(".activity-card");
+    removeParticipant(card.dataset.activity, row.dataset.email);
+  });
 
   // Initialize app
   fetchActivities();
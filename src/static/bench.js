@@ -0,0 +1,142 @@
+/*
+ * Render-time benchmark for the activity list, served at /static/bench.html.
+ *
+ * Builds synthetic activities and times, in milliseconds including layout:
+ * - first_render: the keyed renderer drawing every card from scratch
+ * - one_signup: one participant added to one activity, as a change feed
+ *   delta does
+ * - full_refresh: fetchActivities() receiving the same data again as new
+ *   objects
+ * - rebuild_all: the old approach, wiping the list and rebuilding every card
+ *   and participant <li> from string templates
+ *
+ * Settings can also be passed in the query string, e.g.
+ * bench.html?activities=20&participants=10000&rounds=10&autorun=1
+ */
+document.addEventListener("DOMContentLoaded", () => {
+  const form = document.getElementById("bench-form");
+  const output = document.getElementById("bench-results");
+  const list = document.getElementById("activities-list");
+  const select = document.getElementById("activity");
+  const fields = {
+    activities: document.getElementById("bench-activities"),
+    participants: document.getElementById("bench-participants"),
+    rounds: document.getElementById("bench-rounds"),
+  };
+
+  function makeActivities(count, size) {
+    const activities = {};
+    for (let a = 0; a < count; a++) {
+      const participants = [];
+      for (let p = 0; p < size; p++) participants.push(`student${p}.${a}@mergington.edu`);
+      activities[`Activity ${a}`] = {
+        description: `Synthetic activity number ${a}`,
+        schedule: "Mondays, 3:30 PM - 5:00 PM",
+        max_participants: size + 10,
+        participants,
+      };
+    }
+    return activities;
+  }
+
+  function copy(activities) {
+    return JSON.parse(JSON.stringify(activities));
+  }
+
+  // Time `run`, then read layout so the browser has to apply the changes
+  function timed(run) {
+    const start = performance.now();
+    run();
+    void list.offsetHeight;
+    return performance.now() - start;
+  }
+
+  function summary(timings) {
+    const sorted = timings.slice().sort((a, b) => a - b);
+    const at = (q) => sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * q))];
+    return { p50_ms: +at(0.5).toFixed(2), p95_ms: +at(0.95).toFixed(2), max_ms: +sorted[sorted.length - 1].toFixed(2) };
+  }
+
+  // What fetchActivities() used to do on every refresh
+  function rebuildAll(activities) {
+    list.innerHTML = "";
+    for (const [name, details] of Object.entries(activities)) {
+      const card = document.createElement("div");
+      card.className = "activity-card";
+      const items = details.participants
+        .map((email) => `<li><span class="participant-email">${email}</span><button class="delete-btn">×</button></li>`)
+        .join("");
+      card.innerHTML = `
+        <h4>${name}</h4>
+        <p>${details.description}</p>
+        <p><strong>Schedule:</strong> ${details.schedule}</p>
+        <p><strong>Availability:</strong> ${details.max_participants - details.participants.length} spots left</p>
+        <div class="participants-section"><ul class="participants-list">${items}</ul></div>
+      `;
+      list.appendChild(card);
+    }
+  }
+
+  function run(settings) {
+    const data = makeActivities(settings.activities, settings.participants);
+    const timings = { first_render: [], one_signup: [], full_refresh: [], rebuild_all: [] };
+
+    for (let round = 0; round < settings.rounds; round++) {
+      list.replaceChildren();
+      const renderer = new window.ActivityRenderer.ActivityListRenderer(list, select);
+      const state = copy(data);
+      timings.first_render.push(timed(() => renderer.render(state)));
+
+      const name = `Activity ${round % settings.activities}`;
+      const details = state[name];
+      timings.one_signup.push(timed(() => {
+        details.participants = details.participants.concat(`new${round}@mergington.edu`);
+        renderer.update(name, details);
+      }));
+
+      const fresh = copy(state);
+      timings.full_refresh.push(timed(() => renderer.render(fresh)));
+      renderer.showMessage("");
+    }
+    // The old approach is slow enough that a few rounds are plenty
+    for (let round = 0; round < Math.min(settings.rounds, 3); round++) {
+      timings.rebuild_all.push(timed(() => rebuildAll(data)));
+    }
+    list.replaceChildren();
+
+    const results = { settings };
+    for (const [name, values] of Object.entries(timings)) results[name] = summary(values);
+    return results;
+  }
+
+  function settingsFrom(source) {
+    return {
+      activities: Math.max(1, parseInt(source.activities, 10) || 20),
+      participants: Math.max(0, parseInt(source.participants, 10) || 0),
+      rounds: Math.max(1, parseInt(source.rounds, 10) || 20),
+    };
+  }
+
+  function start(settings) {
+    output.textContent = "Running...";
+    // Let the message paint before the page is busy
+    setTimeout(() => {
+      output.textContent = JSON.stringify(run(settings), null, 2);
+    }, 50);
+  }
+
+  form.addEventListener("submit", (event) => {
+    event.preventDefault();
+    start(settingsFrom({
+      activities: fields.activities.value,
+      participants: fields.participants.value,
+      rounds: fields.rounds.value,
+    }));
+  });
+
+  const query = new URLSearchParams(window.location.search);
+  for (const [name, field] of Object.entries(fields)) {
+    if (query.has(name)) field.value = query.get(name);
+  }
+  if (query.has("autorun")) form.requestSubmit();
+});
@@ -0,0 +1,224 @@
+/*
+ * Keyed, diffing renderer for the activity list.
+ *
+ * Every activity card is created once and kept in a Map by activity name.
+ * Rendering compares the new state with what a card shows and only touches
+ * the DOM nodes whose text changed. Cards are moved, never rebuilt, when
+ * the order changes. The <select> options are kept in step the same way.
+ *
+ * Participant lists are virtualized: a list scrolls inside a viewport of
+ * VISIBLE_ROWS rows, and only the rows in view (plus OVERSCAN on each side)
+ * exist in the DOM. They are reused as the list scrolls, so a roster of
+ * 100,000 costs as much to draw as one of 20.
+ *
+ * Rows carry their email in data-email and cards their activity in
+ * data-activity, so one listener on the container handles every remove
+ * button (see app.js).
+ */
+(function () {
+  "use strict";
+
+  // Height of a participant row in pixels; .participants-list li matches it
+  const ROW_HEIGHT = 30;
+  // Rows shown before a participant list starts to scroll
+  const VISIBLE_ROWS = 10;
+  // Rows kept rendered beyond each edge of the viewport while scrolling
+  const OVERSCAN = 5;
+
+  function element(tag, className, text) {
+    const node = document.createElement(tag);
+    if (className) node.className = className;
+    if (text !== undefined) node.textContent = text;
+    return node;
+  }
+
+  function setText(node, text) {
+    if (node.textContent !== text) node.textContent = text;
+  }
+
+  function createRow() {
+    const row = element("li");
+    row.appendChild(element("span", "participant-email"));
+    const button = element("button", "delete-btn", "×");
+    button.type = "button";
+    button.title = "Remove participant";
+    row.appendChild(button);
+    return row;
+  }
+
+  // A participant list that only renders the rows in view
+  class ParticipantList {
+    constructor() {
+      this.emails = [];
+      this.frame = null;
+      this.element = element("div", "participants-viewport");
+      this.spacer = element("div", "participants-spacer");
+      this.list = element("ul", "participants-list");
+      this.spacer.appendChild(this.list);
+      this.element.appendChild(this.spacer);
+      this.element.addEventListener("scroll", () => this.scheduleRender(), { passive: true });
+    }
+
+    // Lists are replaced, never mutated, so an unchanged list is the same array
+    setEmails(emails) {
+      if (emails === this.emails) return;
+      this.emails = emails;
+      this.element.style.height = `${Math.min(emails.length, VISIBLE_ROWS) * ROW_HEIGHT}px`;
+      this.spacer.style.height = `${emails.length * ROW_HEIGHT}px`;
+      this.renderRows();
+    }
+
+    scheduleRender() {
+      if (this.frame !== null) return;
+      this.frame = requestAnimationFrame(() => {
+        this.frame = null;
+        this.renderRows();
+      });
+    }
+
+    renderRows() {
+      const top = Math.floor(this.element.scrollTop / ROW_HEIGHT);
+      const first = Math.max(0, top - OVERSCAN);
+      const last = Math.min(this.emails.length, top + VISIBLE_ROWS + OVERSCAN);
+      const count = Math.max(0, last - first);
+      const rows = this.list.children;
+
+      while (rows.length < count) this.list.appendChild(createRow());
+      while (rows.length > count) this.list.lastChild.remove();
+      this.list.style.transform = `translateY(${first * ROW_HEIGHT}px)`;
+
+      for (let i = 0; i < count; i++) {
+        const email = this.emails[first + i];
+        const row = rows[i];
+        if (row.dataset.email !== email) {
+          row.dataset.email = email;
+          row.firstChild.textContent = email;
+        }
+      }
+    }
+  }
+
+  // One activity's card; update() writes only what changed
+  class ActivityCard {
+    constructor(name) {
+      this.element = element("div", "activity-card");
+      this.element.dataset.activity = name;
+      this.element.appendChild(element("h4", null, name));
+      this.description = this.element.appendChild(element("p"));
+
+      const schedule = this.element.appendChild(element("p"));
+      schedule.appendChild(element("strong", null, "Schedule:"));
+      this.schedule = schedule.appendChild(element("span"));
+
+      const availability = this.element.appendChild(element("p"));
+      availability.appendChild(element("strong", null, "Availability:"));
+      this.availability = availability.appendChild(element("span"));
+
+      const section = this.element.appendChild(element("div", "participants-section"));
+      this.title = section.appendChild(element("div", "participants-title"));
+      this.participants = new ParticipantList();
+      section.appendChild(this.participants.element);
+      this.empty = section.appendChild(element("div", "no-participants", "No participants yet"));
+    }
+
+    update(details) {
+      const participants = details.participants || [];
+      setText(this.description, details.description);
+      setText(this.schedule, ` ${details.schedule}`);
+      setText(this.availability, ` ${details.max_participants - participants.length} spots left`);
+      setText(this.title, `Current Participants (${participants.length}):`);
+      this.participants.setEmails(participants);
+      this.participants.element.hidden = participants.length === 0;
+      this.empty.hidden = participants.length > 0;
+    }
+  }
+
+  class ActivityListRenderer {
+    constructor(container, select) {
+      this.container = container;
+      this.select = select;
+      this.cards = new Map();
+      this.options = new Map();
+    }
+
+    // Make the list show exactly the activities in `activities`, in order
+    render(activities) {
+      const names = Object.keys(activities);
+      const wanted = new Set(names);
+      for (const name of Array.from(this.cards.keys())) {
+        if (!wanted.has(name)) this.remove(name);
+      }
+      // Anything that is not a card, such as the loading message, goes
+      for (const node of Array.from(this.container.children)) {
+        if (!node.classList.contains("activity-card")) node.remove();
+      }
+
+      let previousCard = null;
+      // The first option is the "Select an activity" placeholder
+      let previousOption = this.select.options[0] || null;
+      for (const name of names) {
+        const card = this.cardFor(name);
+        card.update(activities[name]);
+        const expectedCard = previousCard ? previousCard.nextElementSibling : this.container.firstElementChild;
+        if (card.element !== expectedCard) this.container.insertBefore(card.element, expectedCard);
+        previousCard = card.element;
+
+        const option = this.optionFor(name);
+        const expectedOption = previousOption ? previousOption.nextElementSibling : this.select.firstElementChild;
+        if (option !== expectedOption) this.select.insertBefore(option, expectedOption);
+        previousOption = option;
+      }
+    }
+
+    // Show one activity's new state, or drop it when `details` is missing
+    update(name, details) {
+      if (!details) {
+        this.remove(name);
+        return;
+      }
+      const isNew = !this.cards.has(name);
+      const card = this.cardFor(name);
+      card.update(details);
+      if (isNew) {
+        this.container.appendChild(card.element);
+        this.select.appendChild(this.optionFor(name));
+      }
+    }
+
+    remove(name) {
+      const card = this.cards.get(name);
+      if (card) card.element.remove();
+      this.cards.delete(name);
+      const option = this.options.get(name);
+      if (option) option.remove();
+      this.options.delete(name);
+    }
+
+    // Replace the whole list with a message
+    showMessage(text) {
+      for (const name of Array.from(this.cards.keys())) this.remove(name);
+      this.container.replaceChildren(element("p", null, text));
+    }
+
+    cardFor(name) {
+      let card = this.cards.get(name);
+      if (!card) {
+        card = new ActivityCard(name);
+        this.cards.set(name, card);
+      }
+      return card;
+    }
+
+    optionFor(name) {
+      let option = this.options.get(name);
+      if (!option) {
+        option = element("option", null, name);
+        option.value = name;
+        this.options.set(name, option);
+      }
+      return option;
+    }
+  }
+
+  window.ActivityRenderer = { ActivityListRenderer, ROW_HEIGHT, VISIBLE_ROWS };
+})();
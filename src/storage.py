@@ -0,0 +1,457 @@
+"""
+Storage backends for the roster store.
+
+The store describes every mutation as a small JSON-serialisable operation
+(see ``ActivityStore.apply``) and hands it to a backend, which makes it
+durable. Three backends share the same interface:
+
+- ``MemoryBackend`` keeps nothing; state is lost on restart.
+- ``WriteAheadLogBackend`` appends operations to a log and periodically
+  writes a compacted snapshot so restart time stays bounded.
+- ``SQLiteBackend`` keeps the current state in a SQLite database in WAL mode.
+
+Both durable backends use group commit: operations are queued by request
+threads and a single writer thread persists whole batches with one fsync (or
+one transaction), waking every waiting request at once.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class StorageBackend:
+    """Interface between the roster store and durable storage."""
+
+    # Whether ``sync`` may wait for disk I/O
+    blocking = False
+
+    def load(self):
+        """Return ``(snapshot, operations)`` to rebuild the store from.
+
+        ``snapshot`` is a ``GET /activities`` style dict (or ``None`` if
+        nothing was stored) and ``operations`` an iterable of operations to
+        replay on top of it.
+        """
+        return None, ()
+
+    def append(self, operation):
+        """Queue an operation and return a ticket to pass to ``sync``."""
+        return None
+
+    def sync(self, ticket):
+        """Block until the operation identified by ``ticket`` is durable."""
+
+    def attach(self, capture):
+        """Register the store's ``capture`` callback used for compaction."""
+
+    def close(self):
+        """Flush outstanding operations and release resources."""
+
+
+class MemoryBackend(StorageBackend):
+    """Backend that keeps nothing; the default for development and tests."""
+
+
+class _GroupCommitBackend(StorageBackend):
+    """Base class that batches queued operations on a writer thread.
+
+    Subclasses implement ``_write_batch`` to persist a list of
+    ``(lsn, operation)`` pairs.
+    """
+
+    blocking = True
+
+    def __init__(self, commit_delay=0.0):
+        self.commit_delay = commit_delay
+        self.batches_written = 0
+        self._lsn = 0
+        self._durable_lsn = 0
+        self._pending = []
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._writer = None
+
+    def _start(self):
+        self._writer = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._writer.start()
+
+    def append(self, operation):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("storage backend is closed")
+            self._lsn += 1
+            self._pending.append((self._lsn, operation))
+            self._cond.notify_all()
+            return self._lsn
+
+    def sync(self, ticket):
+        if ticket is None:
+            return
+        with self._cond:
+            while self._durable_lsn < ticket and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+            if self.commit_delay:
+                # Give concurrent requests a moment to join this batch
+                threading.Event().wait(self.commit_delay)
+            with self._cond:
+                batch, self._pending = self._pending, []
+            try:
+                self._write_batch(batch)
+            except Exception as error:
+                with self._cond:
+                    self._error = error
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self.batches_written += 1
+                self._durable_lsn = max(self._durable_lsn, batch[-1][0])
+                self._cond.notify_all()
+            self._after_batch()
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def _after_batch(self):
+        """Hook run on the writer thread after each durable batch."""
+
+
+class WriteAheadLogBackend(_GroupCommitBackend):
+    """Append-only operation log with periodic compacted snapshots.
+
+    The directory holds ``snapshot-<lsn>.json`` files and ``wal-<lsn>.log``
+    segments of newline-delimited JSON operations. Once
+    ``snapshot_every`` operations have been logged since the last snapshot,
+    the writer thread captures the store, starts a new segment and writes a
+    snapshot; older segments and snapshots are then deleted.
+    """
+
+    def __init__(self, directory, snapshot_every=10_000, fsync=True, commit_delay=0.0):
+        super().__init__(commit_delay=commit_delay)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._capture = None
+        self._since_snapshot = 0
+        self._file_lock = threading.Lock()
+        self._segment = None
+        self._snapshot_lsn = 0
+
+    def attach(self, capture):
+        self._capture = capture
+
+    def load(self):
+        snapshot = None
+        snapshots = sorted(self.directory.glob("snapshot-*.json"))
+        if snapshots:
+            with open(snapshots[-1], encoding="utf-8") as f:
+                stored = json.load(f)
+            snapshot = stored["activities"]
+            self._snapshot_lsn = stored["lsn"]
+        operations = []
+        lsn = self._snapshot_lsn
+        for segment in sorted(self.directory.glob("wal-*.log")):
+            for entry in self._read_segment(segment):
+                if entry["lsn"] <= lsn:
+                    continue
+                lsn = entry["lsn"]
+                operations.append(entry["op"])
+        self._lsn = self._durable_lsn = lsn
+        self._since_snapshot = len(operations)
+        self._open_segment(lsn + 1)
+        self._start()
+        return snapshot, operations
+
+    def _compact(self):
+        """Capture the store, write a snapshot and drop covered segments.
+
+        Only ever runs on the writer thread, so no batch can be in flight
+        while the log is rotated.
+        """
+        state, lsn = self._capture(self._rotate)
+        path = self.directory / f"snapshot-{lsn:012d}.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"lsn": lsn, "activities": state}, f, separators=(",", ":"))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._fsync_directory()
+        self._snapshot_lsn = lsn
+        for old in self.directory.glob("snapshot-*.json"):
+            if old != path:
+                old.unlink()
+        for segment in self.directory.glob("wal-*.log"):
+            if self._segment_start(segment) <= lsn:
+                segment.unlink()
+
+    def close(self):
+        super().close()
+        with self._file_lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+
+    def _rotate(self):
+        """Flush every queued operation and start a new segment.
+
+        Called by the store's capture while it holds every activity lock, so
+        no operation can be appended concurrently, and only from the writer
+        thread, so no other batch is in flight. Returns the last LSN
+        covered by the captured state.
+        """
+        with self._cond:
+            batch, self._pending = self._pending, []
+            lsn = self._lsn
+        with self._file_lock:
+            if batch:
+                self._write_entries(batch)
+            self._open_segment(lsn + 1)
+        with self._cond:
+            if batch:
+                self.batches_written += 1
+                self._durable_lsn = max(self._durable_lsn, batch[-1][0])
+                self._cond.notify_all()
+            self._since_snapshot = 0
+        return lsn
+
+    def _write_batch(self, batch):
+        with self._file_lock:
+            self._write_entries(batch)
+        self._since_snapshot += len(batch)
+
+    def _write_entries(self, batch):
+        self._segment.write("".join(
+            json.dumps({"lsn": lsn, "op": op}, separators=(",", ":")) + "\n"
+            for lsn, op in batch
+        ))
+        self._segment.flush()
+        if self.fsync:
+            os.fsync(self._segment.fileno())
+
+    def _after_batch(self):
+        if self._capture is not None and self._since_snapshot >= self.snapshot_every:
+            self._compact()
+
+    def _open_segment(self, start_lsn):
+        if self._segment is not None:
+            self._segment.close()
+        path = self.directory / f"wal-{start_lsn:012d}.log"
+        self._segment = open(path, "a", encoding="utf-8")
+        self._fsync_directory()
+
+    def _fsync_directory(self):
+        if not self.fsync or not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _segment_start(path):
+        return int(path.stem.split("-", 1)[1])
+
+    def _read_segment(self, path):
+        """Return a segment's entries, cutting off a torn write at its tail.
+
+        Nothing after a torn write was acknowledged. The segment is
+        truncated to its last complete entry, so operations appended to it
+        after recovery never follow a partial line.
+        """
+        entries, end = [], 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+                end += len(line)
+            size = f.seek(0, os.SEEK_END)
+        if end < size:
+            with open(path, "r+b") as f:
+                f.truncate(end)
+                if self.fsync:
+                    os.fsync(f.fileno())
+        return entries
+
+
+class SQLiteBackend(_GroupCommitBackend):
+    """Keeps the current state in SQLite, one transaction per batch.
+
+    The database runs in WAL journal mode with ``synchronous=NORMAL``. All
+    statements are constant strings, so sqlite3's statement cache prepares
+    each of them once and reuses it for every operation.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS activities (
+            name TEXT PRIMARY KEY,
+            description TEXT NOT NULL,
+            schedule TEXT NOT NULL,
+            max_participants INTEGER NOT NULL,
+            position INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS participants (
+            activity TEXT NOT NULL,
+            email TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (activity, email)
+        );
+        CREATE INDEX IF NOT EXISTS participants_by_position
+            ON participants (activity, position);
+        CREATE TABLE IF NOT EXISTS waitlist (
+            activity TEXT NOT NULL,
+            email TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (activity, email)
+        );
+        CREATE INDEX IF NOT EXISTS waitlist_by_position
+            ON waitlist (activity, position);
+    """
+
+    _INSERT_ACTIVITY = (
+        "INSERT INTO activities (name, description, schedule, max_participants, position) "
+        "VALUES (?, ?, ?, ?, ?)"
+    )
+    _DELETE_ACTIVITY = "DELETE FROM activities WHERE name = ?"
+    _DELETE_ROSTER = "DELETE FROM participants WHERE activity = ?"
+    _INSERT_PARTICIPANT = "INSERT INTO participants (activity, email, position) VALUES (?, ?, ?)"
+    _DELETE_PARTICIPANT = "DELETE FROM participants WHERE activity = ? AND email = ?"
+    _DELETE_WAITLIST = "DELETE FROM waitlist WHERE activity = ?"
+    _INSERT_WAITING = "INSERT INTO waitlist (activity, email, position) VALUES (?, ?, ?)"
+    _DELETE_WAITING = "DELETE FROM waitlist WHERE activity = ? AND email = ?"
+
+    def __init__(self, path, commit_delay=0.0):
+        super().__init__(commit_delay=commit_delay)
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+        self._position = 0
+
+    def load(self):
+        conn = self._conn
+        rows = conn.execute(
+            "SELECT name, description, schedule, max_participants FROM activities ORDER BY position"
+        ).fetchall()
+        self._position = conn.execute(
+            "SELECT MAX(m) FROM (SELECT MAX(position) AS m FROM activities "
+            "UNION ALL SELECT MAX(position) FROM participants "
+            "UNION ALL SELECT MAX(position) FROM waitlist)"
+        ).fetchone()[0] or 0
+        self._start()
+        if not rows:
+            return None, ()
+        snapshot = {}
+        for name, description, schedule, max_participants in rows:
+            snapshot[name] = {
+                "description": description,
+                "schedule": schedule,
+                "max_participants": max_participants,
+                "participants": [email for (email,) in conn.execute(
+                    "SELECT email FROM participants WHERE activity = ? ORDER BY position", (name,)
+                )],
+            }
+            waitlist = [email for (email,) in conn.execute(
+                "SELECT email FROM waitlist WHERE activity = ? ORDER BY position", (name,)
+            )]
+            if waitlist:
+                snapshot[name]["waitlist"] = waitlist
+        return snapshot, ()
+
+    def close(self):
+        super().close()
+        self._conn.close()
+
+    def _write_batch(self, batch):
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            for _, op in batch:
+                self._apply(conn, op)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _next_position(self):
+        self._position += 1
+        return self._position
+
+    def _apply(self, conn, op):
+        kind = op["op"]
+        name = op["activity"]
+        if kind == "signup":
+            conn.execute(self._INSERT_PARTICIPANT, (name, op["email"], self._next_position()))
+        elif kind == "remove":
+            conn.execute(self._DELETE_PARTICIPANT, (name, op["email"]))
+        elif kind == "waitlist":
+            conn.execute(self._INSERT_WAITING, (name, op["email"], self._next_position()))
+        elif kind == "unwaitlist":
+            conn.execute(self._DELETE_WAITING, (name, op["email"]))
+        elif kind == "promote":
+            conn.execute(self._DELETE_WAITING, (name, op["email"]))
+            conn.execute(self._INSERT_PARTICIPANT, (name, op["email"], self._next_position()))
+        elif kind == "put":
+            data = op["data"]
+            conn.execute(self._DELETE_ROSTER, (name,))
+            conn.execute(self._DELETE_WAITLIST, (name,))
+            conn.execute(self._DELETE_ACTIVITY, (name,))
+            conn.execute(self._INSERT_ACTIVITY, (
+                name, data["description"], data["schedule"], data["max_participants"],
+                self._next_position(),
+            ))
+            conn.executemany(self._INSERT_PARTICIPANT, [
+                (name, email, self._next_position()) for email in data["participants"]
+            ])
+            conn.executemany(self._INSERT_WAITING, [
+                (name, email, self._next_position()) for email in data.get("waitlist", ())
+            ])
+        elif kind == "delete":
+            conn.execute(self._DELETE_ROSTER, (name,))
+            conn.execute(self._DELETE_WAITLIST, (name,))
+            conn.execute(self._DELETE_ACTIVITY, (name,))
+        else:
+            raise ValueError(f"Unknown operation: {kind}")
+
+
+def open_backend(kind, data_dir):
+    """Create the backend named by ``kind`` ("memory", "wal" or "sqlite")."""
+    if kind == "memory":
+        return MemoryBackend()
+    data_dir = Path(data_dir)
+    if kind == "wal":
+        return WriteAheadLogBackend(data_dir / "wal")
+    if kind == "sqlite":
+        data_dir.mkdir(parents=True, exist_ok=True)
+        return SQLiteBackend(data_dir / "activities.sqlite3")
+    raise ValueError(f"Unknown storage backend: {kind}")
@@ -0,0 +1,931 @@
+"""
+Roster store for the Mergington High School API.
+
+Activities are kept in an ``ActivityStore``, a mapping of activity name to
+``Activity``. Each activity keeps its participants in a ``Roster``, an ordered
+set that gives constant-time membership checks, inserts and removals while
+still listing participants in sign-up order. The store also maintains a
+reverse index from student email to the activities they are signed up for.
+
+A full activity can keep a ``Waitlist``. When a removal frees a place, the
+student at the head of the waitlist is promoted onto the roster in the same
+critical section, so the place can never go to whoever happens to retry
+first. While anyone is waiting, direct signups are refused.
+
+Signups and removals are atomic. The store is used from the event loop and
+from worker threads at once, so every roster change happens under its
+activity's lock; the check for duplicates and capacity and the insert itself
+can never interleave with another request for the same activity. Requests
+for different activities do not contend. Locks are always taken in the order
+store -> activity -> reverse index; code that needs several activity locks
+takes them in name order.
+
+Each mutation bumps the store's ``version``, a counter that only ever goes
+up, so readers can cheaply tell whether anything changed since they last
+looked. Listeners registered with ``add_listener`` are told about every
+mutation in version order; indexes and the change feed hang off this hook.
+
+Every mutation is also described as an operation (see ``apply``) and handed to
+the store's storage backend while the activity lock is held, so the log order
+matches the order changes were made in. Waiting for the backend to make the
+operation durable happens after the lock is released.
+"""
+
+import bisect
+import sys
+import threading
+from array import array
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from collections.abc import Mapping, MutableMapping
+
+from storage import MemoryBackend
+
+
+class StoreError(Exception):
+    """Base class for errors raised by the roster store."""
+
+
+class ActivityNotFoundError(StoreError):
+    """The activity does not exist."""
+
+
+class AlreadySignedUpError(StoreError):
+    """The student is already on the activity's roster."""
+
+
+class ActivityFullError(StoreError):
+    """The activity has reached ``max_participants``."""
+
+
+class NotSignedUpError(StoreError):
+    """The student is not on the activity's roster."""
+
+
+class AlreadyWaitlistedError(StoreError):
+    """The student is already on the activity's waitlist."""
+
+
+class NotWaitlistedError(StoreError):
+    """The student is not on the activity's waitlist."""
+
+
+class SpotsAvailableError(StoreError):
+    """The activity has free places, so there is nothing to wait for."""
+
+
+class ScheduleConflictError(StoreError):
+    """The activity clashes with others the student is signed up for."""
+
+    def __init__(self, activity_name, conflicts):
+        super().__init__(activity_name, conflicts)
+        self.conflicts = conflicts
+
+
+class EmailTable:
+    """Dictionary encoding of student emails as small integer ids.
+
+    Each distinct email is stored once and given the next id; rosters hold
+    ids in compact arrays instead of a string per enrollment. Ids are never
+    reused, so the table grows with the number of distinct students ever
+    seen, not with enrollments. Each store has its own table, shared by its
+    rosters, and the table goes when the store does.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self.emails = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.emails)
+
+    def id_for(self, email):
+        """Return ``email``'s id, assigning the next one if it is new."""
+        student_id = self._ids.get(email)
+        if student_id is None:
+            with self._lock:
+                student_id = self._ids.get(email)
+                if student_id is None:
+                    student_id = len(self.emails)
+                    self.emails.append(email)
+                    self._ids[email] = student_id
+        return student_id
+
+    def lookup(self, email):
+        """Return ``email``'s id, or ``None`` if it has never been seen."""
+        return self._ids.get(email)
+
+    def intern(self, email):
+        """Return the table's own copy of ``email``, so equal emails share one string."""
+        return self.emails[self.id_for(email)]
+
+
+class Roster:
+    """Ordered set of participant emails, kept in sign-up order.
+
+    Every sign-up gets a sequence number that only ever increases, which
+    gives pagination a stable position to resume from. Participants are
+    held as ``EmailTable`` ids in an array in sign-up order, with their sequence
+    numbers in a parallel array; both stay sorted, so a page seeks straight
+    to its start with a binary search. A second pair of arrays holds the
+    same ids sorted by id, with their sequence numbers, for O(log n)
+    membership checks. That is 24 bytes per participant, where a dict
+    entry, a set entry and a boxed int each cost more on their own; the
+    price is a ``memmove`` of the arrays on each add and remove.
+    """
+
+    __slots__ = ("_ids", "_seqs", "_members", "_member_seqs", "_next_seq", "_table")
+
+    def __init__(self, emails=(), table=None):
+        # Rosters of one store share its table, so a student on several
+        # activities is stored once
+        self._table = table if table is not None else EmailTable()
+        # Sign-up order
+        self._ids = array("i")
+        self._seqs = array("q")
+        # Id order
+        self._members = array("i")
+        self._member_seqs = array("q")
+        self._next_seq = 1
+        for email in emails:
+            self.add(email)
+
+    def __contains__(self, email):
+        return self._find(self._table.lookup(email)) is not None
+
+    def __iter__(self):
+        emails = self._table.emails
+        for student_id in self._ids:
+            yield emails[student_id]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __repr__(self):
+        return f"Roster({list(self)!r})"
+
+    @property
+    def table(self):
+        """The ``EmailTable`` the roster's ids refer to."""
+        return self._table
+
+    def add(self, email):
+        """Add a participant to the end of the roster."""
+        student_id = self._table.id_for(email)
+        index = bisect.bisect_left(self._members, student_id)
+        if index < len(self._members) and self._members[index] == student_id:
+            return
+        seq = self._next_seq
+        self._next_seq += 1
+        self._members.insert(index, student_id)
+        self._member_seqs.insert(index, seq)
+        self._ids.append(student_id)
+        self._seqs.append(seq)
+
+    def discard(self, email):
+        """Remove a participant if present."""
+        member = self._find(self._table.lookup(email))
+        if member is None:
+            return
+        seq = self._member_seqs[member]
+        del self._members[member]
+        del self._member_seqs[member]
+        index = bisect.bisect_left(self._seqs, seq)
+        del self._ids[index]
+        del self._seqs[index]
+
+    def _find(self, student_id):
+        # Index of student_id in _members, or None
+        if student_id is None:
+            return None
+        index = bisect.bisect_left(self._members, student_id)
+        if index < len(self._members) and self._members[index] == student_id:
+            return index
+        return None
+
+    def page(self, after=0, limit=None):
+        """Return up to ``limit`` participants who signed up after ``after``.
+
+        Returns ``(emails, next_after)``; ``next_after`` is the sequence
+        number to pass as ``after`` for the next page, or ``None`` on the
+        last page. Sequence numbers rather than offsets mean removals and
+        new sign-ups between requests never shift later pages. A page costs
+        O(log n + limit).
+        """
+        start = bisect.bisect_right(self._seqs, after)
+        stop = len(self._seqs) if limit is None else min(len(self._seqs), start + limit)
+        emails = self._table.emails
+        page = [emails[student_id] for student_id in self._ids[start:stop]]
+        if stop < len(self._seqs):
+            return page, self._seqs[stop - 1] if stop > start else after
+        return page, None
+
+
+class Waitlist:
+    """First-come, first-served queue of students waiting for a place.
+
+    Every student joining gets the next ticket number. Tickets sit in a
+    deque in ticket order, so the head is popped in O(1). Leaving only
+    forgets the student's ticket and records it as cancelled; the stale
+    entry is skipped when it reaches the head. A position is the distance
+    from the head ticket less the cancelled tickets in between, found by
+    bisecting the sorted cancelled tickets, so it costs O(log n).
+    """
+
+    __slots__ = ("_queue", "_tickets", "_cancelled", "_cancelled_start", "_next_ticket")
+
+    def __init__(self, emails=()):
+        # (ticket, email) in ticket order, including cancelled entries;
+        # created on first use, as most activities never have a waitlist
+        self._queue = None
+        # email -> ticket for students still waiting
+        self._tickets = {}
+        # Sorted cancelled tickets; those before _cancelled_start have
+        # already left the queue
+        self._cancelled = []
+        self._cancelled_start = 0
+        self._next_ticket = 1
+        for email in emails:
+            self.add(email)
+
+    def __contains__(self, email):
+        return email in self._tickets
+
+    def __iter__(self):
+        for ticket, email in self._queue or ():
+            if self._tickets.get(email) == ticket:
+                yield email
+
+    def __len__(self):
+        return len(self._tickets)
+
+    def __repr__(self):
+        return f"Waitlist({list(self)!r})"
+
+    def add(self, email):
+        """Add a student to the back of the queue."""
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        if self._queue is None:
+            self._queue = deque()
+        self._queue.append((ticket, email))
+        self._tickets[email] = ticket
+
+    def discard(self, email):
+        """Remove a waiting student; return whether they were waiting."""
+        ticket = self._tickets.pop(email, None)
+        if ticket is None:
+            return False
+        bisect.insort(self._cancelled, ticket, lo=self._cancelled_start)
+        self._skip_cancelled()
+        return True
+
+    def peek(self):
+        """Return the student at the head without removing them, or ``None``."""
+        return self._queue[0][1] if self._tickets else None
+
+    def pop(self):
+        """Remove and return the student at the head, or ``None``."""
+        if not self._tickets:
+            return None
+        _, email = self._queue.popleft()
+        del self._tickets[email]
+        self._skip_cancelled()
+        return email
+
+    def position(self, email):
+        """Return a student's 1-based place in the queue, or ``None``."""
+        ticket = self._tickets.get(email)
+        if ticket is None:
+            return None
+        head = self._queue[0][0]
+        cancelled_ahead = bisect.bisect_left(self._cancelled, ticket, lo=self._cancelled_start)
+        return ticket - head - (cancelled_ahead - self._cancelled_start) + 1
+
+    def _skip_cancelled(self):
+        # Keep a live ticket at the head so positions can be measured from it
+        cancelled = self._cancelled
+        while self._queue and self._cancelled_start < len(cancelled) \
+                and self._queue[0][0] == cancelled[self._cancelled_start]:
+            self._queue.popleft()
+            self._cancelled_start += 1
+        if self._cancelled_start > 64 and self._cancelled_start * 2 > len(cancelled):
+            del cancelled[:self._cancelled_start]
+            self._cancelled_start = 0
+
+
+class Activity:
+    """An extracurricular activity, its roster and its waitlist."""
+
+    __slots__ = ("description", "schedule", "max_participants", "roster", "waitlist", "lock")
+
+    def __init__(self, description, schedule, max_participants, participants=(), waitlist=(),
+                 emails=None):
+        self.description = description
+        self.schedule = schedule
+        self.max_participants = max_participants
+        self.roster = Roster(participants, emails)
+        self.waitlist = Waitlist(waitlist)
+        # Reentrant so ``ActivityStore.try_hold`` can hold it around store calls
+        self.lock = threading.RLock()
+
+    @property
+    def spots_left(self):
+        """Number of places still available."""
+        return max(self.max_participants - len(self.roster), 0)
+
+    @classmethod
+    def from_dict(cls, data, emails=None):
+        """Build an activity from its JSON representation.
+
+        ``emails`` is the ``EmailTable`` for its roster, normally the store's.
+        """
+        return cls(
+            description=data["description"],
+            schedule=data["schedule"],
+            max_participants=data["max_participants"],
+            participants=data.get("participants", ()),
+            waitlist=data.get("waitlist", ()),
+            emails=emails,
+        )
+
+    def to_dict(self):
+        """Return the JSON representation served by ``GET /activities``.
+
+        ``waitlist`` is only included while someone is waiting.
+        """
+        data = {
+            "description": self.description,
+            "schedule": self.schedule,
+            "max_participants": self.max_participants,
+            "participants": list(self.roster),
+        }
+        if self.waitlist:
+            data["waitlist"] = list(self.waitlist)
+        return data
+
+
+class ActivityStore(MutableMapping):
+    """Mapping of activity name to ``Activity`` with a student reverse index.
+
+    Plain dicts in the ``GET /activities`` format are accepted wherever an
+    ``Activity`` is expected, so the store can be seeded (or reset) with
+    ``store.update({...})``.
+
+    ``backend`` is the ``storage.StorageBackend`` that persists mutations;
+    call ``recover`` to reload whatever it holds.
+    """
+
+    def __init__(self, activities=None, backend=None):
+        self._activities = {}
+        # Shared by this store's rosters and the reverse index
+        self.emails = EmailTable()
+        # email -> tuple of activity names the student is signed up for
+        self._students = {}
+        # Guards structural changes (adding, replacing, removing activities)
+        self._lock = threading.RLock()
+        # Reentrant so a whole atomic batch can hold it across its signups
+        self._index_lock = threading.RLock()
+        self._signup_checks = []
+        self._replaying = False
+        self._version_lock = threading.Lock()
+        self.version = 0
+        self._listeners = []
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.backend.attach(self.capture)
+        if activities:
+            self.update(activities)
+
+    def __getitem__(self, name):
+        return self._activities[name]
+
+    def __setitem__(self, name, activity):
+        if isinstance(activity, Mapping):
+            activity = Activity.from_dict(activity, self.emails)
+        elif activity.roster.table is not self.emails:
+            # Built elsewhere, perhaps in another store: keep a copy on ours
+            activity = Activity.from_dict(activity.to_dict(), self.emails)
+        # Never wait for the backend while holding the store lock: its
+        # writer thread takes that lock to capture a snapshot
+        with self._lock:
+            if name in self._activities:
+                self._delete(name)
+            with activity.lock:
+                with self._index_lock:
+                    self._activities[name] = activity
+                    for email in activity.roster:
+                        self._index(email, name)
+                ticket = self._commit({"op": "put", "activity": name, "data": activity.to_dict()})
+                # A put may have added places for students already waiting
+                ticket = self._promote(name, activity) or ticket
+        self.backend.sync(ticket)
+
+    def __delitem__(self, name):
+        with self._lock:
+            ticket = self._delete(name)
+        self.backend.sync(ticket)
+
+    def _delete(self, name):
+        # Caller holds the store lock and syncs the ticket once it is released
+        activity = self._activities[name]
+        with activity.lock:
+            with self._index_lock:
+                del self._activities[name]
+                for email in activity.roster:
+                    self._unindex(email, name)
+            return self._commit({"op": "delete", "activity": name})
+
+    def __iter__(self):
+        return iter(self._activities)
+
+    def __len__(self):
+        return len(self._activities)
+
+    def clear(self):
+        ticket = None
+        with self._lock:
+            for name in list(self._activities):
+                ticket = self._delete(name)
+        # Tickets are durable in order, so the last one covers the rest
+        self.backend.sync(ticket)
+
+    def add_participant(self, activity_name, email):
+        """Atomically sign ``email`` up for an activity.
+
+        Raises ``ActivityNotFoundError``, ``AlreadySignedUpError`` or
+        ``ActivityFullError`` without changing anything if the signup is not
+        allowed.
+        """
+        with self._locked(activity_name) as activity:
+            ticket = self._signup(activity_name, activity, email)
+        self.backend.sync(ticket)
+
+    def remove_participant(self, activity_name, email):
+        """Atomically remove ``email`` from an activity's roster.
+
+        Raises ``ActivityNotFoundError`` or ``NotSignedUpError`` if there is
+        nothing to remove.
+        """
+        with self._locked(activity_name) as activity:
+            ticket = self._remove(activity_name, activity, email)
+        self.backend.sync(ticket)
+
+    def join_waitlist(self, activity_name, email):
+        """Queue ``email`` for the next free place on an activity.
+
+        Returns the student's position. Raises ``ActivityNotFoundError``,
+        ``AlreadySignedUpError``, ``AlreadyWaitlistedError`` or
+        ``SpotsAvailableError`` if there is nothing to wait for, and any
+        error raised by the signup checks.
+        """
+        with self._locked(activity_name) as activity:
+            ticket = self._join_waitlist(activity_name, activity, email)
+            position = activity.waitlist.position(email)
+        self.backend.sync(ticket)
+        return position
+
+    def leave_waitlist(self, activity_name, email):
+        """Take ``email`` off an activity's waitlist.
+
+        Raises ``ActivityNotFoundError`` or ``NotWaitlistedError``.
+        """
+        with self._locked(activity_name) as activity:
+            ticket = self._leave_waitlist(activity_name, activity, email)
+        self.backend.sync(ticket)
+
+    def unenroll(self, email):
+        """Remove ``email`` from every activity they are signed up for.
+
+        The student's activities are all locked at once, so nobody sees
+        them removed from some and not yet from others. Freed places go to
+        waitlists as usual; waitlists the student is on are left alone.
+        Returns the names of the activities they were removed from, sorted.
+        """
+        while True:
+            names = self.activities_for(email)
+            with self._locked_many(names) as live:
+                with self._index_lock:
+                    enrolled = set(self._students.get(email, ()))
+                if not enrolled <= live.keys():
+                    # Signed up for something else since we looked; lock that too
+                    continue
+                ticket = None
+                for name in sorted(enrolled):
+                    ticket = self._remove(name, live[name], email) or ticket
+            self.backend.sync(ticket)
+            return sorted(enrolled)
+
+    def waitlist_position(self, activity_name, email):
+        """Return ``(position, waiting)`` for a student on a waitlist.
+
+        Raises ``ActivityNotFoundError`` or ``NotWaitlistedError``.
+        """
+        with self._locked(activity_name) as activity:
+            position = activity.waitlist.position(email)
+            if position is None:
+                raise NotWaitlistedError(email)
+            return position, len(activity.waitlist)
+
+    def apply_batch(self, operations, atomic=False):
+        """Apply many signups and removals under a single lock acquisition.
+
+        ``operations`` is a sequence of ``(op, activity_name, email)`` with
+        ``op`` either ``"signup"`` or ``"remove"``. Every activity involved
+        is locked once for the whole batch and the batch is made durable
+        with a single sync.
+
+        Returns ``(applied, errors)`` where ``errors`` holds the
+        ``StoreError`` for each failed operation or ``None`` for each one
+        that succeeded. With ``atomic=True`` the batch is validated first
+        and nothing at all is applied if any operation would fail.
+        """
+        operations = list(operations)
+        ticket = None
+        with ExitStack() as stack:
+            live = stack.enter_context(self._locked_many({name for _, name, _ in operations}))
+            if atomic:
+                # Hold the reverse index too, so schedule checks cannot be
+                # invalidated between the dry run and applying the batch
+                stack.enter_context(self._index_lock)
+                errors = self._validate_batch(operations, live)
+                if any(errors):
+                    return False, errors
+            errors = []
+            for op, name, email in operations:
+                try:
+                    activity = live.get(name)
+                    if activity is None:
+                        raise ActivityNotFoundError(name)
+                    if op == "signup":
+                        ticket = self._signup(name, activity, email) or ticket
+                    elif op == "remove":
+                        ticket = self._remove(name, activity, email) or ticket
+                    else:
+                        raise ValueError(f"Unknown operation: {op}")
+                except StoreError as error:
+                    errors.append(error)
+                else:
+                    errors.append(None)
+        self.backend.sync(ticket)
+        return True, errors
+
+    def apply(self, operation):
+        """Apply an operation as produced for the storage backend.
+
+        Operations are dicts with an ``op`` of ``"signup"``, ``"remove"``,
+        ``"waitlist"``, ``"unwaitlist"``, ``"promote"`` (all with
+        ``activity`` and ``email``), ``"put"`` (with ``activity`` and
+        ``data`` in the ``GET /activities`` format) or ``"delete"``.
+        ``"promote"`` moves the head of the waitlist onto the roster and is
+        only ever produced by the store itself. Returns the position for
+        ``"waitlist"``, otherwise ``None``.
+        """
+        kind = operation["op"]
+        name = operation["activity"]
+        if kind == "signup":
+            self.add_participant(name, operation["email"])
+        elif kind == "remove":
+            self.remove_participant(name, operation["email"])
+        elif kind == "waitlist":
+            return self.join_waitlist(name, operation["email"])
+        elif kind == "unwaitlist":
+            self.leave_waitlist(name, operation["email"])
+        elif kind == "promote":
+            with self._locked(name) as activity:
+                ticket = self._promote_student(name, activity, operation["email"])
+            self.backend.sync(ticket)
+        elif kind == "put":
+            self[name] = operation["data"]
+        elif kind == "delete":
+            del self[name]
+        else:
+            raise ValueError(f"Unknown operation: {kind}")
+
+    def recover(self):
+        """Rebuild the store from its backend.
+
+        Returns ``False`` if the backend holds no data, in which case the
+        store is left untouched so the caller can seed it.
+        """
+        snapshot, operations = self.backend.load()
+        self._replaying = True
+        try:
+            if snapshot is not None:
+                self.clear()
+                self.update(snapshot)
+            replayed = False
+            for operation in operations:
+                self.apply(operation)
+                replayed = True
+        finally:
+            self._replaying = False
+        return snapshot is not None or replayed
+
+    def capture(self, checkpoint):
+        """Return ``(state, checkpoint())`` from a single consistent moment.
+
+        Every activity lock is held while the state is copied and
+        ``checkpoint`` runs, so no mutation can slip in between the two. The
+        backend uses this to pair a snapshot with its log position.
+        """
+        with self._lock:
+            held = [self._activities[name] for name in sorted(self._activities)]
+            for activity in held:
+                activity.lock.acquire()
+            try:
+                state = {name: activity.to_dict() for name, activity in self._activities.items()}
+                return state, checkpoint()
+            finally:
+                for activity in reversed(held):
+                    activity.lock.release()
+
+    @property
+    def writes_block(self):
+        """Whether a write may wait on I/O once the change has been made."""
+        return self.backend.blocking
+
+    @contextmanager
+    def try_hold(self, activity_name):
+        """Take an activity's lock and the reverse index lock without waiting.
+
+        Yields whether both were free. Both locks are reentrant, so while
+        they are held the calling thread can make any change to that
+        activity through the usual methods without blocking on another
+        thread. This is what lets the event loop make cheap writes inline
+        (see ``asyncstore``). A missing activity counts as free.
+        """
+        activity = self._activities.get(activity_name)
+        if activity is None:
+            yield True
+            return
+        if not activity.lock.acquire(blocking=False):
+            yield False
+            return
+        try:
+            if not self._index_lock.acquire(blocking=False):
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                self._index_lock.release()
+        finally:
+            activity.lock.release()
+
+    def activities_for(self, email):
+        """Return the names of the activities ``email`` is signed up for."""
+        with self._index_lock:
+            return frozenset(self._students.get(email, ()))
+
+    def to_dict(self):
+        """Return every activity in the ``GET /activities`` format.
+
+        Each roster is copied under its activity's lock, so concurrent
+        signups never show up half-applied.
+        """
+        with self._lock:
+            items = list(self._activities.items())
+        result = {}
+        for name, activity in items:
+            with activity.lock:
+                result[name] = activity.to_dict()
+        return result
+
+    def add_signup_check(self, check):
+        """Call ``check(activity_name, email, enrolled)`` before each signup.
+
+        ``enrolled`` is the set of activities the student is already on.
+        The check raises a ``StoreError`` to refuse the signup. Checks run
+        with the activity and reverse index locks held and are skipped while
+        recovering from the storage backend.
+        """
+        self._signup_checks.append(check)
+
+    def _run_signup_checks(self, activity_name, email, enrolled):
+        if self._replaying:
+            return
+        for check in self._signup_checks:
+            check(activity_name, email, enrolled)
+
+    def add_listener(self, listener):
+        """Call ``listener(operation, version)`` after every mutation.
+
+        Listeners run while the activity lock is held and in version order,
+        so they must be quick and must not call back into the store for
+        anything but reads of the activity being changed.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stop calling a listener registered with ``add_listener``."""
+        self._listeners.remove(listener)
+
+    def _commit(self, operation):
+        # Every mutation commits exactly once, with its activity lock held.
+        # Bumping the version and notifying listeners under one lock keeps
+        # listeners seeing changes in version order.
+        with self._version_lock:
+            self.version += 1
+            for listener in self._listeners:
+                listener(operation, self.version)
+        if self._replaying:
+            return None
+        return self.backend.append(operation)
+
+    @contextmanager
+    def _locked(self, activity_name):
+        """Hold the lock of a live activity for the duration of the block."""
+        activity = self._activities.get(activity_name)
+        if activity is None:
+            raise ActivityNotFoundError(activity_name)
+        with activity.lock:
+            # The activity may have been replaced or deleted while we waited
+            if self._activities.get(activity_name) is not activity:
+                raise ActivityNotFoundError(activity_name)
+            yield activity
+
+    @contextmanager
+    def _locked_many(self, activity_names):
+        """Hold the locks of every live activity in ``activity_names``.
+
+        Yields a dict of name to activity; names that do not exist are left
+        out. Locks are taken in name order while holding the store lock, so
+        no activity can be replaced or deleted halfway through.
+        """
+        with ExitStack() as stack:
+            with self._lock:
+                live = {}
+                for name in sorted(activity_names):
+                    activity = self._activities.get(name)
+                    if activity is not None:
+                        stack.enter_context(activity.lock)
+                        live[name] = activity
+            yield live
+
+    def _signup(self, activity_name, activity, email):
+        # Caller holds the activity lock
+        if email in activity.roster:
+            raise AlreadySignedUpError(email)
+        # Students already waiting get any free place first
+        if len(activity.roster) >= activity.max_participants or (activity.waitlist and not self._replaying):
+            raise ActivityFullError(activity_name)
+        with self._index_lock:
+            # Checking and recording the enrollment under the index lock
+            # stops two concurrent signups of one student from both passing
+            enrolled = self._students.get(email, ())
+            self._run_signup_checks(activity_name, email, enrolled)
+            self._index(email, activity_name)
+        activity.roster.add(email)
+        return self._commit({"op": "signup", "activity": activity_name, "email": email})
+
+    def _remove(self, activity_name, activity, email):
+        # Caller holds the activity lock
+        if email not in activity.roster:
+            raise NotSignedUpError(email)
+        activity.roster.discard(email)
+        with self._index_lock:
+            self._unindex(email, activity_name)
+        ticket = self._commit({"op": "remove", "activity": activity_name, "email": email})
+        return self._promote(activity_name, activity) or ticket
+
+    def _join_waitlist(self, activity_name, activity, email):
+        # Caller holds the activity lock
+        if email in activity.roster:
+            raise AlreadySignedUpError(email)
+        if email in activity.waitlist:
+            raise AlreadyWaitlistedError(email)
+        if len(activity.roster) < activity.max_participants and not activity.waitlist \
+                and not self._replaying:
+            raise SpotsAvailableError(activity_name)
+        with self._index_lock:
+            # Refuse now rather than at promotion time
+            self._run_signup_checks(activity_name, email, self._students.get(email, ()))
+        activity.waitlist.add(email)
+        return self._commit({"op": "waitlist", "activity": activity_name, "email": email})
+
+    def _leave_waitlist(self, activity_name, activity, email, reason=None):
+        # Caller holds the activity lock
+        if not activity.waitlist.discard(email):
+            raise NotWaitlistedError(email)
+        operation = {"op": "unwaitlist", "activity": activity_name, "email": email}
+        if reason is not None:
+            operation["reason"] = reason
+        return self._commit(operation)
+
+    def _promote(self, activity_name, activity):
+        """Fill free places from the head of the waitlist.
+
+        Caller holds the activity lock. A student whose schedule now clashes
+        is taken off the waitlist instead. Skipped while replaying: the log
+        already holds the promotions that followed.
+        """
+        ticket = None
+        if self._replaying:
+            return ticket
+        while activity.waitlist and len(activity.roster) < activity.max_participants:
+            email = activity.waitlist.peek()
+            try:
+                with self._index_lock:
+                    self._run_signup_checks(activity_name, email, self._students.get(email, ()))
+            except StoreError:
+                ticket = self._leave_waitlist(activity_name, activity, email, reason="conflict")
+                continue
+            ticket = self._promote_student(activity_name, activity, email)
+        return ticket
+
+    def _promote_student(self, activity_name, activity, email):
+        # Caller holds the activity lock and has run the signup checks
+        if activity.waitlist.peek() == email:
+            activity.waitlist.pop()
+        elif not activity.waitlist.discard(email):
+            raise NotWaitlistedError(email)
+        with self._index_lock:
+            self._index(email, activity_name)
+        activity.roster.add(email)
+        return self._commit({"op": "promote", "activity": activity_name, "email": email})
+
+    def _validate_batch(self, operations, live):
+        """Dry-run a batch, returning the error each operation would raise."""
+        # name -> (email -> signed up?) overlay and projected roster sizes
+        overlays = {name: {} for name in live}
+        sizes = {name: len(activity.roster) for name, activity in live.items()}
+        # email -> projected set of activities, for the signup checks
+        enrolled = {}
+        # name -> projected waitlist, copied once a removal frees a place
+        waiting = {}
+
+        def projected(email):
+            return enrolled.setdefault(email, set(self._students.get(email, ())))
+
+        def promote(name, activity):
+            # Mirrors _promote: freed places go to the head of the waitlist
+            queue = waiting.get(name)
+            if queue is None:
+                queue = waiting[name] = deque(activity.waitlist)
+            while queue and sizes[name] < activity.max_participants:
+                email = queue.popleft()
+                try:
+                    self._run_signup_checks(name, email, projected(email))
+                except StoreError:
+                    continue
+                overlays[name][email] = True
+                sizes[name] += 1
+                projected(email).add(name)
+
+        errors = []
+        for op, name, email in operations:
+            activity = live.get(name)
+            if activity is None:
+                errors.append(ActivityNotFoundError(name))
+                continue
+            overlay = overlays[name]
+            present = overlay.get(email, email in activity.roster)
+            error = None
+            if op == "signup":
+                if present:
+                    error = AlreadySignedUpError(email)
+                elif sizes[name] >= activity.max_participants or waiting.get(name, activity.waitlist):
+                    # Places freed in the batch go to the waitlist
+                    error = ActivityFullError(name)
+                else:
+                    names = projected(email)
+                    try:
+                        self._run_signup_checks(name, email, names)
+                    except StoreError as check_error:
+                        error = check_error
+                    else:
+                        overlay[email] = True
+                        sizes[name] += 1
+                        names.add(name)
+            elif op == "remove":
+                if not present:
+                    error = NotSignedUpError(email)
+                else:
+                    overlay[email] = False
+                    sizes[name] -= 1
+                    projected(email).discard(name)
+                    promote(name, activity)
+            else:
+                raise ValueError(f"Unknown operation: {op}")
+            errors.append(error)
+        return errors
+
+    def _index(self, email, activity_name):
+        # Caller holds the index lock. Tuples replaced on every change rather
+        # than sets: a student is on a handful of activities, and a small
+        # tuple is a third the size of a set. The key and names are interned
+        # so the index holds no copies of its own.
+        names = self._students.get(email, ())
+        if activity_name not in names:
+            self._students[self.emails.intern(email)] = names + (sys.intern(activity_name),)
+
+    def _unindex(self, email, activity_name):
+        names = self._students.get(email, ())
+        if activity_name not in names:
+            return
+        names = tuple(name for name in names if name != activity_name)
+        if names:
+            self._students[email] = names
+        else:
+            del self._students[email]
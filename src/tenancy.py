@@ -0,0 +1,193 @@
+"""
+One activity store per school, loaded the first time a school is used.
+
+A district is served from one deployment by sharding everything by school.
+Each ``School`` has its own ``ActivityStore`` and storage backend, and so
+its own locks, version counter and capacity checks. It also has its own
+``GET /activities`` cache, change feed, indexes and analytics. A
+registration rush at one school contends only for that school's locks and
+invalidates only that school's cache.
+
+``SchoolRegistry`` knows every school id but builds a ``School`` only when a
+request first needs it. Startup time and memory therefore grow with the
+schools in use, not with the size of the district. Loading takes a lock of
+that school's own, so a slow recovery at one school does not hold up
+requests for schools already loaded, or the loading of another.
+
+With ``max_loaded`` set, loading a school past the cap closes the least
+recently used ones that have been idle for ``min_idle`` seconds, so memory
+follows the schools in use rather than every school ever visited. A school
+is closed under its loading lock, so it is flushed before it can be loaded
+again and never exists twice over the same storage files. Pinned schools,
+such as the default one, are never closed.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from analytics import EnrollmentAnalytics
+from asyncstore import AsyncStore
+from cache import SerializedCache
+from events import ChangeFeed
+from listing import ActivityListing
+from schedule import ScheduleIndex
+from search import SearchIndex
+
+# School ids double as directory names, so keep them to a safe alphabet
+SCHOOL_ID_PATTERN = r"^[a-z0-9][a-z0-9-]{0,62}$"
+_SCHOOL_ID = re.compile(SCHOOL_ID_PATTERN)
+
+
+def valid_school_id(school_id):
+    return _SCHOOL_ID.match(school_id) is not None
+
+
+class School:
+    """One school's store and everything built on it."""
+
+    def __init__(self, school_id, store, backend):
+        self.id = school_id
+        self.activities = store
+        self.backend = backend
+        # What the async endpoints call
+        self.async_activities = AsyncStore(store)
+        # Serialised GET /activities body, rebuilt only after this store changes
+        self.activities_cache = SerializedCache(store, store.to_dict)
+        # Deltas pushed to clients subscribed to GET /activities/stream
+        self.change_feed = ChangeFeed(store)
+        # Signups that clash with a student's other activities are refused
+        self.schedule_index = ScheduleIndex(store)
+        store.add_signup_check(self.schedule_index.check_signup)
+        # Name-ordered view for paginated listings
+        self.activity_listing = ActivityListing(store, self.schedule_index)
+        # Inverted index behind GET /activities/search
+        self.search_index = SearchIndex(store)
+        # Rollups behind GET /analytics
+        self.analytics = EnrollmentAnalytics(store)
+
+    def close(self):
+        """Flush outstanding writes."""
+        self.backend.close()
+        close = getattr(self.activities, "close", None)
+        if close is not None:
+            close()
+
+
+class SchoolRegistry:
+    """School ids mapped to ``School``s, each built on first use.
+
+    ``open_school(school_id)`` builds a school, for example by recovering
+    its store from storage. ``known`` lists the schools that exist. At most
+    ``max_loaded`` schools stay loaded, unless more than that have been
+    used in the last ``min_idle`` seconds; ``pinned`` ones always stay.
+    """
+
+    def __init__(self, open_school, known=(), max_loaded=None, pinned=(), min_idle=600.0,
+                 clock=time.monotonic):
+        self._open_school = open_school
+        self._known = set(known)
+        self.max_loaded = max_loaded
+        self.min_idle = min_idle
+        self.evicted = 0
+        self._pinned = frozenset(pinned)
+        self._clock = clock
+        # school id -> School, least recently used first
+        self._schools = OrderedDict()
+        # school id -> when it was last used
+        self._used = {}
+        # school id -> lock held while that school loads or closes
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, school_id):
+        return school_id in self._known
+
+    def __len__(self):
+        return len(self._known)
+
+    def ids(self):
+        """Every known school id, sorted."""
+        with self._lock:
+            return sorted(self._known)
+
+    def loaded(self, school_id=None):
+        """Return a loaded school, or ``None``; without an id, the loaded ids.
+
+        Returning a school counts as using it.
+        """
+        with self._lock:
+            if school_id is None:
+                return sorted(self._schools)
+            school = self._schools.get(school_id)
+            if school is not None:
+                self._schools.move_to_end(school_id)
+                self._used[school_id] = self._clock()
+            return school
+
+    def get(self, school_id):
+        """Return the school, loading it if needed.
+
+        Raises ``KeyError`` for an unknown school. Loading may do I/O, so
+        call this from a worker thread.
+        """
+        school = self.loaded(school_id)
+        if school is not None:
+            return school
+        with self._lock:
+            if school_id not in self._known:
+                raise KeyError(school_id)
+            lock = self._loading.setdefault(school_id, threading.Lock())
+        with lock:
+            school = self.loaded(school_id)
+            if school is None:
+                school = self._open_school(school_id)
+                with self._lock:
+                    self._schools[school_id] = school
+                    self._used[school_id] = self._clock()
+        self._evict()
+        return school
+
+    def add(self, school_id):
+        """Register a new school; return ``False`` if it already exists."""
+        if not valid_school_id(school_id):
+            raise ValueError(f"Invalid school id: {school_id!r}")
+        with self._lock:
+            if school_id in self._known:
+                return False
+            self._known.add(school_id)
+            return True
+
+    def close(self):
+        """Close every loaded school."""
+        with self._lock:
+            schools = list(self._schools.values())
+        for school in schools:
+            school.close()
+
+    def _evict(self):
+        # Pick the least recently used idle schools beyond the cap, then
+        # close each under its loading lock so a reload waits for the close
+        if self.max_loaded is None:
+            return
+        with self._lock:
+            now = self._clock()
+            excess = len(self._schools) - self.max_loaded
+            victims = []
+            for school_id in self._schools:
+                if len(victims) >= excess or now - self._used[school_id] < self.min_idle:
+                    break
+                if school_id not in self._pinned:
+                    victims.append(school_id)
+        for school_id in victims:
+            with self._loading[school_id]:
+                with self._lock:
+                    # Skip a school used again since it was picked
+                    if self._clock() - self._used.get(school_id, now) < self.min_idle:
+                        continue
+                    school = self._schools.pop(school_id, None)
+                    self._used.pop(school_id, None)
+                if school is not None:
+                    school.close()
+                    self.evicted += 1
@@ -0,0 +1,61 @@
+"""
+Writer process for running the API with several workers.
+
+Owns the authoritative activity store and its storage backend and serves it
+to the workers' replicas over a Unix socket (see ``replication``). Start it
+before the workers and point both at the same socket:
+
+    python src/writer.py --socket /tmp/mergington.sock
+    MERGINGTON_WRITER_SOCKET=/tmp/mergington.sock uvicorn src.app:app --workers 4
+
+``MERGINGTON_STORAGE`` and ``MERGINGTON_DATA_DIR`` choose the storage backend
+here just as they do for a single-process server.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from notifications import NotificationQueue, notify_waitlist_changes  # noqa: E402
+from replication import WriterServer  # noqa: E402
+from schedule import ScheduleIndex  # noqa: E402
+from seed import SEED_ACTIVITIES  # noqa: E402
+from storage import open_backend  # noqa: E402
+from store import ActivityStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--socket", default=os.environ.get("MERGINGTON_WRITER_SOCKET",
+                                                           "/tmp/mergington.sock"))
+    args = parser.parse_args()
+
+    backend = open_backend(os.environ.get("MERGINGTON_STORAGE", "memory"),
+                           os.environ.get("MERGINGTON_DATA_DIR", Path(__file__).parent.parent / "data"))
+    store = ActivityStore(backend=backend)
+    if not store.recover():
+        store.update(SEED_ACTIVITIES)
+    # Signup checks run here, where every write is applied
+    schedule_index = ScheduleIndex(store)
+    store.add_signup_check(schedule_index.check_signup)
+    # Waitlist promotions happen here, so they are announced from here
+    notifications = NotificationQueue()
+    notify_waitlist_changes(store, notifications)
+
+    server = WriterServer(store, args.socket)
+    print(f"Writer serving {len(store)} activities on {args.socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        notifications.close()
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
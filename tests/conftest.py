@@ -2,6 +2,7 @@
 Test fixtures and configuration for the FastAPI application tests.
 """
 
+import copy
 import pytest
 from fastapi.testclient import TestClient
 import sys
@@ -10,7 +11,29 @@ import os
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+# Rate limits would turn racing requests into 429s before they reach the
+# store; test_ratelimit.py switches them on where it needs them
+os.environ["MERGINGTON_RATE_LIMIT"] = "off"
+os.environ["MERGINGTON_EMAIL_RATE_LIMIT"] = "off"
+
 from app import app, activities
+from seed import SEED_ACTIVITIES
+
+
+class FakeClock:
+    """A clock that stands still until a test moves ``now``."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """A fake clock to pass wherever code takes a ``clock`` callable."""
+    return FakeClock()
 
 
 @pytest.fixture
@@ -22,64 +45,9 @@ def client():
 @pytest.fixture
 def reset_activities():
     """Reset activities data to initial state before each test."""
-    # Store original activities
-    original_activities = {
-        "Chess Club": {
-            "description": "Learn strategies and compete in chess tournaments",
-            "schedule": "Fridays, 3:30 PM - 5:00 PM",
-            "max_participants": 12,
-            "participants": ["michael@mergington.edu", "daniel@mergington.edu"]
-        },
-        "Programming Class": {
-            "description": "Learn programming fundamentals and build software projects",
-            "schedule": "Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
-            "max_participants": 20,
-            "participants": ["emma@mergington.edu", "sophia@mergington.edu"]
-        },
-        "Gym Class": {
-            "description": "Physical education and sports activities",
-            "schedule": "Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
-            "max_participants": 30,
-            "participants": ["john@mergington.edu", "olivia@mergington.edu"]
-        },
-        "Basketball Team": {
-            "description": "Competitive basketball training and interschool games",
-            "schedule": "Mondays and Wednesdays, 4:00 PM - 6:00 PM",
-            "max_participants": 15,
-            "participants": ["alex@mergington.edu", "sarah@mergington.edu"]
-        },
-        "Track and Field": {
-            "description": "Running, jumping, and throwing events training",
-            "schedule": "Tuesdays and Thursdays, 4:00 PM - 5:30 PM",
-            "max_participants": 25,
-            "participants": ["lucas@mergington.edu"]
-        },
-        "Art Club": {
-            "description": "Explore various art mediums including painting and drawing",
-            "schedule": "Thursdays, 3:30 PM - 5:00 PM",
-            "max_participants": 18,
-            "participants": ["maya@mergington.edu", "ethan@mergington.edu"]
-        },
-        "Drama Club": {
-            "description": "Acting, stage performance, and theatrical productions",
-            "schedule": "Tuesdays and Fridays, 3:30 PM - 5:00 PM",
-            "max_participants": 20,
-            "participants": ["isabella@mergington.edu", "jacob@mergington.edu"]
-        },
-        "Science Olympiad": {
-            "description": "Competitive science events and STEM problem solving",
-            "schedule": "Wednesdays, 3:30 PM - 5:00 PM",
-            "max_participants": 16,
-            "participants": ["ava@mergington.edu", "william@mergington.edu"]
-        },
-        "Debate Team": {
-            "description": "Develop critical thinking and public speaking skills",
-            "schedule": "Mondays, 3:30 PM - 5:00 PM",
-            "max_participants": 14,
-            "participants": ["grace@mergington.edu"]
-        }
-    }
-    
+    # The same activities the app is seeded with, from src/seed.ndjson
+    original_activities = copy.deepcopy(SEED_ACTIVITIES)
+
     # Reset activities to original state
     activities.clear()
     activities.update(original_activities)
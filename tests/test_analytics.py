@@ -0,0 +1,172 @@
+"""
+Tests for the incrementally maintained enrollment analytics.
+"""
+
+import random
+from collections import Counter
+
+from fastapi import status
+
+from analytics import EnrollmentAnalytics, RankedCounts, RingSeries
+from store import ActivityStore, StoreError
+
+
+def make_store(capacity=2):
+    return ActivityStore({
+        name: {"description": name, "schedule": schedule, "max_participants": capacity,
+               "participants": []}
+        for name, schedule in (("Chess Club", "Fridays, 3:30 PM - 5:00 PM"),
+                               ("Art Club", "Thursdays, 3:30 PM - 5:00 PM"),
+                               ("Drama Club", "Mondays, 3:30 PM - 5:00 PM"))
+    })
+
+
+def scanned(store):
+    """The summary figures worked out the slow way, from every roster."""
+    taken = Counter(email for name in store for email in store[name].roster)
+    return {
+        "activities": len(store),
+        "students": len(taken),
+        "enrollments": sum(taken.values()),
+        "capacity": sum(store[name].max_participants for name in store),
+        "waitlisted": sum(len(store[name].waitlist) for name in store),
+        "enrollments_per_student": {str(k): v for k, v in sorted(Counter(taken.values()).items())},
+    }
+
+
+class TestRankedCounts:
+    """Tests for the bucketed top-K ranking."""
+
+    def test_matches_sorting(self):
+        """Test that random updates rank the same as sorting the counts."""
+        rng = random.Random(7)
+        ranked, expected = RankedCounts(), Counter()
+        for _ in range(5000):
+            name = f"n{rng.randrange(30)}"
+            if rng.random() < 0.1:
+                count = rng.randrange(50)
+                ranked.set(name, count)
+                expected[name] = count
+            elif rng.random() < 0.6 or expected[name] == 0:
+                ranked.add(name)
+                expected[name] += 1
+            else:
+                ranked.add(name, -1)
+                expected[name] -= 1
+            top = ranked.top(5)
+            assert [count for _, count in top] == sorted((+expected).values(), reverse=True)[:5]
+            assert all(expected[name] == count for name, count in top)
+        assert len(ranked) == len(+expected)
+
+    def test_ties_rank_in_order_reached(self):
+        """Test that names at the same count keep the order they got there."""
+        ranked = RankedCounts()
+        for name in ("b", "a", "c"):
+            ranked.add(name)
+        ranked.add("a")
+        assert ranked.top(3) == [("a", 2), ("b", 1), ("c", 1)]
+        ranked.set("a", 0)
+        assert ranked.top(3) == [("b", 1), ("c", 1)] and ranked.get("a") == 0
+
+
+class TestRingSeries:
+    """Tests for the fixed-size time series."""
+
+    def test_buckets_and_wraparound(self):
+        """Test that events land in their bucket and a lap of the ring clears old ones."""
+        series = RingSeries(60, 3)
+        series.add(0)
+        series.add(59)
+        series.add(61, amount=5)
+        assert series.values(61) == (-60, [0, 2, 5])
+        series.add(200)
+        # Bucket 0 was overwritten by bucket 3, bucket 2 is empty
+        assert series.values(200) == (60, [5, 0, 1])
+        assert series.values(10_000) == (9_840, [0, 0, 0])
+
+
+class TestEnrollmentAnalytics:
+    """Tests that the rollups always match a full scan."""
+
+    def test_random_changes_match_scan(self, clock):
+        """Test sign-ups, waitlists, promotions and whole-activity changes."""
+        rng = random.Random(3)
+        store = make_store()
+        analytics = EnrollmentAnalytics(store, clock=clock)
+        emails = [f"s{i}@mergington.edu" for i in range(8)]
+        for step in range(3000):
+            name = rng.choice(["Chess Club", "Art Club", "Drama Club"])
+            email = rng.choice(emails)
+            action = rng.choice([store.add_participant, store.remove_participant,
+                                 store.join_waitlist, store.leave_waitlist])
+            try:
+                action(name, email)
+            except StoreError:
+                pass
+            if step % 500 == 0:
+                store.unenroll(email)
+            if step % 700 == 0:
+                # Replace an activity with more places, promoting its waitlist
+                data = store[name].to_dict()
+                data["max_participants"] += 1
+                store[name] = data
+            summary = analytics.summary()
+            figures = {key: getattr(summary, key) for key in scanned(store)}
+            assert figures == scanned(store)
+        del store["Art Club"]
+        assert analytics.summary().activities == 2
+        assert {key: getattr(analytics.summary(), key) for key in scanned(store)} == scanned(store)
+
+    def test_rankings(self):
+        """Test popularity counts the waitlist and oversubscription only the waitlist."""
+        store = make_store(capacity=1)
+        analytics = EnrollmentAnalytics(store)
+        store.add_participant("Art Club", "a@x.edu")
+        store.add_participant("Chess Club", "b@x.edu")
+        store.join_waitlist("Chess Club", "c@x.edu")
+        summary = analytics.summary(top=2)
+        assert [(a.name, a.enrolled, a.waitlisted) for a in summary.most_popular] == [
+            ("Chess Club", 1, 1), ("Art Club", 1, 0)]
+        assert [a.name for a in summary.most_oversubscribed] == ["Chess Club"]
+        # Promotion moves the student from waiting to enrolled
+        store.remove_participant("Chess Club", "b@x.edu")
+        assert analytics.summary().most_oversubscribed == []
+        assert analytics.summary().enrollments_per_student == {"1": 2}
+
+    def test_series_counts_signups_and_removals(self, clock):
+        """Test that changes land in the current minute and hour."""
+        clock.now = 3600 * 1000 + 30
+        store = make_store()
+        analytics = EnrollmentAnalytics(store, clock=clock)
+        store.add_participant("Chess Club", "a@x.edu")
+        store.add_participant("Art Club", "a@x.edu")
+        clock.now += 60
+        store.remove_participant("Chess Club", "a@x.edu")
+        minutes = analytics.series("minute")
+        assert len(minutes.signups) == 1440 and minutes.bucket_seconds == 60
+        assert (minutes.signups[-2:], minutes.removals[-2:]) == ([2, 0], [0, 1])
+        assert minutes.start == 3600 * 1000 + 60 - 1439 * 60
+        hours = analytics.series("hour")
+        assert (hours.signups[-1], hours.removals[-1], len(hours.signups)) == (2, 1, 720)
+
+
+class TestAnalyticsEndpoints:
+    """Tests for GET /analytics and its views."""
+
+    def test_summary_follows_signups(self, client, reset_activities):
+        """Test that a signup through the API shows up in every view."""
+        before = client.get("/analytics").json()
+        client.post("/activities/Chess Club/signup?email=emma@mergington.edu")
+        summary = client.get("/analytics?top=1").json()
+        assert summary["enrollments"] == before["enrollments"] + 1
+        assert summary["most_popular"][0]["name"] == "Chess Club"
+        fill = {item["name"]: item for item in client.get("/analytics/activities").json()}
+        assert fill["Chess Club"]["enrolled"] == 3
+        series = client.get("/analytics/timeseries?resolution=hour").json()
+        assert series["resolution"] == "hour" and series["signups"][-1] >= 1
+
+    def test_invalid_parameters(self, client):
+        """Test that bad resolutions and top sizes are refused."""
+        assert client.get("/analytics/timeseries?resolution=week").status_code == \
+            status.HTTP_422_UNPROCESSABLE_CONTENT
+        assert client.get("/analytics?top=0").status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
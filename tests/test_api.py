@@ -59,6 +59,48 @@ class TestActivitiesEndpoint:
         assert "daniel@mergington.edu" in chess_club["participants"]
 
 
+class TestActivitiesCaching:
+    """Tests for ETag revalidation of the activities list."""
+
+    def test_response_has_strong_etag(self, client, reset_activities):
+        """Test that the list carries a strong ETag and must be revalidated."""
+        response = client.get("/activities")
+        etag = response.headers["etag"]
+        assert etag.startswith('"') and etag.endswith('"')
+        assert response.headers["cache-control"] == "no-cache"
+
+    def test_unchanged_list_returns_304(self, client, reset_activities):
+        """Test that If-None-Match with the current ETag returns 304."""
+        etag = client.get("/activities").headers["etag"]
+
+        response = client.get("/activities", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = client.get("/activities", headers={"If-None-Match": f'"other", W/{etag}'})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_mutation_invalidates_cache(self, client, reset_activities):
+        """Test that a signup changes the ETag and the body."""
+        etag = client.get("/activities").headers["etag"]
+        client.post("/activities/Chess Club/signup?email=cache@mergington.edu")
+
+        response = client.get("/activities", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+        assert "cache@mergington.edu" in response.json()["Chess Club"]["participants"]
+
+    def test_removal_restoring_content_restores_etag(self, client, reset_activities):
+        """Test that ETags depend on content, not on how it was reached."""
+        etag = client.get("/activities").headers["etag"]
+        client.post("/activities/Chess Club/signup?email=cache@mergington.edu")
+        client.delete("/activities/Chess Club/participants/cache@mergington.edu")
+
+        response = client.get("/activities", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
 class TestSignupEndpoint:
     """Tests for the activity signup endpoint."""
     
@@ -101,6 +143,20 @@ class TestSignupEndpoint:
         
         result = response.json()
         assert result["detail"] == "Student already signed up for this activity"
+
+    def test_signup_rejected_when_activity_full(self, client, reset_activities):
+        """Test that max_participants is enforced."""
+        activity = "Debate Team"  # 14 places, 1 taken
+        for i in range(13):
+            response = client.post(f"/activities/{activity}/signup?email=debater{i}@mergington.edu")
+            assert response.status_code == status.HTTP_200_OK
+
+        response = client.post(f"/activities/{activity}/signup?email=late@mergington.edu")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Activity is full"
+
+        activities = client.get("/activities").json()
+        assert len(activities[activity]["participants"]) == 14
         
     def test_signup_with_url_encoded_activity_name(self, client, reset_activities):
         """Test signup with URL encoded activity name."""
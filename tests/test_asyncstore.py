@@ -0,0 +1,157 @@
+"""
+Tests for the asyncio path: the async store front end and shared rebuilds.
+"""
+
+import asyncio
+import threading
+
+import pytest
+from starlette.requests import Request
+
+import app as app_module
+from asyncstore import AsyncStore
+from cache import SingleFlight
+from storage import StorageBackend
+from store import ActivityFullError, ActivityStore
+
+SEED = {
+    "Chess Club": {
+        "description": "Chess", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+        "max_participants": 3, "participants": ["a@mergington.edu"],
+    },
+}
+
+
+class BlockingBackend(StorageBackend):
+    """A backend whose sync would wait on disk."""
+
+    blocking = True
+
+
+def recording_store(backend=None):
+    """A store that records which thread ran each signup."""
+    store = ActivityStore(SEED, backend=backend)
+    threads = []
+    store.add_signup_check(lambda name, email, enrolled: threads.append(threading.current_thread()))
+    return store, threads
+
+
+class TestAsyncStore:
+    """Tests for running store calls inline or in the threadpool."""
+
+    def test_uncontended_write_runs_on_the_loop(self):
+        """Test that a cheap write does not leave the event loop's thread."""
+        store, threads = recording_store()
+        asyncio.run(AsyncStore(store).add_participant("Chess Club", "b@mergington.edu"))
+        assert threads == [threading.current_thread()]
+        assert "b@mergington.edu" in store["Chess Club"].roster
+
+    def test_contended_lock_moves_to_the_threadpool(self):
+        """Test that the loop never waits for a lock held by another thread."""
+        store, threads = recording_store()
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with store["Chess Club"].lock:
+                held.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        held.wait()
+
+        async def run():
+            signup = asyncio.ensure_future(AsyncStore(store).add_participant("Chess Club",
+                                                                            "b@mergington.edu"))
+            # The loop stays free while the signup waits for the lock
+            await asyncio.sleep(0.05)
+            assert not signup.done()
+            release.set()
+            await signup
+
+        asyncio.run(run())
+        holder.join()
+        assert len(threads) == 1 and threads[0] is not threading.current_thread()
+
+    def test_blocking_backend_writes_in_the_threadpool(self):
+        """Test that writes waiting on a durable sync never run on the loop."""
+        store, threads = recording_store(BlockingBackend())
+        asyncio.run(AsyncStore(store).add_participant("Chess Club", "b@mergington.edu"))
+        assert threads[0] is not threading.current_thread()
+
+    def test_errors_propagate(self):
+        """Test that store errors reach the awaiting caller."""
+        store, _ = recording_store()
+        async_store = AsyncStore(store)
+
+        async def run():
+            await async_store.add_participant("Chess Club", "b@mergington.edu")
+            await async_store.add_participant("Chess Club", "c@mergington.edu")
+            await async_store.add_participant("Chess Club", "d@mergington.edu")
+
+        with pytest.raises(ActivityFullError):
+            asyncio.run(run())
+
+
+class TestSingleFlight:
+    """Tests for sharing one blocking call between concurrent callers."""
+
+    def test_concurrent_callers_share_one_call(self):
+        """Test that callers arriving mid-call await the same result."""
+        calls, release = [], threading.Event()
+
+        def build(key):
+            calls.append(key)
+            release.wait()
+            return f"body {key}"
+
+        flight = SingleFlight()
+
+        async def run():
+            waiting = [asyncio.ensure_future(flight.run(1, build, 1)) for _ in range(5)]
+            other = asyncio.ensure_future(flight.run(2, build, 2))
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*waiting), await other
+
+        shared, other = asyncio.run(run())
+        assert shared == ["body 1"] * 5
+        assert other == "body 2"
+        assert sorted(calls) == [1, 2]
+        assert flight.shared == 4
+
+    def test_finished_calls_are_not_reused(self):
+        """Test that a later caller starts a fresh call."""
+        flight = SingleFlight()
+        calls = []
+
+        async def run():
+            await flight.run("key", calls.append, 1)
+            await flight.run("key", calls.append, 2)
+
+        asyncio.run(run())
+        assert calls == [1, 2]
+
+
+class TestAsyncEndpoints:
+    """Tests that await the endpoint coroutines directly on one loop."""
+
+    def test_concurrent_signups_for_the_last_spot(self, reset_activities):
+        """Test that one loop running many signups gives a spot away once."""
+        app_module.activities["Debate Team"].max_participants = 2
+        scope = {"type": "http", "method": "POST", "headers": [], "client": ("127.0.0.1", 0)}
+
+        async def sign_up(email):
+            try:
+                await app_module.signup_for_activity("Debate Team", email, Request(scope))
+                return "ok"
+            except Exception as error:
+                return error.detail
+
+        async def run():
+            return await asyncio.gather(*(sign_up(f"s{i}@mergington.edu") for i in range(20)))
+
+        outcomes = asyncio.run(run())
+        assert outcomes.count("ok") == 1
+        assert outcomes.count("Activity is full") == 19
+        assert len(app_module.activities["Debate Team"].roster) == 2
@@ -0,0 +1,122 @@
+"""
+Tests for the bulk signup and removal endpoints.
+"""
+
+import json
+
+from fastapi import status
+
+import app as app_module
+
+
+def ndjson(*items):
+    return "".join(json.dumps(item) + "\n" for item in items)
+
+
+class TestBatchEndpoint:
+    """Tests for POST /activities/batch."""
+
+    def test_mixed_results(self, client, reset_activities):
+        """Test that each operation gets its own result, in order."""
+        response = client.post("/activities/batch", json={"operations": [
+            {"op": "signup", "activity": "Chess Club", "email": "new@mergington.edu"},
+            {"op": "signup", "activity": "Chess Club", "email": "michael@mergington.edu"},
+            {"op": "remove", "activity": "Art Club", "email": "maya@mergington.edu"},
+            {"op": "signup", "activity": "Knitting Circle", "email": "new@mergington.edu"},
+        ]})
+        assert response.status_code == status.HTTP_200_OK
+
+        body = response.json()
+        assert body["applied"] is True
+        assert [r["status"] for r in body["results"]] == [200, 400, 200, 404]
+        assert body["results"][1]["detail"] == "Student already signed up for this activity"
+        assert body["results"][3]["detail"] == "Activity not found"
+
+        activities = client.get("/activities").json()
+        assert "new@mergington.edu" in activities["Chess Club"]["participants"]
+        assert "maya@mergington.edu" not in activities["Art Club"]["participants"]
+
+    def test_later_operations_see_earlier_ones(self, client, reset_activities):
+        """Test that operations in a batch apply in order."""
+        response = client.post("/activities/batch", json={"operations": [
+            {"op": "signup", "activity": "Chess Club", "email": "x@mergington.edu"},
+            {"op": "remove", "activity": "Chess Club", "email": "x@mergington.edu"},
+            {"op": "signup", "activity": "Chess Club", "email": "x@mergington.edu"},
+        ]})
+        assert [r["status"] for r in response.json()["results"]] == [200, 200, 200]
+
+    def test_atomic_batch_applies_nothing_on_failure(self, client, reset_activities):
+        """Test all-or-nothing semantics."""
+        before = client.get("/activities").json()
+        response = client.post("/activities/batch", json={"atomic": True, "operations": [
+            {"op": "signup", "activity": "Chess Club", "email": "new@mergington.edu"},
+            {"op": "remove", "activity": "Chess Club", "email": "ghost@mergington.edu"},
+        ]})
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+        body = response.json()
+        assert body["applied"] is False
+        assert [r["status"] for r in body["results"]] == [409, 404]
+        assert client.get("/activities").json() == before
+
+    def test_atomic_batch_respects_capacity(self, client, reset_activities):
+        """Test that capacity is checked against the batch's own signups."""
+        operations = [
+            {"op": "signup", "activity": "Debate Team", "email": f"d{i}@mergington.edu"}
+            for i in range(14)
+        ]
+        response = client.post("/activities/batch", json={"atomic": True, "operations": operations})
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.json()["results"][-1]["detail"] == "Activity is full"
+
+        response = client.post("/activities/batch", json={"atomic": True, "operations": operations[:13]})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(client.get("/activities").json()["Debate Team"]["participants"]) == 14
+
+    def test_invalid_operation_rejected(self, client, reset_activities):
+        """Test that unknown operation kinds fail validation."""
+        response = client.post("/activities/batch", json={"operations": [
+            {"op": "promote", "activity": "Chess Club", "email": "x@mergington.edu"}
+        ]})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+class TestNdjsonBatchEndpoint:
+    """Tests for POST /activities/batch/ndjson."""
+
+    def test_streams_results(self, client, reset_activities, monkeypatch):
+        """Test that results come back per line across several chunks."""
+        monkeypatch.setattr(app_module, "NDJSON_CHUNK_SIZE", 2)
+        body = ndjson(*[
+            {"op": "signup", "activity": "Gym Class", "email": f"g{i}@mergington.edu"}
+            for i in range(5)
+        ]) + "not json\n" + ndjson(
+            {"op": "remove", "activity": "Gym Class", "email": "g0@mergington.edu"}
+        )
+        response = client.post("/activities/batch/ndjson", content=body,
+                               headers={"Content-Type": "application/x-ndjson"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["status"] for r in results] == [200, 200, 200, 200, 200, 422, 200]
+        assert results[5]["line"] == 6
+
+        participants = client.get("/activities").json()["Gym Class"]["participants"]
+        assert participants[2:] == [f"g{i}@mergington.edu" for i in range(1, 5)]
+
+    def test_last_line_without_newline(self, client, reset_activities):
+        """Test that a final line without a trailing newline is applied."""
+        body = json.dumps({"op": "signup", "activity": "Art Club", "email": "tail@mergington.edu"})
+        response = client.post("/activities/batch/ndjson", content=body)
+        assert json.loads(response.text)["status"] == 200
+
+    def test_atomic_stream(self, client, reset_activities):
+        """Test that one bad line fails an atomic stream."""
+        before = client.get("/activities").json()
+        body = ndjson({"op": "signup", "activity": "Art Club", "email": "a@mergington.edu"}) + "{}\n"
+        response = client.post("/activities/batch/ndjson?atomic=true", content=body)
+
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["status"] for r in results] == [409, 422]
+        assert client.get("/activities").json() == before
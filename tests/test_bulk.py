@@ -0,0 +1,156 @@
+"""
+Tests for streaming bulk import and export.
+"""
+
+import json
+
+import pytest
+from fastapi import status
+
+from bulk import decode_lines, export_records, import_records, read_records, write_records
+from seed import SEED_ACTIVITIES, load_activities
+from store import ActivityStore
+
+
+def make_store():
+    return ActivityStore({
+        "Chess Club": {"description": 'Chess, "blitz" and\nclassical', "schedule": "Fridays, 3:30 PM - 5:00 PM",
+                       "max_participants": 3, "participants": ["a@x.edu", "b@x.edu"]},
+        "Art Club": {"description": "Art", "schedule": "Thursdays, 3:30 PM - 5:00 PM",
+                     "max_participants": 5, "participants": []},
+    })
+
+
+def export_text(store, fmt):
+    return "".join(write_records(export_records(store), fmt, chunk_size=2))
+
+
+def import_text(store, text, fmt, **kwargs):
+    chunks = (text.encode()[i:i + 7] for i in range(0, len(text.encode()), 7))
+    return import_records(store, read_records(decode_lines(chunks), fmt), **kwargs)
+
+
+class TestRoundTrip:
+    """Tests that an export imports back unchanged."""
+
+    @pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+    def test_export_then_import(self, fmt):
+        """Test that every activity and roster survives, quoting included."""
+        source = make_store()
+        target = ActivityStore()
+        report = import_text(target, export_text(source, fmt), fmt)
+        assert target.to_dict() == source.to_dict()
+        assert report["activities_created"] == 2
+        assert report["enrolled"] == 2
+        assert report["failed"] == 0
+
+    def test_reimport_is_harmless(self):
+        """Test that importing the same file twice changes nothing."""
+        store = make_store()
+        report = import_text(store, export_text(store, "csv"), "csv")
+        assert report["activities_existing"] == 2
+        assert report["already_enrolled"] == 2
+        assert report["enrolled"] == report["failed"] == 0
+
+    def test_csv_export_format(self):
+        """Test the CSV header and that enrollments follow their activity."""
+        lines = export_text(make_store(), "csv").splitlines()
+        assert lines[0] == "activity,email,description,schedule,max_participants"
+        assert lines[1] == "Art Club,,Art,\"Thursdays, 3:30 PM - 5:00 PM\",5"
+        assert lines[-2:] == ["Chess Club,a@x.edu,,,", "Chess Club,b@x.edu,,,"]
+
+    def test_seed_file_matches_csv_export(self, tmp_path):
+        """Test that the seed data loads the same from either format."""
+        path = tmp_path / "seed.csv"
+        path.write_text(export_text(ActivityStore(SEED_ACTIVITIES), "csv"))
+        loaded = load_activities(path)
+        assert loaded == {name: SEED_ACTIVITIES[name] for name in loaded}
+        assert loaded.keys() == SEED_ACTIVITIES.keys()
+
+
+class TestImport:
+    """Tests for validation and batching on import."""
+
+    def test_bad_records_are_reported_and_skipped(self):
+        """Test that each bad line is counted with its line number."""
+        text = "\n".join([
+            '{"activity": "Band", "description": "Band", "schedule": "Mondays", "max_participants": 1}',
+            "not json",
+            '{"activity": "Band", "email": "a@x.edu"}',
+            '{"activity": "Band", "email": "b@x.edu"}',
+            '{"activity": "Nowhere", "email": "a@x.edu"}',
+            '{"activity": "Choir", "description": "Choir", "schedule": "Mondays", "max_participants": -1}',
+            "[]",
+        ])
+        store = ActivityStore()
+        report = import_text(store, text, "ndjson")
+        assert report["records"] == 7
+        assert report["enrolled"] == 1
+        assert [error["line"] for error in report["errors"]] == [2, 4, 5, 6, 7]
+        assert report["errors"][1]["detail"] == "ActivityFullError"
+        assert list(store) == ["Band"]
+
+    def test_csv_requires_activity_column(self):
+        """Test that a CSV without the expected header fails cleanly."""
+        report = import_text(ActivityStore(), "name,email\nBand,a@x.edu\n", "csv")
+        assert report["failed"] == 1
+        assert "activity column" in report["errors"][0]["detail"]
+
+    def test_enrollments_are_applied_in_batches(self):
+        """Test that signups reach the store in bounded batches."""
+        store = ActivityStore({"Band": {"description": "Band", "schedule": "Mondays",
+                                        "max_participants": 100, "participants": []}})
+        batches = []
+        apply_batch = store.apply_batch
+        store.apply_batch = lambda operations: batches.append(len(operations)) or apply_batch(operations)
+        text = "".join(json.dumps({"activity": "Band", "email": f"s{i}@x.edu"}) + "\n" for i in range(25))
+        report = import_text(store, text, "ndjson", batch_size=10)
+        assert batches == [10, 10, 5]
+        assert report["enrolled"] == 25
+        assert report["records_per_second"] is None or report["records_per_second"] > 0
+
+    def test_lines_split_across_chunks(self):
+        """Test that lines and multi-byte characters may straddle chunks."""
+        text = "é1\r\né2\nlast".encode()
+        chunks = [text[i:i + 1] for i in range(len(text))]
+        assert list(decode_lines(chunks)) == ["é1\r\n", "é2\n", "last"]
+
+
+class TestBulkEndpoints:
+    """Tests for GET /activities/export and POST /activities/import."""
+
+    def test_export_csv(self, client, reset_activities):
+        """Test that the export streams every roster as a CSV download."""
+        response = client.get("/activities/export?format=csv")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "attachment" in response.headers["content-disposition"]
+        assert "Chess Club,michael@mergington.edu,,," in response.text.splitlines()
+
+    def test_import_streamed_body(self, client, reset_activities):
+        """Test that an NDJSON body sent in chunks is imported with a report."""
+        lines = [
+            {"activity": "Robotics", "description": "Build robots", "schedule": "Saturdays, 10:00 AM - 12:00 PM",
+             "max_participants": 10},
+            {"activity": "Robotics", "email": "emma@mergington.edu"},
+            {"activity": "Chess Club", "email": "michael@mergington.edu"},
+            {"activity": "Chess Club", "email": "new@mergington.edu"},
+        ]
+
+        def body():
+            for line in lines:
+                yield (json.dumps(line) + "\n").encode()
+
+        response = client.post("/activities/import?format=ndjson", content=body())
+        assert response.status_code == status.HTTP_200_OK
+        report = response.json()
+        assert (report["activities_created"], report["enrolled"], report["already_enrolled"]) == (1, 2, 1)
+        activities = client.get("/activities").json()
+        assert activities["Robotics"]["participants"] == ["emma@mergington.edu"]
+        assert "new@mergington.edu" in activities["Chess Club"]["participants"]
+
+    def test_import_reports_api_error_text(self, client, reset_activities):
+        """Test that refused signups carry the API's error message."""
+        response = client.post("/activities/import?format=csv",
+                               content=b"activity,email\nNowhere,a@mergington.edu\n")
+        assert response.json()["errors"] == [{"line": 2, "detail": "Activity not found"}]
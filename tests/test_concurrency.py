@@ -0,0 +1,105 @@
+"""
+Stress tests for concurrent signups and removals.
+
+The test client runs each request on its own event loop, so these tests
+hammer the endpoints from many threads at once and check that capacity and
+uniqueness always hold.
+"""
+
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import status
+
+from app import activities
+from store import ActivityNotFoundError, StoreError
+
+THREADS = 32
+
+
+@pytest.fixture(autouse=True)
+def fast_thread_switching():
+    """Switch threads far more often than usual to provoke races."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def assert_invariants(activity_name):
+    """Check capacity, uniqueness and reverse index consistency."""
+    activity = activities[activity_name]
+    participants = list(activity.roster)
+    assert len(participants) <= activity.max_participants
+    assert len(participants) == len(set(participants))
+    for email in participants:
+        assert activity_name in activities.activities_for(email)
+
+
+class TestConcurrentSignups:
+    """Tests that hammer the signup endpoint from many threads."""
+
+    def test_capacity_never_exceeded(self, client, reset_activities):
+        """Test that concurrent signups never oversubscribe an activity."""
+        activity = "Chess Club"  # 12 places, 2 taken
+        emails = [f"student{i}@mergington.edu" for i in range(200)]
+
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            codes = list(pool.map(
+                lambda email: client.post(f"/activities/{activity}/signup?email={email}").status_code,
+                emails,
+            ))
+
+        assert codes.count(status.HTTP_200_OK) == 10
+        assert codes.count(status.HTTP_400_BAD_REQUEST) == 190
+        assert len(activities[activity].roster) == 12
+        assert_invariants(activity)
+
+    def test_duplicate_signups_accepted_once(self, client, reset_activities):
+        """Test that the same student racing against themself gets in once."""
+        activity = "Gym Class"
+        email = "racer@mergington.edu"
+
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            codes = list(pool.map(
+                lambda _: client.post(f"/activities/{activity}/signup?email={email}").status_code,
+                range(100),
+            ))
+
+        assert codes.count(status.HTTP_200_OK) == 1
+        assert list(activities[activity].roster).count(email) == 1
+        assert_invariants(activity)
+
+
+class TestConcurrentStoreOperations:
+    """Tests that drive the store directly with mixed operations."""
+
+    def test_mixed_signups_and_removals(self, reset_activities):
+        """Test that interleaved signups and removals keep every invariant."""
+        names = ["Chess Club", "Art Club", "Debate Team"]
+        barrier = threading.Barrier(THREADS)
+
+        def worker(n):
+            barrier.wait()
+            for i in range(200):
+                name = names[(n + i) % len(names)]
+                email = f"student{(n * 7 + i) % 40}@mergington.edu"
+                try:
+                    if i % 3:
+                        activities.add_participant(name, email)
+                    else:
+                        activities.remove_participant(name, email)
+                except StoreError as error:
+                    assert not isinstance(error, ActivityNotFoundError)
+
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            list(pool.map(worker, range(THREADS)))
+
+        for name in names:
+            assert_invariants(name)
+        for i in range(40):
+            email = f"student{i}@mergington.edu"
+            for name in activities.activities_for(email):
+                assert email in activities[name].roster
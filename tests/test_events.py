@@ -0,0 +1,162 @@
+"""
+Tests for the change feed and the Server-Sent Events stream.
+"""
+
+import asyncio
+import json
+
+from app import activities, app, change_feed
+from events import ChangeFeed
+from store import ActivityStore
+
+
+def parse_sse(text):
+    """Split an SSE body into a list of (event type, data) pairs."""
+    messages = []
+    for block in text.split("\n\n"):
+        event_type, data = "message", None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event_type = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        if data is not None:
+            messages.append((event_type, data))
+    return messages
+
+
+async def read_stream(query_string=b"", headers=(), messages=1, during=None):
+    """Drive GET /activities/stream until ``messages`` have arrived.
+
+    ``during`` is called once the response has started, to make changes
+    while the client is connected.
+    """
+    body = []
+    done = asyncio.Event()
+    started = False
+
+    async def receive():
+        nonlocal started
+        if not started:
+            started = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            if during is not None:
+                await asyncio.get_running_loop().run_in_executor(None, during)
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b"").decode())
+            if len(parse_sse("".join(body))) >= messages:
+                done.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/activities/stream",
+        "raw_path": b"/activities/stream", "query_string": query_string,
+        "root_path": "", "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    return parse_sse("".join(body))
+
+
+class TestChangeFeed:
+    """Tests for delta generation and replay history."""
+
+    def setup_method(self):
+        self.store = ActivityStore({"Chess Club": {
+            "description": "Chess", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+            "max_participants": 3, "participants": ["a@mergington.edu"]
+        }})
+        self.feed = ChangeFeed(self.store, history=3)
+
+    def subscribe(self, since):
+        async def run():
+            subscription, backlog = self.feed.subscribe(since)
+            self.feed.unsubscribe(subscription)
+            return backlog
+        return asyncio.run(run())
+
+    def test_participant_deltas(self):
+        """Test that signups produce deltas with spots left."""
+        version = self.store.version
+        self.store.add_participant("Chess Club", "b@mergington.edu")
+        self.store.remove_participant("Chess Club", "a@mergington.edu")
+
+        added, removed = self.subscribe(version)
+        assert added == {
+            "seq": version + 1, "type": "participant_added", "activity": "Chess Club",
+            "email": "b@mergington.edu", "participants": 2, "spots_left": 1
+        }
+        assert removed["type"] == "participant_removed"
+        assert removed["spots_left"] == 2
+
+    def test_resume_from_current_version(self):
+        """Test that an up-to-date client gets an empty backlog."""
+        assert self.subscribe(self.store.version) == []
+
+    def test_resume_beyond_history_requires_reset(self):
+        """Test that a client too far behind is told to reload."""
+        version = self.store.version
+        for _ in range(4):
+            self.store.add_participant("Chess Club", "b@mergington.edu")
+            self.store.remove_participant("Chess Club", "b@mergington.edu")
+        assert self.subscribe(version) is None
+        assert self.subscribe(self.store.version + 10) is None
+
+    def test_reset_forgets_history(self):
+        """Test that a replica's snapshot reload is one reset, not a delta per activity."""
+        version = self.store.version
+        self.store.add_participant("Chess Club", "b@mergington.edu")
+        # What a replica's listeners see while it reloads a snapshot
+        self.feed._on_change({"op": "put", "activity": "Chess Club", "reload": True,
+                              "data": self.store["Chess Club"].to_dict()}, self.store.version)
+        self.feed._on_change({"op": "reset"}, self.store.version)
+        assert self.subscribe(version) is None
+        assert self.subscribe(self.store.version) == []
+
+
+class TestStreamEndpoint:
+    """Tests for GET /activities/stream."""
+
+    def test_replays_from_since(self, client, reset_activities):
+        """Test that a reconnecting client receives the deltas it missed."""
+        version = int(client.get("/activities").headers["x-activities-version"])
+        client.post("/activities/Chess Club/signup?email=sse@mergington.edu")
+
+        messages = asyncio.run(read_stream(f"since={version}".encode()))
+        event_type, data = messages[0]
+        assert event_type == "message"
+        assert data["type"] == "participant_added"
+        assert data["email"] == "sse@mergington.edu"
+        assert data["seq"] == version + 1
+
+    def test_last_event_id_header(self, client, reset_activities):
+        """Test that the Last-Event-ID header takes precedence."""
+        client.post("/activities/Chess Club/signup?email=first@mergington.edu")
+        version = activities.version
+        client.post("/activities/Chess Club/signup?email=second@mergington.edu")
+
+        messages = asyncio.run(read_stream(
+            b"since=0", headers=[("last-event-id", str(version))]
+        ))
+        assert messages[0][1]["email"] == "second@mergington.edu"
+
+    def test_live_deltas(self, reset_activities):
+        """Test that changes made while connected are pushed."""
+        def signup():
+            activities.add_participant("Art Club", "live@mergington.edu")
+
+        messages = asyncio.run(read_stream(
+            f"since={change_feed.version}".encode(), during=signup
+        ))
+        assert messages[0][1]["type"] == "participant_added"
+        assert messages[0][1]["activity"] == "Art Club"
+
+    def test_reset_when_history_is_gone(self, reset_activities):
+        """Test that a stale sequence number triggers a reset message."""
+        messages = asyncio.run(read_stream(f"since={activities.version + 100}".encode()))
+        assert messages[0] == ("reset", {"version": activities.version})
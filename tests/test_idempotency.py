@@ -0,0 +1,214 @@
+"""
+Tests for Idempotency-Key handling of retried mutations.
+"""
+
+import asyncio
+import threading
+import uuid
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+import app as app_module
+from idempotency import IdempotencyCache, IdempotencyKeyReusedError, StoredResponse
+from ratelimit import RateLimiter
+
+
+def new_key():
+    return str(uuid.uuid4())
+
+
+class TestIdempotencyCache:
+    """Tests for the cache itself."""
+
+    def test_runs_once_per_key(self):
+        """Test that a repeated key replays the first result."""
+        cache = IdempotencyCache()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            return StoredResponse(200, b"first")
+
+        async def main():
+            first = await cache.run("k", ("POST", "/a"), function)
+            second = await cache.run("k", ("POST", "/a"), function)
+            return first, second
+
+        (first, replayed_first), (second, replayed_second) = asyncio.run(main())
+        assert (replayed_first, replayed_second) == (False, True)
+        assert second is first
+        assert len(calls) == 1
+
+    def test_concurrent_duplicates_wait_for_the_first(self):
+        """Test that duplicates arriving mid-call share its result."""
+        cache = IdempotencyCache()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return StoredResponse(200, b"done")
+
+        async def main():
+            return await asyncio.gather(*(cache.run("k", "fp", function) for _ in range(5)))
+
+        results = asyncio.run(main())
+        assert len(calls) == 1
+        assert [replayed for _, replayed in results].count(False) == 1
+        assert all(response.body == b"done" for response, _ in results)
+        assert cache.replayed == 4
+
+    def test_duplicates_wait_across_event_loops(self):
+        """Test that a duplicate on another thread's loop waits for the first call."""
+        cache = IdempotencyCache()
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        async def function():
+            started.set()
+            await asyncio.to_thread(release.wait)
+            return StoredResponse(200, b"done")
+
+        def call():
+            results.append(asyncio.run(cache.run("k", "fp", function)))
+
+        first = threading.Thread(target=call)
+        first.start()
+        started.wait()
+        duplicate = threading.Thread(target=call)
+        duplicate.start()
+        release.set()
+        first.join()
+        duplicate.join()
+        assert sorted(replayed for _, replayed in results) == [False, True]
+        assert all(response.body == b"done" for response, _ in results)
+
+    def test_failures_are_not_kept(self):
+        """Test that a call that raises runs again on retry."""
+        cache = IdempotencyCache()
+        attempts = []
+
+        async def function():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("timeout")
+            return StoredResponse(200, b"ok")
+
+        async def main():
+            with pytest.raises(RuntimeError):
+                await cache.run("k", "fp", function)
+            return await cache.run("k", "fp", function)
+
+        response, replayed = asyncio.run(main())
+        assert (response.body, replayed) == (b"ok", False)
+
+    def test_key_reused_for_another_request(self):
+        """Test that a key cannot replay a different request's result."""
+        cache = IdempotencyCache()
+
+        async def function():
+            return StoredResponse(200, b"")
+
+        async def main():
+            await cache.run("k", ("POST", "/a"), function)
+            await cache.run("k", ("POST", "/b"), function)
+
+        with pytest.raises(IdempotencyKeyReusedError):
+            asyncio.run(main())
+
+    def test_expiry_and_bound(self, clock):
+        """Test that results expire after the TTL and the oldest go past max_keys."""
+        cache = IdempotencyCache(ttl=10, max_keys=2, clock=clock)
+
+        async def function():
+            return StoredResponse(200, b"")
+
+        async def main(key):
+            return (await cache.run(key, "fp", function))[1]
+
+        for key in ("a", "b", "c"):
+            asyncio.run(main(key))
+        assert len(cache) == 2
+        assert asyncio.run(main("a")) is False  # evicted, so ran again
+        assert asyncio.run(main("c")) is True
+        clock.now = 11
+        assert asyncio.run(main("c")) is False
+        assert len(cache) == 1
+
+
+class TestIdempotentEndpoints:
+    """Tests for the Idempotency-Key header on the mutation endpoints."""
+
+    def test_retried_signup_replays_the_response(self, client, reset_activities):
+        """Test that a retry gets the original 200, not "already signed up"."""
+        headers = {"Idempotency-Key": new_key()}
+        url = "/activities/Chess Club/signup?email=retry@mergington.edu"
+        first = client.post(url, headers=headers)
+        retry = client.post(url, headers=headers)
+        assert first.status_code == retry.status_code == status.HTTP_200_OK
+        assert retry.json() == first.json()
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+
+        # Without a key the duplicate is still reported
+        assert client.post(url).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_retried_removal_replays_the_response(self, client, reset_activities):
+        """Test that a retried removal does not turn into a 404."""
+        headers = {"Idempotency-Key": new_key()}
+        url = "/activities/Chess Club/participants/michael@mergington.edu"
+        assert client.delete(url, headers=headers).status_code == status.HTTP_200_OK
+        retry = client.delete(url, headers=headers)
+        assert retry.status_code == status.HTTP_200_OK
+        assert retry.json() == {"message": "Removed michael@mergington.edu from Chess Club"}
+
+    def test_errors_are_replayed(self, client, reset_activities):
+        """Test that a refused request replays its refusal even once it would succeed."""
+        headers = {"Idempotency-Key": new_key()}
+        url = "/activities/Chess Club/participants/new@mergington.edu"
+        assert client.delete(url, headers=headers).status_code == status.HTTP_404_NOT_FOUND
+        client.post("/activities/Chess Club/signup?email=new@mergington.edu")
+        retry = client.delete(url, headers=headers)
+        assert retry.status_code == status.HTTP_404_NOT_FOUND
+        assert retry.json() == {"detail": "Participant not found in this activity"}
+
+    def test_key_reused_for_another_request(self, client, reset_activities):
+        """Test that reusing a key for another student is refused with 422."""
+        headers = {"Idempotency-Key": new_key()}
+        client.post("/activities/Chess Club/signup?email=one@mergington.edu", headers=headers)
+        response = client.post("/activities/Chess Club/signup?email=two@mergington.edu",
+                               headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        assert "two@mergington.edu" not in client.get("/activities").json()["Chess Club"]["participants"]
+
+    def test_keys_are_scoped_per_client(self, client, reset_activities):
+        """Test that another client sending the same key is not given the first one's response."""
+        headers = {"Idempotency-Key": new_key()}
+        client.post("/activities/Chess Club/signup?email=one@mergington.edu", headers=headers)
+        other = TestClient(app_module.app, client=("192.0.2.7", 50000))
+        response = other.post("/activities/Chess Club/signup?email=two@mergington.edu",
+                              headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert "idempotent-replayed" not in response.headers
+
+    def test_overlong_key_is_refused(self, client, reset_activities):
+        """Test that keys are bounded in length."""
+        response = client.post("/activities/Chess Club/signup?email=x@mergington.edu",
+                               headers={"Idempotency-Key": "k" * 256})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_rate_limited_attempts_are_not_kept(self, client, reset_activities, monkeypatch, clock):
+        """Test that a 429 is not replayed and replays spend no tokens."""
+        monkeypatch.setattr(app_module, "email_rate_limiter", RateLimiter(rate=1, burst=1, clock=clock))
+        client.post("/activities/Chess Club/signup?email=busy@mergington.edu")
+        headers = {"Idempotency-Key": new_key()}
+        url = "/activities/Art Club/signup?email=busy@mergington.edu"
+        assert client.post(url, headers=headers).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+        clock.now = 1
+        assert client.post(url, headers=headers).status_code == status.HTTP_200_OK
+        retry = client.post(url, headers=headers)
+        assert retry.status_code == status.HTTP_200_OK
+        assert retry.headers["idempotent-replayed"] == "true"
@@ -0,0 +1,134 @@
+"""
+Tests for paginated, filtered and projected activity listings.
+"""
+
+from fastapi import status
+
+from app import activities
+
+
+def collect_pages(client, **params):
+    """Follow next_cursor until the last page and return every item."""
+    items, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        body = client.get("/activities", params=query).json()
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+class TestActivitiesListing:
+    """Tests for GET /activities with listing parameters."""
+
+    def test_no_parameters_keeps_full_format(self, client, reset_activities):
+        """Test that the plain list is unchanged."""
+        activities = client.get("/activities").json()
+        assert "Chess Club" in activities
+        assert "items" not in activities
+
+    def test_pages_in_name_order(self, client, reset_activities):
+        """Test that pages cover every activity exactly once, sorted."""
+        first = client.get("/activities", params={"limit": 4}).json()
+        assert len(first["items"]) == 4
+        assert first["next_cursor"] is not None
+
+        names = [item["name"] for item in collect_pages(client, limit=4)]
+        assert names == sorted(names)
+        assert len(names) == 9
+
+    def test_default_fields_leave_out_roster(self, client, reset_activities):
+        """Test that list items carry counts but not participants."""
+        item = client.get("/activities", params={"limit": 1}).json()["items"][0]
+        assert item == {
+            "name": "Art Club",
+            "description": "Explore various art mediums including painting and drawing",
+            "schedule": "Thursdays, 3:30 PM - 5:00 PM",
+            "max_participants": 18,
+            "participant_count": 2,
+            "spots_left": 16,
+        }
+
+    def test_field_projection(self, client, reset_activities):
+        """Test that fields= limits each item to the requested fields."""
+        items = client.get("/activities", params={"fields": "name,spots_left"}).json()["items"]
+        assert items[0] == {"name": "Art Club", "spots_left": 16}
+
+        items = client.get("/activities", params={"fields": "participants", "limit": 1}).json()["items"]
+        assert items[0]["participants"] == ["maya@mergington.edu", "ethan@mergington.edu"]
+
+    def test_unknown_field(self, client, reset_activities):
+        """Test that unknown fields are rejected."""
+        response = client.get("/activities", params={"fields": "name,secret"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Unknown field: secret"
+
+    def test_day_filter(self, client, reset_activities):
+        """Test filtering on the day of the week."""
+        names = [item["name"] for item in collect_pages(client, day="Monday", limit=2)]
+        assert names == ["Basketball Team", "Debate Team", "Gym Class"]
+
+    def test_has_spots_filter(self, client, reset_activities):
+        """Test filtering on open spots."""
+        for i in range(13):
+            client.post(f"/activities/Debate Team/signup?email=d{i}@mergington.edu")
+        full = client.get("/activities", params={"has_spots": False}).json()["items"]
+        assert [item["name"] for item in full] == ["Debate Team"]
+        open_ = client.get("/activities", params={"has_spots": True}).json()["items"]
+        assert "Debate Team" not in [item["name"] for item in open_]
+
+    def test_text_filter(self, client, reset_activities):
+        """Test case-insensitive matching on name and description."""
+        items = client.get("/activities", params={"q": "COMPETITIVE"}).json()["items"]
+        assert [item["name"] for item in items] == ["Basketball Team", "Science Olympiad"]
+
+    def test_new_activities_appear_in_order(self, client, reset_activities):
+        """Test that the sorted index follows activities being added."""
+        activities["Band"] = {
+            "description": "Concert band", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+            "max_participants": 40, "participants": []
+        }
+        items = client.get("/activities", params={"limit": 2, "fields": "name"}).json()["items"]
+        assert [item["name"] for item in items] == ["Art Club", "Band"]
+
+    def test_invalid_cursor(self, client, reset_activities):
+        """Test that a garbled cursor is rejected."""
+        response = client.get("/activities", params={"cursor": "!!!"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestParticipantsEndpoint:
+    """Tests for GET /activities/{activity_name}/participants."""
+
+    def test_pages_in_signup_order(self, client, reset_activities):
+        """Test paging through a roster."""
+        for i in range(5):
+            client.post(f"/activities/Chess Club/signup?email=c{i}@mergington.edu")
+
+        first = client.get("/activities/Chess Club/participants", params={"limit": 3}).json()
+        assert first["participants"] == [
+            "michael@mergington.edu", "daniel@mergington.edu", "c0@mergington.edu"
+        ]
+        assert first["total"] == 7
+
+        second = client.get("/activities/Chess Club/participants",
+                            params={"limit": 3, "cursor": first["next_cursor"]}).json()
+        assert second["participants"] == ["c1@mergington.edu", "c2@mergington.edu", "c3@mergington.edu"]
+
+    def test_removals_do_not_shift_pages(self, client, reset_activities):
+        """Test that a removal between requests does not skip anyone."""
+        first = client.get("/activities/Chess Club/participants", params={"limit": 1}).json()
+        client.delete("/activities/Chess Club/participants/michael@mergington.edu")
+        client.post("/activities/Chess Club/signup?email=late@mergington.edu")
+
+        rest = client.get("/activities/Chess Club/participants",
+                          params={"cursor": first["next_cursor"]}).json()
+        assert rest["participants"] == ["daniel@mergington.edu", "late@mergington.edu"]
+        assert rest["next_cursor"] is None
+
+    def test_unknown_activity(self, client, reset_activities):
+        """Test that an unknown activity returns 404."""
+        response = client.get("/activities/Nonexistent Club/participants")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "Activity not found"
@@ -0,0 +1,120 @@
+"""
+Tests for the Prometheus metrics endpoint and the slow request profiler.
+"""
+
+import threading
+import time
+
+from fastapi import status
+
+from metrics import Histogram, Registry
+from profiling import SlowRequestProfiler
+
+
+def sample(text, line_start):
+    """Return the value of the first exposition line starting with ``line_start``."""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestHistogram:
+    """Tests for histogram rendering."""
+
+    def test_cumulative_buckets(self):
+        """Test that buckets are cumulative and include +Inf, sum and count."""
+        registry = Registry()
+        histogram = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, ("/a",))
+        lines = registry.render().decode().splitlines()
+        assert lines == [
+            "# HELP latency_seconds Latency",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{route="/a",le="0.1"} 2',
+            'latency_seconds_bucket{route="/a",le="1.0"} 3',
+            'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+            'latency_seconds_sum{route="/a"} 3.65',
+            'latency_seconds_count{route="/a"} 4',
+        ]
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes in label values cannot break the format."""
+        histogram = Histogram("h", "H", ("activity",), buckets=(1,))
+        histogram.observe(0, ('say "hi"',))
+        assert 'h_count{activity="say \\"hi\\""} 1' in histogram.render()
+
+
+class TestMetricsEndpoint:
+    """Tests for GET /metrics."""
+
+    def test_route_latency_by_template_and_status(self, client, reset_activities):
+        """Test that requests are labelled with their route template."""
+        client.post("/activities/Chess Club/signup?email=m1@mergington.edu")
+        client.post("/activities/Nonexistent/signup?email=m1@mergington.edu")
+        response = client.get("/metrics")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        route = 'method="POST",route="/activities/{activity_name}/signup"'
+        assert sample(text, f"http_request_duration_seconds_count{{{route},status=\"200\"}}") >= 1
+        assert sample(text, f"http_request_duration_seconds_count{{{route},status=\"404\"}}") >= 1
+
+    def test_unmatched_paths_share_a_label(self, client):
+        """Test that unknown URLs do not each get their own series."""
+        client.get("/no/such/page")
+        text = client.get("/metrics").text
+        assert 'route="unmatched",status="404"' in text
+        assert "/no/such/page" not in text
+
+    def test_response_sizes_and_in_flight(self, client, reset_activities):
+        """Test payload sizes and the in-flight gauge."""
+        client.get("/activities")
+        text = client.get("/metrics").text
+        assert sample(text, 'http_response_size_bytes_sum{method="GET",route="/activities"}') > 1000
+        # The scrape itself is the only request in flight
+        assert sample(text, 'http_requests_in_flight{method="GET"}') == 1
+        assert sample(text, "threadpool_tokens ") == 40
+
+    def test_domain_metrics(self, client, reset_activities):
+        """Test signup counters and per-activity fill ratios."""
+        before = sample(client.get("/metrics").text, "activity_signups_total")
+        client.post("/activities/Debate Team/signup?email=d1@mergington.edu")
+        text = client.get("/metrics").text
+        assert sample(text, "activity_signups_total") == before + 1
+        assert sample(text, 'activity_participants{activity="Debate Team"}') == 2
+        assert sample(text, 'activity_fill_ratio{activity="Debate Team"}') == 2 / 14
+
+
+class TestSlowRequestProfiler:
+    """Tests for dumping folded stacks of slow requests."""
+
+    def test_writes_folded_stacks(self, tmp_path):
+        """Test that a slow request produces a flamegraph-compatible file."""
+        profiler = SlowRequestProfiler(tmp_path, threshold=0.01, interval=0.001)
+
+        def slow_handler():
+            time.sleep(0.05)
+
+        profiler.begin()
+        start = time.perf_counter()
+        worker = threading.Thread(target=slow_handler)
+        worker.start()
+        worker.join()
+        path = profiler.end(start, time.perf_counter() - start, "GET", "/activities/{activity_name}")
+        profiler.flush()
+
+        assert path.endswith("-GET-activities_activity_name.folded")
+        lines = open(path).read().splitlines()
+        assert any("slow_handler (test_metrics.py" in line for line in lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) >= 1
+        assert profiler.profiles_written == 1
+
+    def test_fast_requests_are_ignored(self, tmp_path):
+        """Test that requests under the threshold write nothing."""
+        profiler = SlowRequestProfiler(tmp_path, threshold=1.0)
+        profiler.begin()
+        assert profiler.end(time.perf_counter(), 0.001, "GET", "/") is None
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,126 @@
+"""
+Tests for token-bucket rate limiting of signups.
+"""
+
+import json
+
+import pytest
+from fastapi import status
+
+import app as app_module
+from ratelimit import RateLimiter, parse_rate
+
+
+class TestRateLimiter:
+    """Tests for the buckets themselves."""
+
+    def test_burst_then_refill(self, clock):
+        """Test that a full bucket allows a burst and then refills at the rate."""
+        limiter = RateLimiter(rate=2, burst=3, clock=clock)
+        assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+        assert limiter.acquire("a") == pytest.approx(0.5)
+        clock.now = 0.5
+        assert limiter.acquire("a") == 0
+        # A long idle spell never fills the bucket beyond the burst
+        clock.now = 100
+        assert [limiter.acquire("a") for _ in range(4)][-1] > 0
+        assert limiter.refused == 2
+
+    def test_keys_are_independent(self, clock):
+        """Test that one key running dry does not affect another."""
+        limiter = RateLimiter(rate=1, burst=1, clock=clock)
+        assert limiter.acquire("a") == 0
+        assert limiter.acquire("a") > 0
+        assert limiter.acquire("b") == 0
+
+    def test_least_recently_used_buckets_are_evicted(self, clock):
+        """Test that the number of buckets stays bounded."""
+        limiter = RateLimiter(rate=1, burst=1, max_keys=2, clock=clock)
+        limiter.acquire("a")
+        limiter.acquire("b")
+        limiter.acquire("a")  # "b" is now the least recently used
+        limiter.acquire("c")
+        assert limiter.acquire("a") > 0
+        # "b" was forgotten, so it starts again with a full bucket
+        assert limiter.acquire("b") == 0
+
+    def test_parse_rate(self):
+        """Test the "rate/burst" setting format."""
+        assert parse_rate("2/10") == (2.0, 10.0)
+        assert parse_rate("5") == (5.0, 5.0)
+        assert parse_rate("0.5") == (0.5, 1.0)
+        assert parse_rate("off") is None
+        assert parse_rate("") is None
+        with pytest.raises(ValueError):
+            parse_rate("-1/5")
+
+
+class TestRateLimitedEndpoints:
+    """Tests for 429 responses from the signup endpoints."""
+
+    @pytest.fixture
+    def email_limit(self, monkeypatch, clock):
+        limiter = RateLimiter(rate=1, burst=2, clock=clock)
+        monkeypatch.setattr(app_module, "email_rate_limiter", limiter)
+        return limiter
+
+    def test_student_over_the_limit_gets_429(self, client, reset_activities, email_limit):
+        """Test that a student hammering signups is refused with Retry-After."""
+        email = "storm@mergington.edu"
+        assert client.post(f"/activities/Chess Club/signup?email={email}").status_code == 200
+        assert client.post(f"/activities/Chess Club/signup?email={email}").status_code == 400
+
+        response = client.post(f"/activities/Chess Club/signup?email={email}")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.json()["detail"] == "Too many requests"
+        assert response.headers["Retry-After"] == "1"
+        assert list(app_module.activities["Chess Club"].roster).count(email) == 1
+
+        # Other students are unaffected
+        response = client.post("/activities/Chess Club/signup?email=calm@mergington.edu")
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_waitlist_joins_are_limited(self, client, reset_activities, email_limit):
+        """Test that waitlist joins spend from the same bucket."""
+        email = "storm@mergington.edu"
+        for _ in range(2):
+            client.post(f"/activities/Chess Club/waitlist?email={email}")
+        response = client.post(f"/activities/Chess Club/waitlist?email={email}")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_client_limit(self, client, reset_activities, monkeypatch, clock):
+        """Test that the per-client bucket is keyed by the client's address."""
+        limiter = RateLimiter(rate=1, burst=1, clock=clock)
+        monkeypatch.setattr(app_module, "client_rate_limiter", limiter)
+        client.post("/activities/Chess Club/signup?email=one@mergington.edu")
+        response = client.post("/activities/Chess Club/signup?email=two@mergington.edu")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert "testclient" in limiter._buckets
+
+    def test_batch_signups_are_charged_per_item(self, client, reset_activities, email_limit):
+        """Test that a batch cannot sign one student up more often than a single request could."""
+        email = "storm@mergington.edu"
+        operations = [{"op": "signup", "activity": name, "email": email}
+                      for name in ("Chess Club", "Programming Class", "Gym Class")]
+        operations.append({"op": "remove", "activity": "Chess Club", "email": email})
+        response = client.post("/activities/batch", json={"operations": operations})
+        assert [result["status"] for result in response.json()["results"]] == [200, 200, 429, 200]
+        assert email not in app_module.activities["Gym Class"].roster
+
+        response = client.post("/activities/batch", json={"operations": operations, "atomic": True})
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.headers["Retry-After"] == "1"
+        assert response.json()["applied"] is False
+
+    def test_ndjson_and_import_are_charged(self, client, reset_activities, email_limit):
+        """Test that streamed signups and imported enrollments spend the same tokens."""
+        email = "storm@mergington.edu"
+        body = "".join(f'{{"op": "signup", "activity": "{name}", "email": "{email}"}}\n'
+                       for name in ("Chess Club", "Programming Class", "Gym Class"))
+        response = client.post("/activities/batch/ndjson", content=body)
+        assert [json.loads(line)["status"] for line in response.text.splitlines()] == [200, 200, 429]
+
+        body = f'{{"activity": "Gym Class", "email": "{email}"}}\n'
+        report = client.post("/activities/import", content=body).json()
+        assert report["failed"] == 1 and report["errors"][0]["detail"] == "Too many requests"
+        assert email not in app_module.activities["Gym Class"].roster
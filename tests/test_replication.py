@@ -0,0 +1,223 @@
+"""
+Tests for sharing one store between worker processes through a writer.
+"""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+import replication
+from events import ChangeFeed
+from replication import ReplicaStore, WriterServer
+from schedule import ScheduleIndex
+from store import ActivityFullError, ActivityStore, AlreadySignedUpError, ScheduleConflictError
+
+SEED = {
+    "Chess Club": {
+        "description": "Learn strategies and compete in chess tournaments",
+        "schedule": "Fridays, 3:30 PM - 5:00 PM",
+        "max_participants": 3,
+        "participants": ["michael@mergington.edu"],
+    },
+    "Art Club": {
+        "description": "Explore various art mediums",
+        "schedule": "Fridays, 4:00 PM - 5:00 PM",
+        "max_participants": 10,
+        "participants": [],
+    },
+}
+
+
+@pytest.fixture
+def writer():
+    """A writer serving a seeded store on a Unix socket."""
+    # Unix socket paths are short; pytest's tmp_path can be too long
+    directory = tempfile.mkdtemp()
+    store = ActivityStore(SEED)
+    schedule_index = ScheduleIndex(store)
+    store.add_signup_check(schedule_index.check_signup)
+    server = WriterServer(store, os.path.join(directory, "writer.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    shutil.rmtree(directory)
+
+
+@pytest.fixture
+def replicas(writer):
+    """Two replicas, as two workers would hold."""
+    pair = ReplicaStore(writer.server_address), ReplicaStore(writer.server_address)
+    yield pair
+    for replica in pair:
+        replica.close()
+
+
+class TestReplicaStore:
+    """Tests for replicas following and writing through the writer."""
+
+    def test_starts_from_snapshot(self, writer, replicas):
+        """Test that a replica starts with the writer's state and version."""
+        first, _ = replicas
+        assert first.to_dict() == writer.store.to_dict()
+        assert first.version == writer.store.version
+
+    def test_write_is_visible_everywhere(self, writer, replicas):
+        """Test that a write through one replica reaches the writer and the other."""
+        first, second = replicas
+        first.add_participant("Art Club", "new@mergington.edu")
+        # Read-your-writes on the replica that took the request
+        assert "new@mergington.edu" in first["Art Club"].roster
+        assert "new@mergington.edu" in writer.store["Art Club"].roster
+
+        second.remove_participant("Chess Club", "michael@mergington.edu")
+        assert list(second["Chess Club"].roster) == []
+        first._wait_for(second.version)
+        assert first.to_dict() == second.to_dict() == writer.store.to_dict()
+
+    def test_errors_come_back_as_store_errors(self, replicas):
+        """Test that the writer's checks apply to every worker."""
+        first, second = replicas
+        with pytest.raises(AlreadySignedUpError):
+            first.add_participant("Chess Club", "michael@mergington.edu")
+
+        first.add_participant("Chess Club", "busy@mergington.edu")
+        # Art Club overlaps Chess Club on Fridays
+        with pytest.raises(ScheduleConflictError) as error:
+            second.add_participant("Art Club", "busy@mergington.edu")
+        assert error.value.conflicts == ["Chess Club"]
+
+    def test_last_spot_goes_to_exactly_one_worker(self, writer, replicas):
+        """Test that concurrent signups through different workers stay linearizable."""
+        outcomes = []
+
+        def sign_up(replica, email):
+            try:
+                replica.add_participant("Chess Club", email)
+                outcomes.append("ok")
+            except ActivityFullError:
+                outcomes.append("full")
+
+        threads = [threading.Thread(target=sign_up, args=(replica, f"s{i}-{n}@mergington.edu"))
+                   for i in range(10) for n, replica in enumerate(replicas)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert outcomes.count("ok") == 2
+        assert len(writer.store["Chess Club"].roster) == 3
+        for replica in replicas:
+            replica._wait_for(writer.store.version)
+            assert list(replica["Chess Club"].roster) == list(writer.store["Chess Club"].roster)
+
+    def test_batches_and_activity_changes(self, writer, replicas):
+        """Test batches, new activities and deletes through a replica."""
+        first, second = replicas
+        applied, errors = first.apply_batch([
+            ("signup", "Art Club", "a@mergington.edu"),
+            ("signup", "Art Club", "a@mergington.edu"),
+        ])
+        assert applied is True
+        assert errors[0] is None
+        assert isinstance(errors[1], AlreadySignedUpError)
+
+        first["Band"] = {"description": "Concert band", "schedule": "Mondays, 5:00 PM - 6:00 PM",
+                         "max_participants": 40, "participants": []}
+        del first["Chess Club"]
+        second._wait_for(first.version)
+        assert sorted(second) == ["Art Club", "Band"]
+        assert second.activities_for("a@mergington.edu") == {"Art Club"}
+
+    def test_waitlist_promotion_reaches_replicas(self, writer, replicas):
+        """Test that promotions made by the writer show up on every replica."""
+        first, second = replicas
+        first.add_participant("Chess Club", "b@mergington.edu")
+        first.add_participant("Chess Club", "c@mergington.edu")
+        assert second.join_waitlist("Chess Club", "w@mergington.edu") == 1
+
+        first.remove_participant("Chess Club", "b@mergington.edu")
+        second._wait_for(first.version)
+        assert "w@mergington.edu" in second["Chess Club"].roster
+        assert len(second["Chess Club"].waitlist) == 0
+
+    def test_unenroll_through_a_replica(self, writer, replicas):
+        """Test that unenrolling through one worker reaches every replica."""
+        first, second = replicas
+        assert second.unenroll("michael@mergington.edu") == ["Chess Club"]
+        first._wait_for(second.version)
+        assert first.activities_for("michael@mergington.edu") == frozenset()
+        assert writer.store.activities_for("michael@mergington.edu") == frozenset()
+
+
+def wait_for_resubscribe(replica, old_stream, timeout=10):
+    deadline = time.monotonic() + timeout
+    while replica._stream is old_stream:
+        assert time.monotonic() < deadline, "replica did not resubscribe"
+        time.sleep(0.01)
+
+
+class TestReconnecting:
+    """Tests for replicas losing and regaining the writer's change stream."""
+
+    def test_reload_changes_only_what_differs(self, writer, replicas):
+        """Test that a reconnect replaces changed activities and sends one reset."""
+        replica, _ = replicas
+        feed = ChangeFeed(replica)
+        replica.add_participant("Chess Club", "before@mergington.edu")
+        before = replica.version
+        seen = []
+        replica.add_listener(lambda operation, version: seen.append(
+            (operation["op"], operation.get("activity"), operation.get("reload"), version)))
+
+        old_stream = replica._stream
+        replica._stream_socket.shutdown(socket.SHUT_RDWR)
+        # Missed by the replica: it only learns of it from the next snapshot
+        writer.store.add_participant("Art Club", "missed@mergington.edu")
+        wait_for_resubscribe(replica, old_stream)
+
+        # Chess Club is unchanged and left alone
+        assert seen == [("delete", "Art Club", True, before), ("put", "Art Club", True, before),
+                        ("reset", None, None, writer.store.version)]
+        assert replica.version == writer.store.version
+        assert replica.to_dict() == writer.store.to_dict()
+        # Clients resuming from before the reset have to reload
+        assert feed._since(before) is None
+
+    def test_failed_change_resubscribes(self, writer, replicas, caplog):
+        """Test that a change the replica cannot apply makes it start over from a snapshot."""
+        replica, _ = replicas
+        apply = replica.apply
+        failures = []
+
+        def apply_once_failing(operation):
+            if not failures:
+                failures.append(operation)
+                raise KeyError(operation["activity"])
+            return apply(operation)
+
+        replica.apply = apply_once_failing
+        writer.store.add_participant("Art Club", "a@mergington.edu")
+        replica._wait_for(writer.store.version)
+        assert "a@mergington.edu" in replica["Art Club"].roster
+        assert "resubscribing" in caplog.text
+        # Writes through the replica still catch up
+        replica.add_participant("Art Club", "b@mergington.edu")
+        assert "b@mergington.edu" in replica["Art Club"].roster
+
+    def test_stalled_subscriber_is_dropped(self, writer, monkeypatch):
+        """Test that a subscriber too far behind is dropped instead of queueing forever."""
+        monkeypatch.setattr(replication, "MAX_PENDING_CHANGES", 2)
+        dropped = []
+        _, _, changes = writer.subscribe(on_overflow=lambda: dropped.append(True))
+        for i in range(3):
+            writer.store.add_participant("Art Club", f"s{i}@mergington.edu")
+        assert dropped == [True]
+        assert changes.drain() is None
+        assert changes not in writer._subscribers
@@ -0,0 +1,136 @@
+"""
+Tests for schedule parsing, the time-slot index and conflict detection.
+"""
+
+import pytest
+from fastapi import status
+
+from app import activities, schedule_index
+from schedule import ScheduleError, TimeSlot, parse_day, parse_schedule, parse_time
+
+MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY = range(5)
+
+
+class TestParsing:
+    """Tests for turning free-text schedules into time slots."""
+
+    def test_two_days(self):
+        """Test a schedule joined with "and"."""
+        assert parse_schedule("Tuesdays and Thursdays, 3:30 PM - 4:30 PM") == (
+            TimeSlot(TUESDAY, 930, 990), TimeSlot(THURSDAY, 930, 990)
+        )
+
+    def test_comma_separated_days(self):
+        """Test a schedule listing several days."""
+        slots = parse_schedule("Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM")
+        assert [slot.day for slot in slots] == [MONDAY, WEDNESDAY, FRIDAY]
+        assert {(slot.start, slot.end) for slot in slots} == {(840, 900)}
+
+    def test_shared_meridiem_and_abbreviations(self):
+        """Test "Mon/Wed 3 - 4:15 pm" style schedules."""
+        assert parse_schedule("Mon and Wed, 3 - 4:15 pm") == (
+            TimeSlot(MONDAY, 900, 975), TimeSlot(WEDNESDAY, 900, 975)
+        )
+
+    def test_unparseable_schedule(self):
+        """Test that free text without times yields no slots."""
+        assert parse_schedule("By arrangement") == ()
+        assert parse_schedule("Fridays, 25:00 - 26:00") == ()
+
+    def test_parse_day_and_time(self):
+        """Test the helpers used by query parameters."""
+        assert parse_day("mondays") == MONDAY
+        assert parse_day("Thurs") == THURSDAY
+        assert parse_time("4 PM") == 960
+        assert parse_time("12:15 am") == 15
+        assert parse_time("16:30") == 990
+        with pytest.raises(ScheduleError):
+            parse_day("someday")
+
+
+class TestScheduleIndex:
+    """Tests for the per-weekday interval index."""
+
+    def test_activities_on_day(self, reset_activities):
+        """Test looking up everything meeting on a day."""
+        assert schedule_index.activities_on(MONDAY) == {"Gym Class", "Basketball Team", "Debate Team"}
+
+    def test_activities_after_time(self, reset_activities):
+        """Test "activities on Monday after 4 PM"."""
+        assert schedule_index.activities_on(MONDAY, after=960) == {"Basketball Team"}
+        assert schedule_index.activities_on(MONDAY, before=900) == {"Gym Class"}
+
+    def test_follows_store_changes(self, reset_activities):
+        """Test that the index is updated when activities change."""
+        activities["Band"] = {
+            "description": "Concert band", "schedule": "Mondays, 5:00 PM - 6:00 PM",
+            "max_participants": 40, "participants": []
+        }
+        assert "Band" in schedule_index.activities_on(MONDAY, after=960)
+        del activities["Band"]
+        assert "Band" not in schedule_index.activities_on(MONDAY)
+
+
+class TestConflictDetection:
+    """Tests for refusing signups that clash with a student's schedule."""
+
+    def test_conflicting_signup_rejected(self, client, reset_activities):
+        """Test that overlapping activities cannot both be joined."""
+        email = "busy@mergington.edu"
+        response = client.post(f"/activities/Programming Class/signup?email={email}")
+        assert response.status_code == status.HTTP_200_OK
+
+        # Track and Field overlaps Programming Class on Tuesdays and Thursdays
+        response = client.post(f"/activities/Track and Field/signup?email={email}")
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.json()["detail"] == "Schedule conflicts with Programming Class"
+
+        activities = client.get("/activities").json()
+        assert email not in activities["Track and Field"]["participants"]
+
+    def test_back_to_back_activities_allowed(self, client, reset_activities):
+        """Test that an activity ending when another starts is no clash."""
+        email = "athlete@mergington.edu"
+        # Gym Class ends at 3 PM; Science Olympiad starts at 3:30 PM
+        for activity in ("Gym Class", "Science Olympiad", "Chess Club"):
+            response = client.post(f"/activities/{activity}/signup?email={email}")
+            assert response.status_code == status.HTTP_200_OK
+
+    def test_removal_frees_the_slot(self, client, reset_activities):
+        """Test that leaving an activity allows joining a clashing one."""
+        email = "lucas@mergington.edu"  # Already in Track and Field
+        client.delete(f"/activities/Track and Field/participants/{email}")
+        response = client.post(f"/activities/Programming Class/signup?email={email}")
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_atomic_batch_checks_its_own_signups(self, client, reset_activities):
+        """Test that a batch cannot sign a student up for two clashing activities."""
+        response = client.post("/activities/batch", json={"atomic": True, "operations": [
+            {"op": "signup", "activity": "Programming Class", "email": "b@mergington.edu"},
+            {"op": "signup", "activity": "Track and Field", "email": "b@mergington.edu"},
+        ]})
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert [r["status"] for r in response.json()["results"]] == [409, 409]
+        assert response.json()["results"][1]["detail"] == "Schedule conflicts with Programming Class"
+
+
+class TestScheduleFilters:
+    """Tests for day and time filters on GET /activities."""
+
+    def test_day_with_start_time(self, client, reset_activities):
+        """Test listing activities on a day starting after a time."""
+        items = client.get("/activities", params={
+            "day": "Tuesday", "starts_after": "4 PM", "fields": "name"
+        }).json()["items"]
+        assert items == [{"name": "Track and Field"}]
+
+    def test_time_filter_needs_day(self, client, reset_activities):
+        """Test that time filters without a day are rejected."""
+        response = client.get("/activities", params={"starts_after": "4 PM"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_invalid_time(self, client, reset_activities):
+        """Test that an unreadable time is rejected."""
+        response = client.get("/activities", params={"day": "Monday", "starts_after": "teatime"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Unknown time: teatime"
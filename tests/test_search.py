@@ -0,0 +1,94 @@
+"""
+Tests for full-text activity search.
+"""
+
+from fastapi import status
+
+from app import activities, search_index
+from search import tokenize
+
+
+def names(client, q, **params):
+    response = client.get("/activities/search", params=dict(q=q, **params))
+    assert response.status_code == status.HTTP_200_OK
+    return [result["name"] for result in response.json()["results"]]
+
+
+class TestTokenize:
+    """Tests for splitting text into tokens."""
+
+    def test_lowercases_and_splits_on_punctuation(self):
+        """Test that punctuation and case are ignored."""
+        assert tokenize("Acting, stage performance & STEM!") == ["acting", "stage", "performance", "stem"]
+
+
+class TestSearchEndpoint:
+    """Tests for GET /activities/search."""
+
+    def test_word_in_description(self, client, reset_activities):
+        """Test matching a word from the description."""
+        assert names(client, "chess") == ["Chess Club"]
+        assert names(client, "tournaments") == ["Chess Club"]
+
+    def test_prefix_typeahead(self, client, reset_activities):
+        """Test that the last token matches as a prefix."""
+        assert names(client, "prog") == ["Programming Class"]
+        assert names(client, "debate te") == ["Debate Team"]
+
+    def test_all_tokens_must_match(self, client, reset_activities):
+        """Test AND semantics across tokens."""
+        assert names(client, "competitive basketball") == ["Basketball Team"]
+        assert names(client, "chess basketball") == []
+
+    def test_name_matches_rank_first(self, client, reset_activities):
+        """Test that a match in the name outranks one in the description."""
+        activities["Science Club"] = {
+            "description": "Hands-on experiments", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+            "max_participants": 10, "participants": []
+        }
+        # Both names match; Science Olympiad's description mentions it too
+        assert names(client, "science") == ["Science Olympiad", "Science Club"]
+
+        activities["Robotics"] = {
+            "description": "Build robots with the programming class",
+            "schedule": "Fridays, 3:30 PM - 5:00 PM", "max_participants": 10, "participants": []
+        }
+        assert names(client, "programming") == ["Programming Class", "Robotics"]
+
+    def test_results_include_availability(self, client, reset_activities):
+        """Test the shape of a result."""
+        result = client.get("/activities/search", params={"q": "art"}).json()["results"][0]
+        assert result["name"] == "Art Club"
+        assert result["spots_left"] == 16
+        assert result["score"] > 0
+
+    def test_limit(self, client, reset_activities):
+        """Test that limit caps the number of results."""
+        assert len(names(client, "c", limit=2)) == 2
+
+    def test_empty_query(self, client, reset_activities):
+        """Test that a query without words matches nothing."""
+        assert names(client, "  !! ") == []
+
+
+class TestIncrementalUpdates:
+    """Tests that the index follows changes to the store."""
+
+    def test_added_updated_and_removed_activities(self, reset_activities):
+        """Test that the index is maintained without rebuilding."""
+        activities["Photography"] = {
+            "description": "Learn to shoot film", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+            "max_participants": 10, "participants": []
+        }
+        assert [name for name, _ in search_index.search("film")] == ["Photography"]
+
+        activities["Photography"] = {
+            "description": "Digital cameras", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+            "max_participants": 10, "participants": []
+        }
+        assert search_index.search("film") == []
+        assert [name for name, _ in search_index.search("digi")] == ["Photography"]
+
+        del activities["Photography"]
+        assert search_index.search("phot") == []
+        assert len(search_index) == 9
@@ -0,0 +1,77 @@
+"""
+Tests for the typed response models and the fast JSON encoder.
+"""
+
+import json
+
+import pytest
+from fastapi import status
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter, ValidationError
+
+import serialization
+from models import (ActivityDetails, ActivityPage, ParticipantsPage, SearchResults,
+                    StudentActivities, StudentActivity, batch_item_adapter)
+
+
+def payload():
+    return {
+        "activity": "Chess Club",
+        "page": ParticipantsPage("Chess Club", ["é@mergington.edu", "b@mergington.edu"], 2, None),
+        "student": StudentActivities("a@x.edu", [StudentActivity("Chess", "Club   \"quoted\"", "Fridays", 3)]),
+        "score": 1.2345,
+        "flags": [True, False, None],
+    }
+
+
+class TestEncoder:
+    """Tests that every encoding path produces the same bytes."""
+
+    def test_matches_fastapi_json_response(self):
+        """Test that the output is what FastAPI's JSONResponse would send."""
+        content = payload()
+        expected = json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                              indent=None, separators=(",", ":")).encode("utf-8")
+        assert serialization.encode_json(content) == expected
+        assert serialization.encode_json_stdlib(content) == expected
+
+    def test_fallback_refuses_unknown_objects(self):
+        """Test that the stdlib path does not guess at arbitrary objects."""
+        with pytest.raises(TypeError):
+            serialization.encode_json_stdlib({"value": object()})
+
+    def test_models_have_no_instance_dict(self):
+        """Test that response models are slots classes."""
+        assert not hasattr(ParticipantsPage("a", [], 0, None), "__dict__")
+
+
+class TestModels:
+    """Tests that endpoint responses match their declared schemas."""
+
+    def test_responses_validate(self, client, reset_activities):
+        """Test each typed endpoint's body against its model."""
+        client.post("/activities/Chess Club/signup?email=emma@mergington.edu")
+        checks = [
+            ("/activities", TypeAdapter(dict[str, ActivityDetails])),
+            ("/activities?limit=2", TypeAdapter(ActivityPage)),
+            ("/activities/Chess Club/participants?limit=1", TypeAdapter(ParticipantsPage)),
+            ("/activities/search?q=chess", TypeAdapter(SearchResults)),
+            ("/students/emma@mergington.edu/activities", TypeAdapter(StudentActivities)),
+        ]
+        for url, adapter in checks:
+            response = client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["content-type"] == "application/json"
+            adapter.validate_json(response.content)
+
+    def test_schemas_are_documented(self, client):
+        """Test that the models appear in the OpenAPI schema."""
+        schemas = client.get("/openapi.json").json()["components"]["schemas"]
+        assert {"ParticipantsPage", "SearchResults", "StudentActivities", "BatchItem"} <= schemas.keys()
+
+    def test_batch_items_validate_to_dicts(self):
+        """Test that batch items come back as plain dicts and bad ones fail."""
+        item = batch_item_adapter.validate_json(b'{"op": "signup", "activity": "A", "email": "e"}')
+        assert item == {"op": "signup", "activity": "A", "email": "e"}
+        with pytest.raises(ValidationError):
+            batch_item_adapter.validate_json(b'{"op": "rename", "activity": "A", "email": "e"}')
@@ -5,6 +5,8 @@ Tests for static file serving and frontend integration.
 import pytest
 from fastapi import status
 
+from app import static_assets
+
 
 class TestStaticFiles:
     """Tests for static file serving."""
@@ -107,4 +109,77 @@ class TestFrontendIntegration:
         assert activities_response.status_code == status.HTTP_200_OK
         
         activities = activities_response.json()
-        assert email not in activities[activity]["participants"]
\ No newline at end of file
+        assert email not in activities[activity]["participants"]
+
+
+class TestAssetPipeline:
+    """Tests for hashed names, precompression and cache headers."""
+
+    def test_index_points_at_hashed_names(self, client):
+        """Test that index.html references assets that can be cached forever."""
+        html = client.get("/static/index.html").text
+        for name in ("styles.css", "app.js"):
+            hashed = static_assets.manifest[name]
+            assert f'"{hashed}"' in html
+            assert f'"{name}"' not in html
+
+            response = client.get(f"/static/{hashed}")
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+            assert response.text == client.get(f"/static/{name}").text
+
+    def test_index_must_be_revalidated(self, client):
+        """Test that index.html is revalidated and answers 304 when unchanged."""
+        response = client.get("/static/index.html")
+        assert response.headers["cache-control"] == "no-cache"
+        response = client.get("/static/index.html", headers={"If-None-Match": response.headers["etag"]})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+
+    def test_compressed_when_accepted(self, client):
+        """Test that gzip is sent to clients that accept it, with Vary."""
+        raw = client.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in raw.headers
+        assert raw.headers["vary"] == "Accept-Encoding"
+
+        compressed = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.headers["vary"] == "Accept-Encoding"
+        assert int(compressed.headers["content-length"]) < int(raw.headers["content-length"])
+        assert compressed.text == raw.text
+        # Each encoding has its own validator
+        assert compressed.headers["etag"] != raw.headers["etag"]
+
+    def test_refused_coding_is_not_sent(self, client):
+        """Test that q=0 rules a coding out."""
+        response = client.get("/static/styles.css", headers={"Accept-Encoding": "gzip;q=0"})
+        assert "content-encoding" not in response.headers
+
+    def test_head_and_methods(self, client):
+        """Test HEAD requests and refused methods."""
+        response = client.head("/static/styles.css", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == status.HTTP_200_OK
+        assert int(response.headers["content-length"]) > 0
+        assert response.content == b""
+        assert client.post("/static/styles.css").status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    def test_every_page_is_rewritten(self, client):
+        """Test that the rendering benchmark page also gets hashed names."""
+        html = client.get("/static/bench.html").text
+        for name in ("render.js", "bench.js", "styles.css"):
+            assert f'"{static_assets.manifest[name]}"' in html
+
+
+class TestRenderer:
+    """Tests for the frontend's keyed renderer."""
+
+    def test_renderer_loads_before_the_app(self, client):
+        """Test that index.html loads render.js ahead of app.js."""
+        html = client.get("/static/index.html").text
+        assert html.index(static_assets.manifest["render.js"]) < html.index(static_assets.manifest["app.js"])
+
+    def test_no_inline_handlers(self, client):
+        """Test that remove buttons rely on one delegated listener."""
+        for name in ("app.js", "render.js"):
+            assert "onclick" not in client.get(f"/static/{name}").text
+        assert "ActivityListRenderer" in client.get("/static/render.js").text
@@ -0,0 +1,241 @@
+"""
+Tests for the durable storage backends.
+"""
+
+import threading
+
+import pytest
+
+from storage import MemoryBackend, SQLiteBackend, WriteAheadLogBackend, open_backend
+from store import ActivityStore, StoreError
+
+SEED = {
+    "Chess Club": {
+        "description": "Learn strategies and compete in chess tournaments",
+        "schedule": "Fridays, 3:30 PM - 5:00 PM",
+        "max_participants": 12,
+        "participants": ["michael@mergington.edu", "daniel@mergington.edu"]
+    },
+    "Art Club": {
+        "description": "Explore various art mediums including painting and drawing",
+        "schedule": "Thursdays, 3:30 PM - 5:00 PM",
+        "max_participants": 18,
+        "participants": ["maya@mergington.edu"]
+    }
+}
+
+
+def wal_backend(tmp_path, **kwargs):
+    return WriteAheadLogBackend(tmp_path / "wal", fsync=False, **kwargs)
+
+
+def sqlite_backend(tmp_path):
+    return SQLiteBackend(tmp_path / "activities.sqlite3")
+
+
+def open_store(backend):
+    """Open a store on ``backend``, seeding it if the backend is empty."""
+    store = ActivityStore(backend=backend)
+    if not store.recover():
+        store.update(SEED)
+    return store
+
+
+def mutate(store):
+    store.add_participant("Chess Club", "new@mergington.edu")
+    store.remove_participant("Chess Club", "michael@mergington.edu")
+    store.add_participant("Art Club", "michael@mergington.edu")
+    store["Debate Team"] = {
+        "description": "Develop critical thinking and public speaking skills",
+        "schedule": "Mondays, 3:30 PM - 5:00 PM",
+        "max_participants": 14,
+        "participants": ["grace@mergington.edu"]
+    }
+
+
+@pytest.fixture(params=[wal_backend, sqlite_backend], ids=["wal", "sqlite"])
+def make_backend(request, tmp_path):
+    """Factory for each durable backend, reopened on the same files."""
+    return lambda: request.param(tmp_path)
+
+
+class TestDurableBackends:
+    """Tests shared by the write-ahead log and SQLite backends."""
+
+    def test_empty_backend_reports_nothing_to_recover(self, make_backend):
+        """Test that a fresh backend leaves the store to be seeded."""
+        backend = make_backend()
+        store = ActivityStore(backend=backend)
+        assert store.recover() is False
+        backend.close()
+
+    def test_state_survives_restart(self, make_backend):
+        """Test that every kind of mutation is restored after a restart."""
+        backend = make_backend()
+        store = open_store(backend)
+        mutate(store)
+        expected = store.to_dict()
+        backend.close()
+
+        backend = make_backend()
+        restored = open_store(backend)
+        assert restored.to_dict() == expected
+        assert list(restored) == ["Chess Club", "Art Club", "Debate Team"]
+        assert restored.activities_for("michael@mergington.edu") == {"Art Club"}
+        backend.close()
+
+    def test_deleted_activities_stay_deleted(self, make_backend):
+        """Test that deleting an activity is persisted."""
+        backend = make_backend()
+        store = open_store(backend)
+        del store["Art Club"]
+        backend.close()
+
+        backend = make_backend()
+        assert list(open_store(backend)) == ["Chess Club"]
+        backend.close()
+
+    def test_concurrent_writes_are_group_committed(self, make_backend):
+        """Test that concurrent writers share batches and all persist."""
+        backend = make_backend()
+        backend.commit_delay = 0.005
+        store = open_store(backend)
+        store["Gym Class"] = {
+            "description": "Physical education",
+            "schedule": "Mondays, 2:00 PM - 3:00 PM",
+            "max_participants": 1000,
+            "participants": []
+        }
+        before = backend.batches_written
+        threads = [
+            threading.Thread(target=store.add_participant, args=("Gym Class", f"s{i}@mergington.edu"))
+            for i in range(50)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert backend.batches_written - before < 50
+        expected = store.to_dict()
+        backend.close()
+
+        backend = make_backend()
+        assert open_store(backend).to_dict() == expected
+        backend.close()
+
+
+class TestWriteAheadLog:
+    """Tests specific to the write-ahead log backend."""
+
+    def test_snapshot_compacts_log(self, tmp_path):
+        """Test that snapshots replace old segments and still restore."""
+        backend = wal_backend(tmp_path, snapshot_every=5)
+        store = open_store(backend)
+        for i in range(10):
+            store.add_participant("Art Club", f"s{i}@mergington.edu")
+        expected = store.to_dict()
+        backend.close()
+
+        directory = tmp_path / "wal"
+        assert len(list(directory.glob("snapshot-*.json"))) == 1
+        assert len(list(directory.glob("wal-*.log"))) <= 2
+
+        backend = wal_backend(tmp_path, snapshot_every=5)
+        assert open_store(backend).to_dict() == expected
+        backend.close()
+
+    def test_torn_tail_is_ignored(self, tmp_path):
+        """Test that a partially written last record does not break recovery."""
+        backend = wal_backend(tmp_path)
+        store = open_store(backend)
+        store.add_participant("Art Club", "kept@mergington.edu")
+        backend.close()
+
+        segment = sorted((tmp_path / "wal").glob("wal-*.log"))[-1]
+        with open(segment, "a", encoding="utf-8") as f:
+            f.write('{"lsn": 999, "op": {"op": "sig')
+
+        backend = wal_backend(tmp_path)
+        restored = open_store(backend)
+        assert "kept@mergington.edu" in restored["Art Club"].roster
+        restored.add_participant("Art Club", "after@mergington.edu")
+        backend.close()
+
+    def test_writes_after_a_torn_tail_survive(self, tmp_path):
+        """Test that recovery truncates a torn write before appending after it."""
+        backend = wal_backend(tmp_path)
+        open_store(backend)
+        backend.close()
+
+        # A crash right after rotating: the new segment holds only a partial line
+        torn = tmp_path / "wal" / f"wal-{backend._lsn + 1:012d}.log"
+        torn.write_text('{"lsn": 999, "op": {"op": "sig', encoding="utf-8")
+
+        backend = wal_backend(tmp_path)
+        store = open_store(backend)
+        store.add_participant("Art Club", "first@mergington.edu")
+        store.add_participant("Art Club", "second@mergington.edu")
+        expected = store.to_dict()
+        backend.close()
+
+        backend = wal_backend(tmp_path)
+        assert open_store(backend).to_dict() == expected
+        backend.close()
+
+    def test_replacing_activities_while_compacting(self, tmp_path):
+        """Test that replacing an activity never waits on the writer while it snapshots."""
+        backend = wal_backend(tmp_path, snapshot_every=1)
+        store = open_store(backend)
+        stop = threading.Event()
+
+        def replace():
+            for i in range(200):
+                data = store["Chess Club"].to_dict()
+                data["description"] = f"Revision {i}"
+                store["Chess Club"] = data
+            store.clear()
+            store.update(SEED)
+
+        def churn(worker):
+            i = 0
+            while not stop.is_set():
+                email = f"w{worker}.{i}@mergington.edu"
+                try:
+                    store.add_participant("Art Club", email)
+                    store.remove_participant("Art Club", email)
+                except StoreError:
+                    # Art Club is briefly missing while the store is reset
+                    pass
+                i += 1
+
+        replacer = threading.Thread(target=replace, daemon=True)
+        churners = [threading.Thread(target=churn, args=(worker,), daemon=True) for worker in range(4)]
+        for thread in [replacer, *churners]:
+            thread.start()
+        replacer.join(timeout=30)
+        stop.set()
+        for thread in churners:
+            thread.join(timeout=30)
+        assert not replacer.is_alive()
+        assert not any(thread.is_alive() for thread in churners)
+        expected = store.to_dict()
+        backend.close()
+
+        backend = wal_backend(tmp_path)
+        assert open_store(backend).to_dict() == expected
+        backend.close()
+
+
+class TestOpenBackend:
+    """Tests for backend selection."""
+
+    def test_memory_is_not_durable(self, tmp_path):
+        """Test that the memory backend has nothing to recover."""
+        backend = open_backend("memory", tmp_path)
+        assert isinstance(backend, MemoryBackend)
+        assert ActivityStore(backend=backend).recover() is False
+
+    def test_unknown_backend(self, tmp_path):
+        """Test that an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            open_backend("floppy", tmp_path)
@@ -0,0 +1,191 @@
+"""
+Tests for the roster store backing the activities API.
+"""
+
+import pytest
+
+from store import Activity, ActivityStore, EmailTable, Roster
+
+
+@pytest.fixture
+def store():
+    """Create a small store with two activities."""
+    return ActivityStore({
+        "Chess Club": {
+            "description": "Chess",
+            "schedule": "Fridays, 3:30 PM - 5:00 PM",
+            "max_participants": 12,
+            "participants": ["a@mergington.edu", "b@mergington.edu"]
+        },
+        "Art Club": {
+            "description": "Art",
+            "schedule": "Thursdays, 3:30 PM - 5:00 PM",
+            "max_participants": 18,
+            "participants": ["b@mergington.edu"]
+        }
+    })
+
+
+class TestRoster:
+    """Tests for the ordered participant set."""
+
+    def test_preserves_signup_order(self):
+        """Test that participants are listed in sign-up order."""
+        roster = Roster(["c@x.edu", "a@x.edu"])
+        roster.add("b@x.edu")
+        assert list(roster) == ["c@x.edu", "a@x.edu", "b@x.edu"]
+
+    def test_membership_and_discard(self):
+        """Test membership checks and removals."""
+        roster = Roster(["a@x.edu", "b@x.edu"])
+        assert "a@x.edu" in roster
+        roster.discard("a@x.edu")
+        roster.discard("missing@x.edu")
+        assert "a@x.edu" not in roster
+        assert len(roster) == 1
+
+    def test_readding_moves_to_end(self):
+        """Test that a removed participant who signs up again goes last."""
+        roster = Roster(["a@x.edu", "b@x.edu"])
+        roster.discard("a@x.edu")
+        roster.add("a@x.edu")
+        assert list(roster) == ["b@x.edu", "a@x.edu"]
+
+    def test_pages_resume_after_removals(self):
+        """Test that paging walks the roster once despite changes in between."""
+        roster = Roster(f"s{i}" for i in range(10))
+        first, after = roster.page(limit=4)
+        assert first == ["s0", "s1", "s2", "s3"]
+        roster.discard("s2")
+        roster.discard("s4")
+        roster.add("s10")
+        second, after = roster.page(after, limit=4)
+        assert second == ["s5", "s6", "s7", "s8"]
+        assert roster.page(after, limit=4) == (["s9", "s10"], None)
+
+    def test_deep_page_after_many_removals(self):
+        """Test that a page deep into a large roster starts at the right place."""
+        roster = Roster(f"s{i}" for i in range(100_000))
+        for i in range(0, 99_000, 2):
+            roster.discard(f"s{i}")
+        emails, after = roster.page(99_000, limit=3)
+        assert emails == ["s99000", "s99001", "s99002"]
+        assert after == 99_003
+
+
+class TestCompactRepresentation:
+    """Tests for rosters stored as arrays of interned email ids."""
+
+    def test_email_table_assigns_stable_ids(self):
+        """Test that each distinct email gets one id and one stored string."""
+        table = EmailTable()
+        first = table.id_for("a@x.edu")
+        assert table.id_for("b@x.edu") == first + 1
+        assert table.id_for("".join(["a@", "x.edu"])) == first
+        assert table.lookup("missing@x.edu") is None
+        assert table.intern("".join(["b@", "x.edu"])) is table.intern("b@x.edu")
+        assert len(table) == 2
+
+    def test_rosters_share_one_table(self):
+        """Test that rosters on a shared table stay independent."""
+        table = EmailTable()
+        chess = Roster(["a@x.edu", "b@x.edu"], table=table)
+        art = Roster(["b@x.edu", "a@x.edu", "a@x.edu"], table=table)
+        chess.discard("a@x.edu")
+        assert list(chess) == ["b@x.edu"]
+        assert list(art) == ["b@x.edu", "a@x.edu"]
+        assert "a@x.edu" not in chess and "a@x.edu" in art
+        assert len(table) == 2
+
+    def test_each_store_has_its_own_table(self):
+        """Test that stores do not share interned emails, so a dropped store takes its own."""
+        first = ActivityStore({"Chess": {"description": "", "schedule": "", "max_participants": 5,
+                                         "participants": ["a@x.edu"]}})
+        second = ActivityStore()
+        second["Chess"] = first["Chess"]
+        assert first["Chess"].roster.table is first.emails
+        assert second["Chess"].roster.table is second.emails
+        assert second["Chess"] is not first["Chess"]
+        assert list(second["Chess"].roster) == ["a@x.edu"] and len(second.emails) == 1
+        assert list(second.activities_for("a@x.edu")) == ["Chess"]
+
+    def test_membership_after_mixed_changes(self):
+        """Test membership and order after interleaved adds and removals."""
+        roster = Roster()
+        emails = [f"s{i}@x.edu" for i in range(50)]
+        for email in reversed(emails):
+            roster.add(email)
+        for email in emails[::3]:
+            roster.discard(email)
+        kept = [email for email in reversed(emails) if email not in emails[::3]]
+        assert list(roster) == kept
+        assert all((email in roster) == (email in kept) for email in emails)
+
+    def test_json_output_unchanged(self, store):
+        """Test that activities serialize exactly as plain dicts."""
+        store.add_participant("Art Club", "c@mergington.edu")
+        store.remove_participant("Chess Club", "a@mergington.edu")
+        assert store.to_dict()["Chess Club"]["participants"] == ["b@mergington.edu"]
+        assert store.to_dict()["Art Club"] == {
+            "description": "Art",
+            "schedule": "Thursdays, 3:30 PM - 5:00 PM",
+            "max_participants": 18,
+            "participants": ["b@mergington.edu", "c@mergington.edu"],
+        }
+        assert store.activities_for("b@mergington.edu") == {"Chess Club", "Art Club"}
+
+    def test_activities_have_no_instance_dict(self):
+        """Test that activity records use slots."""
+        activity = Activity("Chess", "Fridays, 3:30 PM - 5:00 PM", 12)
+        assert not hasattr(activity, "__dict__")
+
+
+class TestActivityStore:
+    """Tests for the activity mapping and student reverse index."""
+
+    def test_accepts_plain_dicts(self, store):
+        """Test that plain dicts are converted to activities."""
+        assert isinstance(store["Chess Club"], Activity)
+        assert store.to_dict()["Chess Club"]["participants"] == [
+            "a@mergington.edu", "b@mergington.edu"
+        ]
+
+    def test_reverse_index_built_from_seed(self, store):
+        """Test that seeded rosters populate the reverse index."""
+        assert store.activities_for("b@mergington.edu") == {"Chess Club", "Art Club"}
+        assert store.activities_for("nobody@mergington.edu") == frozenset()
+
+    def test_add_and_remove_update_reverse_index(self, store):
+        """Test that signups and removals keep the reverse index in sync."""
+        store.add_participant("Art Club", "a@mergington.edu")
+        assert store.activities_for("a@mergington.edu") == {"Chess Club", "Art Club"}
+
+        store.remove_participant("Chess Club", "a@mergington.edu")
+        store.remove_participant("Art Club", "a@mergington.edu")
+        assert store.activities_for("a@mergington.edu") == frozenset()
+
+    def test_replacing_and_deleting_activities(self, store):
+        """Test that replacing or deleting an activity unindexes its roster."""
+        store["Chess Club"] = {
+            "description": "Chess",
+            "schedule": "Fridays, 3:30 PM - 5:00 PM",
+            "max_participants": 12,
+            "participants": []
+        }
+        assert store.activities_for("a@mergington.edu") == frozenset()
+
+        del store["Art Club"]
+        assert store.activities_for("b@mergington.edu") == frozenset()
+
+    def test_clear_and_update(self, store):
+        """Test the reset pattern used by the test fixtures."""
+        store.clear()
+        assert len(store) == 0
+        store.update({"Art Club": {
+            "description": "Art",
+            "schedule": "Thursdays, 3:30 PM - 5:00 PM",
+            "max_participants": 18,
+            "participants": ["z@mergington.edu"]
+        }})
+        assert list(store) == ["Art Club"]
+        assert store.activities_for("z@mergington.edu") == {"Art Club"}
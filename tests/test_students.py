@@ -0,0 +1,91 @@
+"""
+Tests for the student-centric API backed by the reverse index.
+"""
+
+import threading
+
+from fastapi import status
+
+from store import ActivityStore
+
+
+def make_store():
+    return ActivityStore({
+        name: {"description": name, "schedule": f"{day}, 3:30 PM - 5:00 PM",
+               "max_participants": 2, "participants": ["a@mergington.edu"]}
+        for name, day in (("Chess Club", "Mondays"), ("Art Club", "Tuesdays"), ("Band", "Fridays"))
+    })
+
+
+class TestUnenroll:
+    """Tests for removing a student from everything at once."""
+
+    def test_removes_every_enrollment(self):
+        """Test that the student is left on nothing and others are untouched."""
+        store = make_store()
+        store.add_participant("Band", "b@mergington.edu")
+        assert store.unenroll("a@mergington.edu") == ["Art Club", "Band", "Chess Club"]
+        assert store.activities_for("a@mergington.edu") == frozenset()
+        assert all("a@mergington.edu" not in activity.roster for activity in store.values())
+        assert list(store["Band"].roster) == ["b@mergington.edu"]
+        assert store.unenroll("a@mergington.edu") == []
+
+    def test_freed_places_promote_waiting_students(self):
+        """Test that each freed place goes to the head of that waitlist."""
+        store = make_store()
+        store.add_participant("Band", "b@mergington.edu")
+        store.join_waitlist("Band", "w@mergington.edu")
+        store.unenroll("a@mergington.edu")
+        assert list(store["Band"].roster) == ["b@mergington.edu", "w@mergington.edu"]
+
+    def test_races_with_signups(self):
+        """Test that signups racing an unenroll never leave the index inconsistent."""
+        store = make_store()
+        store.unenroll("a@mergington.edu")
+        barrier = threading.Barrier(2)
+
+        def sign_up():
+            barrier.wait()
+            for name in ("Chess Club", "Art Club", "Band"):
+                store.add_participant(name, "a@mergington.edu")
+
+        thread = threading.Thread(target=sign_up)
+        thread.start()
+        barrier.wait()
+        removed = store.unenroll("a@mergington.edu")
+        thread.join()
+
+        remaining = {name for name, activity in store.items() if "a@mergington.edu" in activity.roster}
+        assert store.activities_for("a@mergington.edu") == remaining
+        assert not remaining & set(removed)
+
+
+class TestStudentEndpoints:
+    """Tests for GET and DELETE /students/{email}/activities."""
+
+    def test_lists_enrollments(self, client, reset_activities):
+        """Test that a student's activities are listed by name."""
+        client.post("/activities/Chess Club/signup?email=emma@mergington.edu")
+        response = client.get("/students/emma@mergington.edu/activities")
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["email"] == "emma@mergington.edu"
+        assert [activity["name"] for activity in data["activities"]] == ["Chess Club", "Programming Class"]
+        assert data["activities"][0]["schedule"] == "Fridays, 3:30 PM - 5:00 PM"
+        assert data["activities"][0]["spots_left"] == 9
+
+    def test_unknown_student_has_no_activities(self, client, reset_activities):
+        """Test that a student on nothing gets an empty list, not an error."""
+        response = client.get("/students/nobody@mergington.edu/activities")
+        assert response.json() == {"email": "nobody@mergington.edu", "activities": []}
+
+    def test_unenroll_from_everything(self, client, reset_activities):
+        """Test that DELETE removes the student everywhere."""
+        client.post("/activities/Chess Club/signup?email=emma@mergington.edu")
+        response = client.delete("/students/emma@mergington.edu/activities")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["activities"] == ["Chess Club", "Programming Class"]
+
+        activities = client.get("/activities").json()
+        assert all("emma@mergington.edu" not in a["participants"] for a in activities.values())
+        assert client.get("/students/emma@mergington.edu/activities").json()["activities"] == []
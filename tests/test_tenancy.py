@@ -0,0 +1,158 @@
+"""
+Tests for serving several schools, each with its own store.
+"""
+
+import threading
+
+import pytest
+from fastapi import status
+
+import app as app_module
+from store import ActivityStore
+from storage import MemoryBackend
+from tenancy import School, SchoolRegistry
+
+
+@pytest.fixture
+def schools(monkeypatch):
+    """Serve a fresh registry that knows only the default school, none loaded."""
+    registry = SchoolRegistry(app_module.open_school, {app_module.DEFAULT_SCHOOL_ID})
+    monkeypatch.setattr(app_module, "schools", registry)
+    return registry
+
+
+def chess(participants=()):
+    return {"Chess Club": {"description": "Chess", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+                           "max_participants": 2, "participants": list(participants)}}
+
+
+class TestSchoolRegistry:
+    """Tests for loading schools on first use."""
+
+    def test_schools_load_lazily_and_once(self):
+        """Test that a school is built on first use, once, however many ask."""
+        opened = []
+
+        def open_school(school_id):
+            opened.append(school_id)
+            return School(school_id, ActivityStore(chess()), MemoryBackend())
+
+        registry = SchoolRegistry(open_school, {"north", "south"})
+        assert registry.loaded() == [] and len(registry) == 2
+        threads = [threading.Thread(target=registry.get, args=("north",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert opened == ["north"]
+        assert registry.loaded() == ["north"]
+        assert registry.loaded("south") is None
+
+    def test_idle_schools_beyond_the_cap_are_closed(self, clock):
+        """Test that the least recently used idle school is closed, never a pinned one."""
+        closed = []
+
+        class TrackedSchool(School):
+            def close(self):
+                closed.append(self.id)
+                super().close()
+
+        registry = SchoolRegistry(
+            lambda school_id: TrackedSchool(school_id, ActivityStore(chess()), MemoryBackend()),
+            {"main", "north", "south", "east"}, max_loaded=2, pinned={"main"}, min_idle=60,
+            clock=clock)
+        registry.get("main")
+        registry.get("north")
+        clock.now = 100
+        registry.get("south")
+        # North was idle long enough; main is pinned
+        assert closed == ["north"] and registry.loaded() == ["main", "south"]
+        registry.get("east")
+        # South was used too recently, so the cap gives way
+        assert closed == ["north"] and registry.loaded() == ["east", "main", "south"]
+        clock.now = 200
+        registry.get("north")
+        assert closed == ["north", "south", "east"] and registry.loaded() == ["main", "north"]
+        assert registry.evicted == 3
+
+    def test_unknown_and_invalid_schools(self):
+        """Test that unknown ids are refused and invalid ones cannot be added."""
+        registry = SchoolRegistry(lambda school_id: None)
+        with pytest.raises(KeyError):
+            registry.get("north")
+        with pytest.raises(ValueError):
+            registry.add("../north")
+        assert registry.add("north") is True
+        assert registry.add("north") is False
+        assert registry.ids() == ["north"]
+
+
+class TestSchoolRoutes:
+    """Tests for the /schools/{school_id} routes."""
+
+    def test_default_school_is_served_at_both_paths(self, client, reset_activities, schools):
+        """Test that the root routes and /schools/mergington are the same school."""
+        client.post("/activities/Chess Club/signup?email=emma@mergington.edu")
+        response = client.get("/schools/mergington/activities/Chess Club/participants")
+        assert "emma@mergington.edu" in response.json()["participants"]
+
+    def test_schools_are_isolated(self, client, reset_activities, schools):
+        """Test that signups, listings and caches do not cross schools."""
+        assert client.post("/schools/north").status_code == status.HTTP_201_CREATED
+        schools.get("north").activities.update(chess(["a@north.edu"]))
+        default_etag = client.get("/activities").headers["etag"]
+
+        response = client.post("/schools/north/activities/Chess Club/signup?email=b@north.edu")
+        assert response.status_code == status.HTTP_200_OK
+        # Full at north, untouched at the default school
+        response = client.post("/schools/north/activities/Chess Club/signup?email=c@north.edu")
+        assert response.json()["detail"] == "Activity is full"
+        assert client.get("/activities").headers["etag"] == default_etag
+        assert "b@north.edu" not in client.get("/activities").json()["Chess Club"]["participants"]
+        assert client.get("/schools/north/students/b@north.edu/activities").json()["activities"]
+        assert client.get("/students/b@north.edu/activities").json()["activities"] == []
+
+    def test_listing_schools(self, client, schools):
+        """Test that new schools are listed but loaded only when used."""
+        client.post("/schools/north")
+        assert client.get("/schools").json() == {"schools": ["mergington", "north"],
+                                                 "loaded": []}
+        client.get("/schools/north/activities")
+        assert client.get("/schools").json()["loaded"] == ["north"]
+
+    def test_unknown_invalid_and_duplicate_schools(self, client, schools):
+        """Test 404 for an unknown school, 422 for a bad id and 409 for a duplicate."""
+        response = client.get("/schools/north/activities")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "School not found"
+        assert client.get("/schools/North_1/activities").status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        assert client.post("/schools/North_1").status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        assert client.post("/schools/mergington").status_code == status.HTTP_409_CONFLICT
+
+    def test_import_into_a_new_school(self, client, schools):
+        """Test that a new school starts empty and can be bulk loaded."""
+        client.post("/schools/north")
+        assert client.get("/schools/north/activities").json() == {}
+        body = (b'{"activity": "Chess Club", "description": "Chess", "schedule": "Fridays, 3:30 PM - 5:00 PM",'
+                b' "max_participants": 2}\n{"activity": "Chess Club", "email": "a@north.edu"}\n')
+        report = client.post("/schools/north/activities/import", content=body).json()
+        assert report["activities_created"] == 1 and report["enrolled"] == 1
+        assert client.get("/schools/north/activities").json() == chess(["a@north.edu"])
+
+
+class TestDurableSchools:
+    """Tests for schools kept by a durable backend."""
+
+    def test_created_school_survives_restart(self, client, schools, monkeypatch, tmp_path):
+        """Test that a school created over the API is found and recovered after a restart."""
+        monkeypatch.setattr(app_module, "storage_kind", "sqlite")
+        monkeypatch.setattr(app_module, "data_dir", tmp_path)
+        client.post("/schools/north")
+        schools.get("north").activities.update(chess())
+        client.post("/schools/north/activities/Chess Club/signup?email=a@north.edu")
+        schools.close()
+
+        restarted = SchoolRegistry(app_module.open_school, app_module.known_schools())
+        assert restarted.ids() == ["mergington", "north"]
+        assert restarted.get("north").activities.to_dict() == chess(["a@north.edu"])
+        restarted.close()
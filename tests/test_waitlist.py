@@ -0,0 +1,281 @@
+"""
+Tests for waitlists, promotion when places free up and notifications.
+"""
+
+import asyncio
+import random
+
+import pytest
+from fastapi import status
+
+from notifications import NotificationQueue, notify_waitlist_changes
+from schedule import ScheduleIndex
+from storage import SQLiteBackend, WriteAheadLogBackend
+from store import (ActivityFullError, ActivityStore, AlreadyWaitlistedError, ScheduleConflictError,
+                   SpotsAvailableError, Waitlist)
+
+
+def full_store(backend=None):
+    """A store whose Chess Club is full, with an Art Club clashing with it."""
+    store = ActivityStore(backend=backend)
+    if not store.recover():
+        store.update({
+            "Chess Club": {
+                "description": "Chess", "schedule": "Fridays, 3:30 PM - 5:00 PM",
+                "max_participants": 2, "participants": ["a@mergington.edu", "b@mergington.edu"],
+            },
+            "Art Club": {
+                "description": "Art", "schedule": "Fridays, 4:00 PM - 5:00 PM",
+                "max_participants": 10, "participants": [],
+            },
+        })
+    schedule_index = ScheduleIndex(store)
+    store.add_signup_check(schedule_index.check_signup)
+    return store
+
+
+class TestWaitlist:
+    """Tests for the FIFO queue itself."""
+
+    def test_first_come_first_served(self):
+        """Test that students come off the queue in the order they joined."""
+        waitlist = Waitlist(["a", "b"])
+        waitlist.add("c")
+        assert [waitlist.pop(), waitlist.pop(), waitlist.pop(), waitlist.pop()] == ["a", "b", "c", None]
+
+    def test_positions_skip_students_who_left(self):
+        """Test that positions close up when someone ahead leaves."""
+        waitlist = Waitlist(["a", "b", "c", "d"])
+        assert waitlist.discard("b")
+        assert not waitlist.discard("b")
+        assert [waitlist.position(email) for email in "acd"] == [1, 2, 3]
+        waitlist.discard("a")
+        assert waitlist.peek() == "c"
+        assert waitlist.position("d") == 2
+        assert waitlist.position("a") is None
+
+    def test_rejoining_goes_to_the_back(self):
+        """Test that leaving and rejoining loses your place."""
+        waitlist = Waitlist(["a", "b"])
+        waitlist.discard("a")
+        waitlist.add("a")
+        assert list(waitlist) == ["b", "a"]
+        assert waitlist.position("a") == 2
+
+    def test_matches_a_plain_list(self):
+        """Test random joins, leaves and pops against a list model."""
+        rng = random.Random(7)
+        waitlist, model = Waitlist(), []
+        for step in range(5000):
+            action = rng.random()
+            if action < 0.5:
+                email = f"s{rng.randrange(300)}"
+                if email not in model:
+                    waitlist.add(email)
+                    model.append(email)
+            elif action < 0.8 and model:
+                email = rng.choice(model)
+                waitlist.discard(email)
+                model.remove(email)
+            else:
+                assert waitlist.pop() == (model.pop(0) if model else None)
+            if step % 50 == 0:
+                assert list(waitlist) == model
+                assert all(waitlist.position(email) == i for i, email in enumerate(model, 1))
+
+
+class TestStoreWaitlist:
+    """Tests for joining waitlists and promotion in the store."""
+
+    def test_join_only_when_full(self):
+        """Test that there is nothing to wait for while places are free."""
+        store = full_store()
+        with pytest.raises(SpotsAvailableError):
+            store.join_waitlist("Art Club", "c@mergington.edu")
+        assert store.join_waitlist("Chess Club", "c@mergington.edu") == 1
+        assert store.join_waitlist("Chess Club", "d@mergington.edu") == 2
+        with pytest.raises(AlreadyWaitlistedError):
+            store.join_waitlist("Chess Club", "c@mergington.edu")
+
+    def test_removal_promotes_the_head(self):
+        """Test that a freed place goes to the first student waiting."""
+        store = full_store()
+        store.join_waitlist("Chess Club", "c@mergington.edu")
+        store.join_waitlist("Chess Club", "d@mergington.edu")
+
+        store.remove_participant("Chess Club", "a@mergington.edu")
+        assert list(store["Chess Club"].roster) == ["b@mergington.edu", "c@mergington.edu"]
+        assert store.waitlist_position("Chess Club", "d@mergington.edu") == (1, 1)
+        assert store.activities_for("c@mergington.edu") == {"Chess Club"}
+
+    def test_no_queue_jumping(self):
+        """Test that direct signups are refused while anyone is waiting."""
+        store = full_store()
+        store.join_waitlist("Chess Club", "c@mergington.edu")
+        store.leave_waitlist("Chess Club", "c@mergington.edu")
+        store.join_waitlist("Chess Club", "d@mergington.edu")
+        store.remove_participant("Chess Club", "a@mergington.edu")
+        assert "d@mergington.edu" in store["Chess Club"].roster
+
+        store.join_waitlist("Chess Club", "e@mergington.edu")
+        applied, errors = store.apply_batch([
+            ("remove", "Chess Club", "b@mergington.edu"),
+            ("signup", "Chess Club", "f@mergington.edu"),
+        ], atomic=True)
+        assert applied is False
+        assert isinstance(errors[1], ActivityFullError)
+
+    def test_atomic_batch_sees_promotions(self):
+        """Test that an atomic batch is checked against the promotions its removals cause."""
+        store = full_store()
+        store.join_waitlist("Chess Club", "c@mergington.edu")
+        before = store.to_dict()
+        # Removing a promotes c into Chess Club, which clashes with Art Club
+        applied, errors = store.apply_batch([
+            ("remove", "Chess Club", "a@mergington.edu"),
+            ("signup", "Art Club", "c@mergington.edu"),
+        ], atomic=True)
+        assert applied is False
+        assert errors[0] is None
+        assert isinstance(errors[1], ScheduleConflictError)
+        assert store.to_dict() == before
+
+    def test_atomic_batch_skips_clashing_promotions(self):
+        """Test that the dry run drops a clashing student from the waitlist as promotion does."""
+        store = full_store()
+        store.join_waitlist("Chess Club", "c@mergington.edu")
+        store.join_waitlist("Chess Club", "d@mergington.edu")
+        applied, errors = store.apply_batch([
+            ("signup", "Art Club", "c@mergington.edu"),
+            ("remove", "Chess Club", "a@mergington.edu"),
+            ("signup", "Art Club", "d@mergington.edu"),
+        ], atomic=True)
+        assert applied is False
+        assert errors[:2] == [None, None]
+        assert isinstance(errors[2], ScheduleConflictError)
+
+        applied, errors = store.apply_batch([
+            ("signup", "Art Club", "c@mergington.edu"),
+            ("remove", "Chess Club", "a@mergington.edu"),
+        ], atomic=True)
+        assert applied is True and errors == [None, None]
+        assert list(store["Chess Club"].roster) == ["b@mergington.edu", "d@mergington.edu"]
+
+    def test_clashing_student_is_dropped(self):
+        """Test that a student whose schedule now clashes is skipped."""
+        store = full_store()
+        store.join_waitlist("Chess Club", "c@mergington.edu")
+        store.join_waitlist("Chess Club", "d@mergington.edu")
+        # Art Club overlaps Chess Club
+        store.add_participant("Art Club", "c@mergington.edu")
+
+        store.remove_participant("Chess Club", "a@mergington.edu")
+        assert "d@mergington.edu" in store["Chess Club"].roster
+        assert list(store["Chess Club"].waitlist) == []
+
+    @pytest.mark.parametrize("make_backend", [
+        lambda path: WriteAheadLogBackend(path / "wal", fsync=False),
+        lambda path: SQLiteBackend(path / "activities.sqlite3"),
+    ], ids=["wal", "sqlite"])
+    def test_survives_restart(self, tmp_path, make_backend):
+        """Test that waitlists and promotions are replayed exactly."""
+        backend = make_backend(tmp_path)
+        store = full_store(backend)
+        for email in ("c@mergington.edu", "d@mergington.edu", "e@mergington.edu"):
+            store.join_waitlist("Chess Club", email)
+        store.remove_participant("Chess Club", "a@mergington.edu")
+        store.leave_waitlist("Chess Club", "d@mergington.edu")
+        expected = store.to_dict()
+        assert expected["Chess Club"]["waitlist"] == ["e@mergington.edu"]
+        backend.close()
+
+        backend = make_backend(tmp_path)
+        assert full_store(backend).to_dict() == expected
+        backend.close()
+
+
+class TestWaitlistEndpoints:
+    """Tests for the waitlist API."""
+
+    def fill_debate_team(self, client):
+        for i in range(13):
+            client.post(f"/activities/Debate Team/signup?email=d{i}@mergington.edu")
+
+    def test_join_and_position(self, client, reset_activities):
+        """Test joining a full activity's waitlist and asking for the position."""
+        self.fill_debate_team(client)
+        response = client.post("/activities/Debate Team/waitlist?email=w1@mergington.edu")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["position"] == 1
+        client.post("/activities/Debate Team/waitlist?email=w2@mergington.edu")
+
+        response = client.get("/activities/Debate Team/waitlist/w2@mergington.edu")
+        assert response.json() == {"activity": "Debate Team", "email": "w2@mergington.edu",
+                                   "position": 2, "waiting": 2}
+
+        # Direct signups cannot overtake the queue
+        response = client.post("/activities/Debate Team/signup?email=late@mergington.edu")
+        assert response.json()["detail"] == "Activity is full"
+
+    def test_removal_promotes_over_the_api(self, client, reset_activities):
+        """Test that deleting a participant signs up the head of the queue."""
+        self.fill_debate_team(client)
+        client.post("/activities/Debate Team/waitlist?email=w1@mergington.edu")
+        client.delete("/activities/Debate Team/participants/grace@mergington.edu")
+
+        participants = client.get("/activities").json()["Debate Team"]["participants"]
+        assert participants[-1] == "w1@mergington.edu"
+        response = client.get("/activities/Debate Team/waitlist/w1@mergington.edu")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "Student not on the waitlist"
+
+    def test_errors(self, client, reset_activities):
+        """Test joining with free places and leaving when not waiting."""
+        response = client.post("/activities/Chess Club/waitlist?email=x@mergington.edu")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Activity has open spots; sign up instead"
+
+        response = client.delete("/activities/Chess Club/waitlist/x@mergington.edu")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        response = client.post("/activities/Nonexistent/waitlist?email=x@mergington.edu")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestNotifications:
+    """Tests for promotion notifications delivered in the background."""
+
+    def test_promotion_is_delivered_off_the_request_path(self):
+        """Test that promoting a student queues a notification for them."""
+        delivered = []
+
+        async def send(notification):
+            await asyncio.sleep(0)
+            delivered.append(notification)
+
+        notifications = NotificationQueue(send)
+        store = full_store()
+        notify_waitlist_changes(store, notifications)
+        store.join_waitlist("Chess Club", "c@mergington.edu")
+        store.remove_participant("Chess Club", "a@mergington.edu")
+        notifications.join(timeout=5)
+        notifications.close()
+
+        assert delivered == [{"type": "promoted", "activity": "Chess Club",
+                              "email": "c@mergington.edu", "version": store.version}]
+
+    def test_failed_sends_are_retried(self):
+        """Test that a flaky sender gets another attempt."""
+        attempts = []
+
+        async def flaky(notification):
+            attempts.append(notification)
+            if len(attempts) == 1:
+                raise ConnectionError("mail server down")
+
+        notifications = NotificationQueue(flaky, retry_delay=0.001)
+        notifications.put({"type": "promoted", "activity": "Chess Club", "email": "c@mergington.edu"})
+        notifications.join(timeout=5)
+        notifications.close()
+        assert len(attempts) == 2
+        assert (notifications.sent, notifications.failed) == (1, 0)